@@ -0,0 +1,96 @@
+import sys
+sys.path.append("..")
+import unittest
+import shutil
+import tempfile
+import threading
+import time
+
+from lstore.bufferpool import BufferPool
+
+class SlowStorage:
+    '''Wraps a storage engine, counts page reads and makes every read and write take a while'''
+    def __init__(self, storage, delay):
+        self.storage = storage
+        self.delay = delay
+        self.num_loads = 0
+
+    def load_page(self, frame, page_range_index, record_column, page_index):
+        self.num_loads += 1
+        time.sleep(self.delay)
+        self.storage.load_page(frame, page_range_index, record_column, page_index)
+
+    def unload_page(self, frame):
+        time.sleep(self.delay)
+        self.storage.unload_page(frame)
+
+    def flush_page(self, frame):
+        time.sleep(self.delay)
+        return self.storage.flush_page(frame)
+
+    def flush(self):
+        self.storage.flush()
+
+
+class TestBufferPoolIO(unittest.TestCase):
+
+    def setUp(self):
+        self.table_path = tempfile.mkdtemp()
+        self.bufferpool = BufferPool(self.table_path, 0, num_shards=1)
+
+    def tearDown(self):
+        self.bufferpool.shared_bufferpool.close()
+        shutil.rmtree(self.table_path)
+
+    def test_concurrent_misses_read_once(self):
+        self.bufferpool.storage = SlowStorage(self.bufferpool.storage, 0.2)
+        values = []
+
+        def reader():
+            with self.bufferpool.pin(0, 0, 7) as page:
+                values.append(page.read(3))
+
+        threads = [threading.Thread(target=reader) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(self.bufferpool.storage.num_loads, 1)
+        self.assertEqual(values, [0] * 8)
+        self.assertEqual(self.bufferpool.frames[self.bufferpool.get_page_frame_num(0, 0, 7)].pin.count, 0)
+
+    def test_hits_do_not_wait_for_misses(self):
+        self.bufferpool.write_page_slot(0, 0, 0, 0, 165)
+        self.bufferpool.storage = SlowStorage(self.bufferpool.storage, 0.5)
+
+        miss = threading.Thread(target=lambda: self.bufferpool.pin(0, 0, 1).unpin())
+        miss.start()
+        time.sleep(0.05)
+
+        time_0 = time.perf_counter()
+        with self.bufferpool.pin(0, 0, 0) as page:
+            self.assertEqual(page.read(0), 165)
+        self.assertLess(time.perf_counter() - time_0, 0.25)
+        miss.join()
+
+    def test_reload_waits_for_dirty_write_back(self):
+        num_pages = self.bufferpool.num_frames + 1
+        for page_index in range(num_pages):
+            self.bufferpool.write_page_slot(0, 0, page_index, 0, page_index + 1000)
+
+        # Page 0 was evicted dirty, fill the pool again so it is evicted while slow writes run
+        self.bufferpool.storage = SlowStorage(self.bufferpool.storage, 0.01)
+        self.bufferpool.write_page_slot(0, 0, 0, 1, 42)
+        threads = [threading.Thread(target=lambda first=first: [self.bufferpool.write_page_slot(0, 0, page_index, 1, 1) for page_index in range(first, num_pages, 4)]) for first in range(1, 5)]
+        for thread in threads:
+            thread.start()
+        for _ in range(20):
+            with self.bufferpool.pin(0, 0, 0) as page:
+                self.assertEqual(page.read_many([0, 1]), [1000, 42])
+        for thread in threads:
+            thread.join()
+
+
+if __name__ == '__main__':
+    unittest.main()
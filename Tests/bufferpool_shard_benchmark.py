@@ -0,0 +1,77 @@
+'''
+Measures transaction throughput of the milestone 3 workloads (inserts, then updates and selects)
+for 1 to 16 transaction workers, with a single bufferpool shard and with BUFFERPOOL_NUM_SHARDS shards
+Run from the Tests directory: python bufferpool_shard_benchmark.py
+'''
+import sys
+sys.path.append("..")
+
+from lstore.db import Database
+from lstore.query import Query
+from lstore.transaction import Transaction
+from lstore.transaction_worker import TransactionWorker
+from lstore.bufferpool import BufferPool
+from lstore.config import BUFFERPOOL_NUM_SHARDS
+
+from random import randint, seed
+from time import perf_counter
+import shutil
+
+NUMBER_OF_RECORDS = 1000
+NUMBER_OF_TRANSACTIONS = 100
+NUMBER_OF_OPERATIONS_PER_RECORD = 5
+THREAD_COUNTS = [1, 2, 4, 8, 16]
+BENCHMARK_PATH = "BufferPoolShardBenchmark"
+
+
+def run_workers(transactions, num_threads):
+    '''Runs the transactions over num_threads workers, returns the elapsed time'''
+    transaction_workers = [TransactionWorker() for _ in range(num_threads)]
+    for i, transaction in enumerate(transactions):
+        transaction_workers[i % num_threads].add_transaction(transaction)
+
+    time_0 = perf_counter()
+    for transaction_worker in transaction_workers:
+        transaction_worker.run()
+    for transaction_worker in transaction_workers:
+        transaction_worker.join()
+    return perf_counter() - time_0
+
+
+def run(num_shards, num_threads):
+    seed(3562901)
+    db = Database(BENCHMARK_PATH)
+    grades_table = db.create_table('Grades', 5, 0)
+    grades_table.bufferpool = BufferPool(grades_table.table_path, grades_table.num_columns, num_shards=num_shards)
+    query = Query(grades_table)
+
+    # Same shape as m3_tester_part_1: every transaction inserts every 100th record
+    keys = [92106429 + i for i in range(NUMBER_OF_RECORDS)]
+    insert_transactions = [Transaction() for _ in range(NUMBER_OF_TRANSACTIONS)]
+    for i, key in enumerate(keys):
+        record = [key] + [randint(i * 20, (i + 1) * 20) for _ in range(4)]
+        insert_transactions[i % NUMBER_OF_TRANSACTIONS].add_query(query.insert, grades_table, *record)
+    insert_time = run_workers(insert_transactions, num_threads)
+
+    # Same shape as m3_tester_part_2: each transaction updates and selects its own records
+    update_transactions = [Transaction() for _ in range(NUMBER_OF_TRANSACTIONS)]
+    for i, key in enumerate(keys):
+        transaction = update_transactions[i % NUMBER_OF_TRANSACTIONS]
+        for _ in range(NUMBER_OF_OPERATIONS_PER_RECORD):
+            updated_columns = [None, None, randint(0, 20), randint(0, 20), randint(0, 20)]
+            transaction.add_query(query.update, grades_table, key, *updated_columns)
+            transaction.add_query(query.select, grades_table, key, 0, [1, 1, 1, 1, 1])
+    update_time = run_workers(update_transactions, num_threads)
+
+    shutil.rmtree(BENCHMARK_PATH, ignore_errors=True)
+    num_operations = NUMBER_OF_RECORDS * (1 + NUMBER_OF_OPERATIONS_PER_RECORD * 2)
+    return num_operations / (insert_time + update_time)
+
+
+if __name__ == '__main__':
+    shutil.rmtree(BENCHMARK_PATH, ignore_errors=True)
+    print("threads\t1 shard\t\t" + f"{BUFFERPOOL_NUM_SHARDS} shards")
+    for num_threads in THREAD_COUNTS:
+        single_shard = run(1, num_threads)
+        sharded = run(BUFFERPOOL_NUM_SHARDS, num_threads)
+        print(f"{num_threads}\t{single_shard:,.0f} ops/s\t{sharded:,.0f} ops/s")
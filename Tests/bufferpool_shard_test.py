@@ -0,0 +1,80 @@
+import sys
+sys.path.append("..")
+import unittest
+import shutil
+import tempfile
+import threading
+from random import randint, seed
+
+from lstore.bufferpool import BufferPool, get_page_id
+
+class TestBufferPoolShards(unittest.TestCase):
+
+    def setUp(self):
+        self.table_path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.table_path)
+
+    def test_pages_spread_over_shards(self):
+        bufferpool = BufferPool(self.table_path, 0, num_shards=4)
+        for page_index in range(64):
+            bufferpool.write_page_slot(0, page_index % 5, page_index, 0, page_index)
+
+        for shard in bufferpool.shards:
+            self.assertGreater(len(shard.frame_directory), 0)
+        bufferpool.close()
+
+    def test_steal_frame_from_other_shard(self):
+        '''A shard whose frames are all pinned borrows frames from the other shards'''
+        bufferpool = BufferPool(self.table_path, 0, num_shards=2)
+        shard_capacity = bufferpool.num_frames // 2
+
+        # Pick pages that all belong to the first shard
+        page_indexes = [page_index for page_index in range(shard_capacity * 4) if page_index % 2 == 0][:shard_capacity + 10]
+        self.assertEqual(get_page_id(0, 0, page_indexes[-1]) % 2, 0)
+
+        handles = [bufferpool.pin(0, 0, page_index) for page_index in page_indexes]
+        for handle, page_index in zip(handles, page_indexes):
+            handle.write(0, page_index)
+
+        self.assertEqual(len(bufferpool.shards[0].frame_directory), shard_capacity + 10)
+        for handle in handles:
+            handle.unpin()
+
+        bufferpool.unload_all_frames()
+        for page_index in page_indexes:
+            with bufferpool.pin(0, 0, page_index) as page:
+                self.assertEqual(page.read(0), page_index)
+        bufferpool.close()
+
+    def test_concurrent_access(self):
+        '''Threads writing their own pages through every shard never see each other's values'''
+        seed(165)
+        bufferpool = BufferPool(self.table_path, 0, num_shards=8)
+        num_pages = bufferpool.num_frames * 2
+        errors = []
+
+        def worker(thread_index):
+            for _ in range(2000):
+                page_index = randint(0, num_pages - 1)
+                with bufferpool.pin(thread_index, 0, page_index) as page:
+                    page.write(0, page_index + thread_index)
+                    if page.read(0) != page_index + thread_index:
+                        errors.append(page_index)
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        # Stop the flusher first, it pins frames while it writes them
+        bufferpool.shared_bufferpool.close()
+        self.assertTrue(all(frame.pin.count == 0 for frame in bufferpool.frames))
+        bufferpool.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import sys
+sys.path.append("..")
+import unittest
+import shutil
+import tempfile
+
+from lstore.bufferpool import BufferPool, SharedBufferPool
+from lstore.db import Database
+from lstore.query import Query
+
+class TestBufferPoolStats(unittest.TestCase):
+
+    def setUp(self):
+        self.table_path = tempfile.mkdtemp()
+        self.shared_bufferpool = SharedBufferPool(8, num_shards=1, flush_rate=0, prefetch_threads=0, collect_stats=True)
+        self.bufferpool = BufferPool(self.table_path, 0, shared_bufferpool=self.shared_bufferpool)
+
+    def tearDown(self):
+        self.bufferpool.close()
+        self.shared_bufferpool.close()
+        shutil.rmtree(self.table_path)
+
+    def test_hits_misses_and_evictions(self):
+        for page_index in range(16):
+            self.bufferpool.write_page_slot(0, 0, page_index, 0, page_index)
+        for page_index in range(8, 16):
+            self.assertEqual(self.bufferpool.read_full_page(0, 0, page_index)[0], page_index)
+
+        stats = self.bufferpool.stats()
+        self.assertEqual(stats["misses"], 16)
+        self.assertEqual(stats["hits"], 8)
+        self.assertEqual(stats["hit_rate"], 8 / 24)
+        self.assertEqual(stats["evictions"], 8)
+        self.assertEqual(stats["dirty_writes"], 8)
+        self.assertEqual(stats["load_latency"]["count"], 16)
+        self.assertEqual(stats["write_latency"]["count"], 8)
+        self.assertLessEqual(stats["write_latency"]["p50"], stats["write_latency"]["max"])
+        self.assertEqual(stats["resident_table_frames"], 8)
+        self.assertEqual(stats["dirty_frames"], 8)
+
+    def test_allocation_failures(self):
+        handles = [self.bufferpool.pin(0, 0, page_index) for page_index in range(8)]
+        with self.assertRaises(MemoryError):
+            self.bufferpool.pin(0, 0, 8)
+
+        stats = self.bufferpool.stats()
+        self.assertEqual(stats["pinned_frames"], 8)
+        self.assertEqual(stats["eviction_failures"], 1)
+        self.assertEqual(stats["allocation_failures"], 1)
+        for handle in handles:
+            handle.unpin()
+
+    def test_reset_and_disable(self):
+        for page_index in range(4):
+            self.bufferpool.write_page_slot(0, 0, page_index, 0, page_index)
+        self.bufferpool.reset_stats()
+        stats = self.bufferpool.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["load_latency"]["count"]), (0, 0, 0))
+        self.assertEqual(stats["resident_frames"], 4)
+
+        self.bufferpool.enable_stats(False)
+        self.bufferpool.write_page_slot(0, 0, 0, 1, 1)
+        self.bufferpool.write_page_slot(0, 0, 5, 1, 1)
+        stats = self.bufferpool.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["load_latency"]["count"]), (0, 0, 0))
+
+    def test_database_stats(self):
+        db = Database()
+        db.open(tempfile.mkdtemp())
+        db.enable_stats()
+        grades = db.create_table('Grades', 3, 0)
+        query = Query(grades)
+        for key in range(100):
+            query.insert(key, key, key)
+        query.select(50, 0, [1, 1, 1])
+
+        stats = db.stats()["Grades"]
+        self.assertGreater(stats["hits"], 0)
+        self.assertGreater(stats["misses"], 0)
+        self.assertEqual(stats["resident_table_frames"], grades.bufferpool.num_resident_frames)
+
+        db.reset_stats()
+        self.assertEqual(db.stats()["Grades"]["hits"], 0)
+        grades.bufferpool.close()
+        shutil.rmtree(db.path)
+
+
+if __name__ == '__main__':
+    unittest.main()
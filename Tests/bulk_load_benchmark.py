@@ -0,0 +1,68 @@
+'''
+Compares the rows per second of a loop of Query.insert, Query.insert_many and Table.load_csv loading the same rows
+into a table with a secondary index
+Run from the Tests directory: python bulk_load_benchmark.py
+'''
+import sys
+sys.path.append("..")
+
+from lstore.db import Database
+from lstore.query import Query
+
+from random import randint, seed
+from time import perf_counter
+import shutil
+import os
+
+NUM_ROWS = 100000
+NUM_COLUMNS = 5
+BENCHMARK_PATH = "BulkLoadBenchmark"
+
+
+def create_table(db, name):
+    table = db.create_table(name, NUM_COLUMNS, 0)
+    table.merge_scheduler.enabled = False
+    table.index.create_index(1)
+    return table
+
+
+def close_table(table):
+    table.merge_scheduler.close()
+    table.bufferpool.close()
+
+
+if __name__ == '__main__':
+    shutil.rmtree(BENCHMARK_PATH, ignore_errors=True)
+    seed(165)
+    db = Database()
+    db.open(BENCHMARK_PATH)
+    rows = [(key, *(randint(0, 1000) for _ in range(NUM_COLUMNS - 1))) for key in range(NUM_ROWS)]
+    csv_path = os.path.join(BENCHMARK_PATH, "rows.csv")
+    with open(csv_path, "w") as csv_file:
+        csv_file.writelines(",".join(map(str, row)) + "\n" for row in rows)
+
+    print(f"{NUM_ROWS} rows of {NUM_COLUMNS} columns, indexes on columns 0 and 1")
+    table = create_table(db, 'Looped')
+    query = Query(table)
+    time_0 = perf_counter()
+    for row in rows:
+        query.insert(*row)
+    looped_rate = NUM_ROWS / (perf_counter() - time_0)
+    print(f"insert loop:\t{looped_rate:,.0f} rows/s")
+    close_table(table)
+
+    table = create_table(db, 'InsertMany')
+    time_0 = perf_counter()
+    Query(table).insert_many(rows)
+    rate = NUM_ROWS / (perf_counter() - time_0)
+    print(f"insert_many:\t{rate:,.0f} rows/s\t{rate / looped_rate:.1f}x")
+    close_table(table)
+
+    table = create_table(db, 'Csv')
+    time_0 = perf_counter()
+    table.load_csv(csv_path)
+    rate = NUM_ROWS / (perf_counter() - time_0)
+    print(f"load_csv:\t{rate:,.0f} rows/s\t{rate / looped_rate:.1f}x")
+    close_table(table)
+
+    shutil.rmtree(BENCHMARK_PATH, ignore_errors=True)
@@ -0,0 +1,94 @@
+import sys
+sys.path.append("..")
+import unittest
+import shutil
+import tempfile
+import os
+
+from lstore.db import Database
+from lstore.query import Query
+from lstore.page_range import MergeRequest
+from lstore.config import MAX_RECORD_PER_PAGE_RANGE
+
+
+class TestBulkLoad(unittest.TestCase):
+
+    def setUp(self):
+        self.db = Database()
+        self.db.open(tempfile.mkdtemp())
+        self.table = self.db.create_table('Grades', 4, 0)
+        self.table.merge_scheduler.enabled = False
+        self.table.index.create_index(2)
+        self.query = Query(self.table)
+
+    def tearDown(self):
+        self.table.merge_scheduler.close()
+        self.table.bufferpool.close()
+        shutil.rmtree(self.db.path)
+
+    def test_loaded_records_match_inserted_records(self):
+        inserted_table = self.db.create_table('Inserted', 4, 0)
+        inserted_table.merge_scheduler.enabled = False
+        inserted_table.index.create_index(2)
+        inserted_query = Query(inserted_table)
+
+        rows = [(key, key * 2, key % 17, -key) for key in range(3000)]
+        for row in rows:
+            inserted_query.insert(*row)
+        self.assertEqual(self.query.insert_many(rows), 3000)
+
+        for key in range(0, 3000, 13):
+            self.assertEqual(self.query.select(key, 0, [1, 1, 1, 1])[0].columns, list(rows[key]))
+        for value in range(17):
+            self.assertEqual(sorted(self.table.index.locate(2, value)), sorted(inserted_table.index.locate(2, value)))
+        self.assertEqual(self.query.sum(0, 2999, 3), inserted_query.sum(0, 2999, 3))
+        inserted_table.merge_scheduler.close()
+
+    def test_duplicate_and_malformed_rows_are_skipped(self):
+        self.query.insert(5, 0, 0, 0)
+        rows = [(5, 1, 1, 1), (6, 1, 1, 1), (6, 2, 2, 2), (7, 1, 1), (8, 1, 1, 1)]
+        self.assertEqual(self.query.insert_many(rows), 2)
+        self.assertEqual(self.query.select(5, 0, [1, 1, 1, 1])[0].columns, [5, 0, 0, 0])
+        self.assertEqual(self.query.select(6, 0, [1, 1, 1, 1])[0].columns, [6, 1, 1, 1])
+        self.assertIsNone(self.table.index.locate(0, 7))
+        self.assertEqual(sorted(self.table.index.locate(2, 1)), sorted(self.table.index.locate(0, 6) + self.table.index.locate(0, 8)))
+
+    def test_loads_span_page_ranges(self):
+        for key in range(10):
+            self.query.insert(-key - 1, 0, 0, 0)
+        self.assertEqual(self.table.bulk_load(((key, key, key, key) for key in range(MAX_RECORD_PER_PAGE_RANGE)), batch_size=1000), MAX_RECORD_PER_PAGE_RANGE)
+        self.assertEqual(len(self.table.page_ranges), 2)
+        self.assertEqual(self.table.index.locate(0, MAX_RECORD_PER_PAGE_RANGE - 1), [MAX_RECORD_PER_PAGE_RANGE + 9])
+        self.assertEqual(self.query.sum(0, MAX_RECORD_PER_PAGE_RANGE - 1, 1), sum(range(MAX_RECORD_PER_PAGE_RANGE)))
+
+        # Loaded records take updates, merges and single inserts like inserted records
+        for key in range(0, MAX_RECORD_PER_PAGE_RANGE, 100):
+            self.assertTrue(self.query.update(key, None, -key, None, None))
+        for page_range_index in range(2):
+            self.table.merge_queue.put(MergeRequest(page_range_index))
+        self.table.merge_queue.join()
+        self.assertTrue(self.query.insert(MAX_RECORD_PER_PAGE_RANGE, 1, 2, 3))
+        self.assertEqual(self.query.select(MAX_RECORD_PER_PAGE_RANGE, 0, [1, 1, 1, 1])[0].columns, [MAX_RECORD_PER_PAGE_RANGE, 1, 2, 3])
+        self.assertEqual(self.query.select(8100, 0, [1, 1, 1, 1])[0].columns, [8100, -8100, 8100, 8100])
+        self.assertEqual(self.query.select_version(8100, 0, [1, 1, 1, 1], -1)[0].columns, [8100, 8100, 8100, 8100])
+
+    def test_failed_load_indexes_the_rows_written(self):
+        rows = [(key, 0, 0, 0) for key in range(100)] + [(100, 1 << 40, 0, 0)]
+        with self.assertRaises(OverflowError):
+            self.table.bulk_load(rows, batch_size=50)
+        self.assertEqual(self.query.select(99, 0, [1, 1, 1, 1])[0].columns, [99, 0, 0, 0])
+        self.assertEqual(len(self.table.index.locate(2, 0)), 100)
+
+    def test_load_csv(self):
+        path = os.path.join(self.db.path, "grades.csv")
+        with open(path, "w") as csv_file:
+            csv_file.write("key,a,b,c\n")
+            for key in range(500):
+                csv_file.write(f"{key},{key + 1},{key + 2},{key + 3}\n")
+        self.assertEqual(self.table.load_csv(path, has_header=True), 500)
+        self.assertEqual(self.query.select(250, 0, [1, 1, 1, 1])[0].columns, [250, 251, 252, 253])
+        self.assertEqual(self.table.index.locate(2, 252), self.table.index.locate(0, 250))
+
+
+if __name__ == '__main__':
+    unittest.main()
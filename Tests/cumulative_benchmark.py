@@ -0,0 +1,74 @@
+'''
+Runs the update/select workload of __main__.py on a table with delta tail records and one with cumulative tail records,
+once with the 10k updates of __main__.py and once with longer tail chains. Merges are held back so the selects
+walk every tail record written by the updates
+Run from the Tests directory: python cumulative_benchmark.py
+'''
+import sys
+sys.path.append("..")
+
+from lstore.db import Database
+from lstore.query import Query
+
+from random import choice, randrange, seed
+from time import process_time
+import shutil
+
+NUM_RECORDS = 10000
+UPDATE_COUNTS = [10000, 50000]
+BENCHMARK_PATH = "CumulativeBenchmark"
+
+
+def run(cumulative_updates, num_updates):
+    '''Returns the seconds taken by the update, select and sum phases and the tail records read per select'''
+    shutil.rmtree(BENCHMARK_PATH, ignore_errors=True)
+    seed(165)
+    db = Database()
+    db.open(BENCHMARK_PATH)
+    grades_table = db.create_table('Grades', 5, 0, cumulative_updates=cumulative_updates)
+    grades_table.merge_scheduler.enabled = False
+    query = Query(grades_table)
+    keys = []
+    for i in range(0, NUM_RECORDS):
+        query.insert(906659671 + i, 93, 0, 0, 0)
+        keys.append(906659671 + i)
+
+    update_cols = [
+        [None, None, None, None, None],
+        [None, randrange(0, 100), None, None, None],
+        [None, None, randrange(0, 100), None, None],
+        [None, None, None, randrange(0, 100), None],
+        [None, None, None, None, randrange(0, 100)],
+    ]
+    update_time_0 = process_time()
+    for i in range(0, num_updates):
+        query.update(choice(keys), *(choice(update_cols)))
+    update_time = process_time() - update_time_0
+
+    tail_hops = sum(page_range["tail_hops"] for page_range in grades_table.merge_stats()["page_ranges"].values())
+    select_time_0 = process_time()
+    for i in range(0, 10000):
+        query.select(choice(keys), 0, [1, 1, 1, 1, 1])
+    select_time = process_time() - select_time_0
+    tail_hops = sum(page_range["tail_hops"] for page_range in grades_table.merge_stats()["page_ranges"].values()) - tail_hops
+
+    agg_time_0 = process_time()
+    for i in range(0, 10000, 100):
+        start_value = 906659671 + i
+        query.sum(start_value, start_value + 99, randrange(0, 5))
+    agg_time = process_time() - agg_time_0
+
+    grades_table.merge_scheduler.close()
+    grades_table.merge_queue.join()
+    grades_table.bufferpool.close()
+    shutil.rmtree(BENCHMARK_PATH, ignore_errors=True)
+    return update_time, select_time, agg_time, tail_hops / 10000
+
+
+if __name__ == '__main__':
+    for num_updates in UPDATE_COUNTS:
+        print(f"{NUM_RECORDS} records, {num_updates} updates")
+        for cumulative_updates in (False, True):
+            update_time, select_time, agg_time, hops_per_select = run(cumulative_updates, num_updates)
+            print(f"{'cumulative' if cumulative_updates else 'delta':<10}\tupdate {update_time:.3f}s\tselect 10k {select_time:.3f}s\t"
+                  f"sum 100 batches {agg_time:.3f}s\ttail records per select {hops_per_select:.2f}")
@@ -0,0 +1,101 @@
+import sys
+sys.path.append("..")
+import unittest
+import shutil
+import tempfile
+
+from lstore.db import Database
+from lstore.query import Query
+from lstore.page_range import MergeRequest
+from lstore.config import NUM_HIDDEN_COLUMNS
+
+class TestCumulativeUpdates(unittest.TestCase):
+
+    def setUp(self):
+        self.db = Database()
+        self.db.open(tempfile.mkdtemp())
+        self.table = self.db.create_table('Grades', 4, 0, cumulative_updates=True)
+        self.table.merge_scheduler.enabled = False
+        self.query = Query(self.table)
+        self.latest_values = {}
+        for key in range(500):
+            self.latest_values[key] = [key, key, key, key]
+            self.query.insert(key, key, key, key)
+
+    def tearDown(self):
+        self.table.merge_scheduler.close()
+        self.table.bufferpool.close()
+        shutil.rmtree(self.db.path)
+
+    def update(self, key, column, value):
+        columns = [None] * 4
+        columns[column] = value
+        self.assertTrue(self.query.update(key, *columns))
+        self.latest_values[key][column] = value
+
+    def newest_tail_columns(self, key):
+        '''Returns the data columns held by the newest tail record of a record'''
+        rid = self.table.index.locate(0, key)[0]
+        page_range_index, page_index, page_slot = self.table.get_base_record_location(rid)
+        with self.table.bufferpool.pin(page_range_index, 0, page_index) as page:
+            tail_rid = page.read(page_slot)
+        return self.table.page_ranges[page_range_index].read_tail_record_data(tail_rid)
+
+    def select_tail_hops(self, keys):
+        tail_hops = self.table.merge_stats()["page_ranges"][0]["tail_hops"]
+        for key in keys:
+            self.assertEqual(self.query.select(key, 0, [1, 1, 1, 1])[0].columns, self.latest_values[key])
+        return self.table.merge_stats()["page_ranges"][0]["tail_hops"] - tail_hops
+
+    def test_newest_tail_record_carries_updated_columns(self):
+        for key in range(0, 500, 2):
+            self.update(key, 1, -key)
+            self.update(key, 2, key * 2)
+            self.update(key, 1, key + 7)
+            self.update(key, 3, key * 3)
+
+        self.assertEqual(self.newest_tail_columns(0), [None, 7, 0, 0])
+        self.assertEqual(self.newest_tail_columns(10), [None, 17, 20, 30])
+        # Every record reads at most one tail record
+        self.assertEqual(self.select_tail_hops(range(500)), 250)
+        for key in range(0, 500, 50):
+            self.assertEqual(self.query.sum(key, key + 49, 1), sum(self.latest_values[k][1] for k in range(key, key + 50)))
+            self.assertEqual(self.query.sum(key, key + 49, 3), sum(self.latest_values[k][3] for k in range(key, key + 50)))
+
+    def test_older_versions_match_delta_tail_records(self):
+        delta_table = self.db.create_table('Delta', 4, 0)
+        delta_table.merge_scheduler.enabled = False
+        delta_query = Query(delta_table)
+        for key in range(20):
+            delta_query.insert(key, key, key, key)
+        for key in range(20):
+            for column, value in ((1, -key), (2, key * 2), (1, key + 7), (3, key * 3)):
+                self.update(key, column, value)
+                columns = [None] * 4
+                columns[column] = value
+                delta_query.update(key, *columns)
+
+        for key in range(20):
+            for relative_version in (0, -1, -2, 1, 2):
+                self.assertEqual(self.query.select_version(key, 0, [1, 1, 1, 1], relative_version)[0].columns,
+                                 delta_query.select_version(key, 0, [1, 1, 1, 1], relative_version)[0].columns)
+        delta_table.merge_scheduler.close()
+
+    def test_merged_columns_are_not_carried(self):
+        for key in range(0, 500, 2):
+            self.update(key, 1, -key)
+        self.table.merge_queue.put(MergeRequest(0))
+        self.table.merge_queue.join()
+
+        for key in range(0, 500, 2):
+            self.update(key, 2, key * 2)
+        self.assertEqual(self.newest_tail_columns(4), [None, None, 8, None])
+        self.assertEqual(self.select_tail_hops(range(500)), 250)
+
+    def test_cumulative_updates_persist(self):
+        self.assertTrue(self.table.serialize()["cumulative_updates"])
+        self.assertFalse(Query(self.db.create_table('Delta', 2, 0)).table.cumulative_updates)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,150 @@
+import sys
+sys.path.append("..")
+import unittest
+import shutil
+import tempfile
+from random import Random
+
+from lstore.db import Database
+from lstore.query import Query
+from lstore.page_range import MergeRequest
+from lstore.config import MAX_RECORD_PER_PAGE, MAX_PAGE_RANGE, NUM_HIDDEN_COLUMNS, INDIRECTION_COLUMN
+
+NUM_RECORDS = 1500
+
+
+class TestFixedTailLayout(unittest.TestCase):
+
+    def setUp(self):
+        self.db = Database()
+        self.db.open(tempfile.mkdtemp())
+        self.tables = [
+            self.db.create_table('Fixed', 4, 0, fixed_tail_layout=True),
+            self.db.create_table('Log', 4, 0)
+        ]
+        self.queries = []
+        for table in self.tables:
+            table.merge_scheduler.enabled = False
+            self.queries.append(Query(table))
+        self.latest_values = {}
+        for key in range(NUM_RECORDS):
+            self.latest_values[key] = [key, key % 10, key, -key]
+            for query in self.queries:
+                query.insert(*self.latest_values[key])
+
+    def tearDown(self):
+        for table in self.tables:
+            table.merge_scheduler.close()
+            table.bufferpool.close()
+        shutil.rmtree(self.db.path)
+
+    def update_all(self, num_updates, seed):
+        '''Runs the same random updates on every table'''
+        random = Random(seed)
+        for _ in range(num_updates):
+            key = random.randrange(NUM_RECORDS)
+            columns = [None] * 4
+            for column in random.sample(range(1, 4), random.randint(1, 3)):
+                columns[column] = random.randint(-1000, 1000)
+                self.latest_values[key][column] = columns[column]
+            for query in self.queries:
+                self.assertTrue(query.update(key, *columns))
+
+    def check_layouts_match(self):
+        fixed_query, log_query = self.queries
+        for key in range(0, NUM_RECORDS, 7):
+            self.assertEqual(fixed_query.select(key, 0, [1, 1, 1, 1])[0].columns, self.latest_values[key])
+            for relative_version in (-1, -2, -4):
+                self.assertEqual(fixed_query.select_version(key, 0, [1, 1, 1, 1], relative_version)[0].columns,
+                                 log_query.select_version(key, 0, [1, 1, 1, 1], relative_version)[0].columns)
+        for column in range(1, 4):
+            self.assertEqual(fixed_query.sum(0, NUM_RECORDS - 1, column), sum(values[column] for values in self.latest_values.values()))
+            self.assertEqual(fixed_query.sum_version(0, NUM_RECORDS - 1, column, -1), log_query.sum_version(0, NUM_RECORDS - 1, column, -1))
+
+    def test_tail_columns_are_located_by_arithmetic(self):
+        self.update_all(3 * MAX_RECORD_PER_PAGE, seed=1)
+        page_range = self.tables[0].page_ranges[0]
+        self.assertIsNone(page_range.logical_directory)
+        self.assertEqual(self.tables[0].memory_stats()["logical_directory_bytes"], 0)
+        self.assertEqual(len(page_range.tail_block_pages[0]), 3)
+
+        logical_rid = (MAX_PAGE_RANGE + 2) * MAX_RECORD_PER_PAGE + 5
+        for column in range(NUM_HIDDEN_COLUMNS, NUM_HIDDEN_COLUMNS + 4):
+            self.assertEqual(page_range.get_column_location(logical_rid, column), (page_range.tail_block_pages[column - NUM_HIDDEN_COLUMNS][2], 5))
+        self.check_layouts_match()
+
+    def test_tail_records_hold_updated_columns_only(self):
+        self.assertTrue(self.queries[0].update(3, None, 30, None, None))
+        page_range = self.tables[0].page_ranges[0]
+        tail_rid = page_range.read_tail_record_column(self.tables[0].index.locate(0, 3)[0], INDIRECTION_COLUMN)
+        self.assertEqual(page_range.read_tail_record_data(tail_rid), [None, 30, None, None])
+        self.assertIsNone(page_range.get_tail_column_location(tail_rid, NUM_HIDDEN_COLUMNS))
+        self.assertIsNotNone(page_range.get_tail_column_location(tail_rid, NUM_HIDDEN_COLUMNS + 1))
+
+    def test_merges_read_fixed_tail_records(self):
+        self.update_all(2 * MAX_RECORD_PER_PAGE, seed=2)
+        for table in self.tables:
+            table.merge_queue.put(MergeRequest(0))
+            table.merge_queue.join()
+        self.update_all(MAX_RECORD_PER_PAGE, seed=3)
+        self.check_layouts_match()
+
+    def test_secondary_index_sees_latest_values(self):
+        self.update_all(2 * MAX_RECORD_PER_PAGE, seed=4)
+        for table in self.tables:
+            self.assertTrue(table.index.create_index(2))
+        for key in range(0, NUM_RECORDS, 11):
+            value = self.latest_values[key][2]
+            # Both tables inserted the same keys in the same order, a record has the same rid in both
+            expected = sorted(self.tables[1].index.locate(0, k)[0] for k, values in self.latest_values.items() if values[2] == value)
+            for table in self.tables:
+                self.assertEqual(sorted(table.index.locate(2, value)), expected)
+
+    def test_cumulative_tail_records(self):
+        table = self.db.create_table('Cumulative', 4, 0, cumulative_updates=True, fixed_tail_layout=True)
+        table.merge_scheduler.enabled = False
+        query = Query(table)
+        query.insert(1, 2, 3, 4)
+        query.update(1, None, 20, None, None)
+        query.update(1, None, None, None, 40)
+        page_range = table.page_ranges[0]
+        tail_rid = page_range.read_tail_record_column(table.index.locate(0, 1)[0], INDIRECTION_COLUMN)
+        self.assertEqual(page_range.read_tail_record_data(tail_rid), [None, 20, None, 40])
+        self.assertEqual(query.select(1, 0, [1, 1, 1, 1])[0].columns, [1, 20, 3, 40])
+        self.assertEqual(query.select_version(1, 0, [1, 1, 1, 1], -1)[0].columns, [1, 20, 3, 4])
+        table.merge_scheduler.close()
+
+
+class TestFixedTailLayoutPersistence(unittest.TestCase):
+
+    def test_fixed_tail_layout_survives_reopen(self):
+        path = tempfile.mkdtemp()
+        db = Database()
+        db.open(path)
+        table = db.create_table('Grades', 3, 0, fixed_tail_layout=True)
+        table.merge_scheduler.enabled = False
+        query = Query(table)
+        for key in range(300):
+            query.insert(key, key, key)
+        for key in range(0, 300, 3):
+            query.update(key, None, -key, None)
+            query.update(key, None, None, key * 2)
+        db.close()
+
+        db = Database()
+        db.open(path)
+        table = db.get_table('Grades')
+        self.assertTrue(table.fixed_tail_layout)
+        self.assertIsNone(table.page_ranges[0].logical_directory)
+        query = Query(table)
+        for key in range(300):
+            expected = [key, -key, key * 2] if key % 3 == 0 else [key, key, key]
+            self.assertEqual(query.select(key, 0, [1, 1, 1])[0].columns, expected)
+        self.assertTrue(query.update(3, None, None, 7))
+        self.assertEqual(query.select(3, 0, [1, 1, 1])[0].columns, [3, -3, 7])
+        db.close()
+        shutil.rmtree(path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+'''
+Compares an update heavy workload with and without the background dirty page flusher:
+dirty pages written at eviction time, time queries stalled on those writes and the time closing the bufferpool takes
+Updates append tail records, tail pages stay dirty after they fill up until the flusher or an eviction writes them
+Run from the Tests directory: python flusher_benchmark.py
+'''
+import sys
+sys.path.append("..")
+
+from lstore.db import Database
+from lstore.query import Query
+from lstore.bufferpool import BufferPool, SharedBufferPool
+from lstore.config import BUFFERPOOL_FLUSH_RATE
+
+from random import randint, seed
+from time import perf_counter
+import shutil
+
+NUM_RECORDS = 10000
+NUM_UPDATES = 30000
+NUM_FRAMES = 160
+'''A small bufferpool so the tail pages of the workload don't fit'''
+BENCHMARK_PATH = "FlusherBenchmark"
+
+
+def run(flush_rate):
+    seed(165)
+    db = Database()
+    db.open(BENCHMARK_PATH)
+    grades_table = db.create_table('Grades', 5, 0)
+    shared_bufferpool = SharedBufferPool(NUM_FRAMES, flush_rate=flush_rate)
+    grades_table.bufferpool = BufferPool(grades_table.table_path, grades_table.num_columns, shared_bufferpool=shared_bufferpool)
+    query = Query(grades_table)
+
+    for key in range(NUM_RECORDS):
+        query.insert(key, 0, 0, 0, 0)
+
+    time_0 = perf_counter()
+    for _ in range(NUM_UPDATES):
+        query.update(randint(0, NUM_RECORDS - 1), None, randint(0, 100), None, randint(0, 100), None)
+    elapsed = perf_counter() - time_0
+    stats = shared_bufferpool.get_flush_stats()
+
+    # Only the bufferpool part of close, that is where the remaining dirty pages are written
+    time_0 = perf_counter()
+    grades_table.bufferpool.close()
+    close_time = perf_counter() - time_0
+    shared_bufferpool.close()
+
+    # The merge thread of the table can still be writing pages
+    shutil.rmtree(BENCHMARK_PATH, ignore_errors=True)
+    return elapsed, close_time, stats
+
+
+if __name__ == '__main__':
+    shutil.rmtree(BENCHMARK_PATH, ignore_errors=True)
+    for flush_rate in [0, BUFFERPOOL_FLUSH_RATE]:
+        elapsed, close_time, stats = run(flush_rate)
+        print(f"flush rate {flush_rate}:\t{NUM_UPDATES / elapsed:,.0f} updates/s\t"
+              f"dirty evictions {stats['dirty_evictions']}\tstall {stats['stall_time']:.3f}s\t"
+              f"flushed {stats['flushed_pages']} pages ({stats['flushed_bytes'] / 1e6:.1f} MB)\tclose {close_time:.3f}s")
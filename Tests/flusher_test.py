@@ -0,0 +1,68 @@
+import sys
+sys.path.append("..")
+import unittest
+import shutil
+import tempfile
+import time
+
+from lstore.bufferpool import BufferPool, SharedBufferPool
+from lstore.config import PAGE_FILE_STORAGE, SEGMENT_STORAGE
+from lstore.page import PAGE_FILE_SIZE
+
+class TestBufferPoolFlusher(unittest.TestCase):
+
+    def setUp(self):
+        self.table_path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.table_path)
+
+    def test_background_flusher_cleans_frames(self):
+        shared_bufferpool = SharedBufferPool(64, num_shards=4, flush_rate=10000, dirty_ratio=0.1)
+        bufferpool = BufferPool(self.table_path, 0, shared_bufferpool=shared_bufferpool)
+        for page_index in range(64):
+            bufferpool.write_page_slot(0, 0, page_index, 0, page_index)
+
+        # Wait for the flusher to bring the dirty frames under the target
+        for _ in range(100):
+            if (sum(1 for frame in bufferpool.frames if frame.dirty) <= 6):
+                break
+            time.sleep(0.05)
+
+        stats = bufferpool.get_flush_stats()
+        self.assertLessEqual(sum(1 for frame in bufferpool.frames if frame.dirty), 6)
+        self.assertGreaterEqual(stats["flushed_pages"], 58)
+        self.assertEqual(stats["flushed_bytes"], stats["flushed_pages"] * PAGE_FILE_SIZE)
+        self.assertEqual(bufferpool.num_resident_frames, 64)
+
+        # Clean frames are evicted without writing
+        for page_index in range(64, 80):
+            with bufferpool.pin(0, 0, page_index) as page:
+                page.read(0)
+        self.assertLessEqual(bufferpool.get_flush_stats()["dirty_evictions"], 6)
+        bufferpool.close()
+        shared_bufferpool.close()
+
+    def test_flush_keeps_pages_loaded(self):
+        for storage_engine in [PAGE_FILE_STORAGE, SEGMENT_STORAGE]:
+            bufferpool = BufferPool(self.table_path, 0, storage_engine)
+            # Flush by hand only
+            bufferpool.shared_bufferpool.close()
+
+            for page_index in range(4):
+                bufferpool.write_page_slot(1, 2, page_index, 7, page_index + 100)
+            self.assertEqual(bufferpool.flush_dirty_frames(), 4)
+            self.assertEqual(bufferpool.flush_dirty_frames(), 0)
+            self.assertTrue(all(not frame.dirty for frame in bufferpool.frames))
+
+            # A second bufferpool over the same files sees the flushed pages
+            reader = BufferPool(self.table_path, 0, storage_engine)
+            for page_index in range(4):
+                with reader.pin(1, 2, page_index) as page:
+                    self.assertEqual(page.read(7), page_index + 100)
+            reader.close()
+            bufferpool.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
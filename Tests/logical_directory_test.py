@@ -0,0 +1,94 @@
+import sys
+sys.path.append("..")
+import unittest
+import shutil
+import tempfile
+import os
+
+from lstore.db import Database
+from lstore.query import Query
+from lstore.logical_directory import LogicalDirectory, INITIAL_LOGICAL_DIRECTORY_RECORDS
+from lstore.config import MAX_RECORD_PER_PAGE_RANGE
+
+
+class TestLogicalDirectory(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.directory = LogicalDirectory(3)
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_columns_without_updates_are_none(self):
+        logical_rid = MAX_RECORD_PER_PAGE_RANGE + 5
+        self.directory.add_record(logical_rid)
+        self.directory.set(logical_rid, 1, 9000)
+        self.assertEqual(self.directory.get(logical_rid, 1), 9000)
+        self.assertIsNone(self.directory.get(logical_rid, 0))
+        self.assertEqual(self.directory.get_record(logical_rid), [None, 9000, None])
+        self.assertEqual(self.directory.get_stats()["records"], 6)
+
+        # A recycled logical rid starts without columns
+        self.directory.add_record(logical_rid)
+        self.assertEqual(self.directory.get_record(logical_rid), [None, None, None])
+
+    def test_directory_grows(self):
+        capacity = self.directory.get_stats()["capacity"]
+        self.assertEqual(capacity, INITIAL_LOGICAL_DIRECTORY_RECORDS)
+        for logical_rid in range(MAX_RECORD_PER_PAGE_RANGE, MAX_RECORD_PER_PAGE_RANGE + capacity * 3):
+            self.directory.add_record(logical_rid)
+            self.directory.set(logical_rid, logical_rid % 3, logical_rid)
+        self.assertGreaterEqual(self.directory.get_stats()["capacity"], capacity * 3)
+        self.assertEqual(self.directory.get(MAX_RECORD_PER_PAGE_RANGE + capacity * 2, (MAX_RECORD_PER_PAGE_RANGE + capacity * 2) % 3), MAX_RECORD_PER_PAGE_RANGE + capacity * 2)
+
+    def test_save_and_load(self):
+        for logical_rid in range(MAX_RECORD_PER_PAGE_RANGE, MAX_RECORD_PER_PAGE_RANGE + 100):
+            self.directory.add_record(logical_rid)
+            self.directory.set(logical_rid, logical_rid % 3, logical_rid * 2)
+        path = os.path.join(self.path, "PageRange_0", "LogicalDirectory.bin")
+        self.directory.save(path)
+        self.assertEqual(os.path.getsize(path), 12 + 100 * 3 * 4)
+
+        directory = LogicalDirectory(3)
+        directory.load(path)
+        self.assertEqual(directory, self.directory)
+        with self.assertRaises(ValueError):
+            LogicalDirectory(4).load(path)
+
+    def test_load_json_directory(self):
+        self.directory.load_dict({str(MAX_RECORD_PER_PAGE_RANGE + 1): [None, 8200, None], str(MAX_RECORD_PER_PAGE_RANGE): [8192, None, None]})
+        self.assertEqual(self.directory.get_record(MAX_RECORD_PER_PAGE_RANGE), [8192, None, None])
+        self.assertEqual(self.directory.get_record(MAX_RECORD_PER_PAGE_RANGE + 1), [None, 8200, None])
+
+
+class TestLogicalDirectoryPersistence(unittest.TestCase):
+
+    def test_tail_records_survive_reopen(self):
+        path = tempfile.mkdtemp()
+        db = Database()
+        db.open(path)
+        table = db.create_table('Grades', 3, 0)
+        table.merge_scheduler.enabled = False
+        query = Query(table)
+        for key in range(300):
+            query.insert(key, key, key)
+        for key in range(0, 300, 3):
+            query.update(key, None, -key, None)
+            query.update(key, None, None, key * 2)
+        self.assertGreater(db.memory_stats()["Grades"]["logical_directory_bytes"], 0)
+        db.close()
+        self.assertTrue(os.path.exists(os.path.join(path, "Grades", "PageRange_0", "LogicalDirectory.bin")))
+
+        db = Database()
+        db.open(path)
+        query = Query(db.get_table('Grades'))
+        for key in range(300):
+            expected = [key, -key, key * 2] if key % 3 == 0 else [key, key, key]
+            self.assertEqual(query.select(key, 0, [1, 1, 1])[0].columns, expected)
+        db.close()
+        shutil.rmtree(path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+'''
+Measures merge throughput in base records per second: a table is loaded with updates while merges are held back,
+then every page range is merged once and the base pages are checked against the latest values
+Run from the Tests directory: python merge_benchmark.py
+'''
+import sys
+sys.path.append("..")
+
+from lstore.db import Database
+from lstore.query import Query
+from lstore.page_range import MergeRequest
+from lstore.config import MAX_RECORD_PER_PAGE, MAX_RECORD_PER_PAGE_RANGE, NUM_HIDDEN_COLUMNS
+
+from random import randint, seed
+from time import perf_counter
+import shutil
+
+NUM_PAGE_RANGES = 4
+NUM_RECORDS = MAX_RECORD_PER_PAGE_RANGE * NUM_PAGE_RANGES
+NUM_UPDATES = 40000
+NUM_COLUMNS = 5
+BENCHMARK_PATH = "MergeBenchmark"
+
+
+def count_stale_records(table, latest_values):
+    '''Returns the number of records whose base pages don't hold their latest values'''
+    num_stale = 0
+    for rid, columns in latest_values.items():
+        page_range_index, page_index, page_slot = table.get_base_record_location(rid)
+        with table.read_base_page(page_range_index, page_index) as base_page:
+            for column, value in enumerate(columns):
+                with table.bufferpool.pin(page_range_index, NUM_HIDDEN_COLUMNS + column, base_page.page_indexes[column]) as page:
+                    if page.read(page_slot) != value:
+                        num_stale += 1
+                        break
+    return num_stale
+
+
+if __name__ == '__main__':
+    shutil.rmtree(BENCHMARK_PATH, ignore_errors=True)
+    seed(165)
+    db = Database()
+    db.open(BENCHMARK_PATH)
+    grades_table = db.create_table('Grades', NUM_COLUMNS, 0)
+    query = Query(grades_table)
+
+    # Merges are held back while loading
+    grades_table.merge_scheduler.enabled = False
+
+    latest_values = {}
+    for key in range(NUM_RECORDS):
+        latest_values[key] = [key] + [randint(0, 100) for _ in range(NUM_COLUMNS - 1)]
+        query.insert(*latest_values[key])
+    for _ in range(NUM_UPDATES):
+        key = randint(0, NUM_RECORDS - 1)
+        column = randint(1, NUM_COLUMNS - 1)
+        value = randint(0, 100)
+        columns = [None] * NUM_COLUMNS
+        columns[column] = value
+        query.update(key, *columns)
+        latest_values[key][column] = value
+
+    merge_queue = grades_table.merge_queue
+    time_0 = perf_counter()
+    for page_range_index in range(NUM_PAGE_RANGES):
+        merge_queue.put(MergeRequest(page_range_index))
+    merge_queue.join()
+    elapsed = perf_counter() - time_0
+
+    print(f"merged {NUM_RECORDS} records with {NUM_UPDATES} updates in {elapsed:.3f}s\t{NUM_RECORDS / elapsed:,.0f} records/s")
+    print(f"records with stale base pages after the merge: {count_stale_records(grades_table, latest_values)}")
+
+    grades_table.bufferpool.close()
+    shutil.rmtree(BENCHMARK_PATH, ignore_errors=True)
@@ -0,0 +1,80 @@
+'''
+Measures the select latency of a hot set of records while merges walk every page range of the table,
+with merge pages going through the foreground frames and with the scan partition
+Run from the Tests directory: python merge_latency_benchmark.py
+'''
+import sys
+sys.path.append("..")
+
+from lstore.db import Database
+from lstore.query import Query
+from lstore.table import MergeRequest
+from lstore.bufferpool import BufferPool, SharedBufferPool
+from lstore.config import MAX_RECORD_PER_PAGE, MAX_RECORD_PER_PAGE_RANGE, MERGE_FRAME_ALLOCATION, NUM_HIDDEN_COLUMNS
+
+from random import randint, seed
+from time import perf_counter
+import shutil
+
+NUM_PAGE_RANGES = 6
+NUM_RECORDS = MAX_RECORD_PER_PAGE_RANGE * NUM_PAGE_RANGES
+NUM_UPDATES = 10000
+NUM_HOT_KEYS = MAX_RECORD_PER_PAGE
+NUM_MERGE_ROUNDS = 2
+FOREGROUND_FRAMES_PER_COLUMN = 32
+BENCHMARK_PATH = "MergeLatencyBenchmark"
+
+
+def percentile(latencies, fraction):
+    return sorted(latencies)[int(len(latencies) * fraction)]
+
+
+def run(scan_frames_per_column):
+    seed(165)
+    db = Database()
+    db.open(BENCHMARK_PATH)
+    grades_table = db.create_table('Grades', 5, 0)
+    total_columns = grades_table.num_columns + NUM_HIDDEN_COLUMNS
+    num_scan_frames = scan_frames_per_column * total_columns
+    shared_bufferpool = SharedBufferPool(FOREGROUND_FRAMES_PER_COLUMN * total_columns + num_scan_frames, num_scan_frames=num_scan_frames)
+    grades_table.bufferpool = BufferPool(grades_table.table_path, grades_table.num_columns, shared_bufferpool=shared_bufferpool)
+    # Only the merge rounds below run while the hot records are selected
+    grades_table.merge_scheduler.enabled = False
+    query = Query(grades_table)
+
+    for key in range(NUM_RECORDS):
+        query.insert(key, randint(0, 100), randint(0, 100), randint(0, 100), randint(0, 100))
+    # Hot records are never updated so the merges only touch the pages of the other records
+    for _ in range(NUM_UPDATES):
+        query.update(randint(NUM_HOT_KEYS, NUM_RECORDS - 1), None, randint(0, 100), None, None, None)
+    grades_table.merge_queue.join()
+
+    for key in range(NUM_HOT_KEYS):
+        query.select(key, 0, [1] * 5)
+
+    for _ in range(NUM_MERGE_ROUNDS):
+        for page_range_index in range(NUM_PAGE_RANGES):
+            grades_table.merge_queue.put(MergeRequest(page_range_index))
+
+    latencies = []
+    time_0 = perf_counter()
+    while grades_table.merge_queue.unfinished_tasks > 0:
+        key = randint(0, NUM_HOT_KEYS - 1)
+        select_time = perf_counter()
+        query.select(key, 0, [1] * 5)
+        latencies.append(perf_counter() - select_time)
+    merge_time = perf_counter() - time_0
+
+    grades_table.bufferpool.close()
+    shared_bufferpool.close()
+    # The merge thread of the table can still be writing pages
+    shutil.rmtree(BENCHMARK_PATH, ignore_errors=True)
+    return latencies, merge_time
+
+
+if __name__ == '__main__':
+    shutil.rmtree(BENCHMARK_PATH, ignore_errors=True)
+    for scan_frames_per_column in [0, MERGE_FRAME_ALLOCATION]:
+        latencies, merge_time = run(scan_frames_per_column)
+        print(f"{scan_frames_per_column} scan frames per column:\t{len(latencies)} selects during {merge_time:.2f}s of merges\t"
+              f"p50 {percentile(latencies, 0.5) * 1e6:.0f}us\tp99 {percentile(latencies, 0.99) * 1e6:.0f}us")
@@ -0,0 +1,189 @@
+import sys
+sys.path.append("..")
+import unittest
+import shutil
+import tempfile
+
+from lstore.db import Database
+from lstore.query import Query
+from lstore.page_range import MergeRequest
+from lstore.merge_scheduler import MergeScheduler, MergeQueue
+from lstore.config import MAX_RECORD_PER_PAGE_RANGE, NUM_HIDDEN_COLUMNS
+
+
+class TestMergeQueue(unittest.TestCase):
+
+    def test_duplicate_requests_coalesce(self):
+        merge_queue = MergeQueue()
+        self.assertTrue(merge_queue.put(MergeRequest(0)))
+        self.assertTrue(merge_queue.put(MergeRequest(1)))
+        self.assertFalse(merge_queue.put(MergeRequest(0)))
+        self.assertEqual(merge_queue.coalesced_requests, 1)
+        self.assertEqual(merge_queue.get_backlog(), (2, 0))
+
+        # A page range taken by a worker can be queued again
+        self.assertEqual(merge_queue.get().page_range_index, 0)
+        self.assertEqual(merge_queue.get_backlog(), (1, 1))
+        self.assertTrue(merge_queue.put(MergeRequest(0)))
+        self.assertEqual(merge_queue.get_queued_page_ranges(), {0, 1})
+
+
+class TestMergeScheduler(unittest.TestCase):
+
+    def setUp(self):
+        self.scheduler = MergeScheduler(MergeQueue(), min_updates=10, max_updates=100, busy_ops_per_second=0, interval=0)
+
+    def update(self, page_range_index, num_updates):
+        for _ in range(num_updates):
+            self.scheduler.record_update(page_range_index)
+
+    def read(self, page_range_index, num_reads, tail_hops):
+        for _ in range(num_reads):
+            self.scheduler.record_read(page_range_index, tail_hops)
+
+    def test_unread_page_ranges_wait_for_max_updates(self):
+        self.update(0, 50)
+        self.assertIsNone(self.scheduler.next_merge())
+
+        self.update(0, 50)
+        self.assertEqual(self.scheduler.next_merge(), 0)
+        self.assertEqual(self.scheduler.get_stats()["forced_merges"], 1)
+
+    def test_read_hot_page_range_goes_first(self):
+        self.update(0, 20)
+        self.update(1, 20)
+        self.read(0, 10, 1)
+        self.read(1, 10, 3)
+        self.assertEqual(self.scheduler.next_merge(), 1)
+
+        # Reads that never walk a tail chain gain nothing from a merge
+        self.update(2, 20)
+        self.read(2, 100, 0)
+        self.scheduler.merge_started(1)
+        self.assertEqual(self.scheduler.next_merge(), 0)
+
+    def test_busy_foreground_only_runs_forced_merges(self):
+        self.scheduler.busy_ops_per_second = 1
+        self.update(0, 20)
+        self.read(0, 10, 2)
+        self.assertIsNone(self.scheduler.next_merge())
+        self.assertTrue(self.scheduler.get_stats()["throttled"])
+        self.assertEqual(self.scheduler.get_stats()["throttled_rounds"], 1)
+
+        self.update(1, 100)
+        self.assertEqual(self.scheduler.next_merge(), 1)
+
+    def test_page_ranges_being_merged_are_skipped(self):
+        self.update(0, 100)
+        self.update(1, 100)
+        self.scheduler.merge_started(0)
+        self.update(0, 100)
+        self.assertEqual(self.scheduler.next_merge(), 1)
+        self.assertIsNone(self.scheduler.next_merge(exclude={1}))
+
+        self.scheduler.merge_finished(0)
+        self.assertEqual(self.scheduler.next_merge(exclude={1}), 0)
+
+    def test_merge_started_resets_page_range(self):
+        self.update(0, 20)
+        self.read(0, 4, 5)
+        page_range_stats = self.scheduler.get_stats()["page_ranges"][0]
+        self.assertEqual(page_range_stats["tail_hops"], 20)
+        self.assertEqual(page_range_stats["read_amplification"], 5)
+
+        self.scheduler.merge_started(0)
+        self.assertIsNone(self.scheduler.next_merge())
+        self.assertEqual(self.scheduler.get_stats()["page_ranges"][0]["updates"], 0)
+        self.assertEqual(self.scheduler.get_stats()["merges_started"], 1)
+
+
+class TestMergeSchedulerTable(unittest.TestCase):
+
+    def setUp(self):
+        self.db = Database()
+        self.db.open(tempfile.mkdtemp())
+        self.table = self.db.create_table('Grades', 3, 0)
+        self.table.merge_scheduler.enabled = False
+        self.query = Query(self.table)
+        for key in range(1000):
+            self.query.insert(key, key, key)
+
+    def tearDown(self):
+        self.table.merge_scheduler.close()
+        self.table.bufferpool.close()
+        shutil.rmtree(self.db.path)
+
+    def select_tail_hops(self, keys):
+        tail_hops = self.table.merge_stats()["page_ranges"][0]["tail_hops"]
+        for key in keys:
+            self.assertEqual(self.query.select(key, 0, [1, 1, 1])[0].columns[1], key + 3)
+        return self.table.merge_stats()["page_ranges"][0]["tail_hops"] - tail_hops
+
+    def test_merge_shortens_tail_walks(self):
+        for key in range(100):
+            for value in range(1, 4):
+                self.assertTrue(self.query.update(key, None, key + value, None))
+        self.assertEqual(self.table.merge_stats()["page_ranges"][0]["updates"], 300)
+        self.assertEqual(self.select_tail_hops(range(100)), 100)
+
+        self.table.merge_queue.put(MergeRequest(0))
+        self.table.merge_queue.join()
+        self.assertEqual(self.table.merge_stats()["page_ranges"][0]["updates"], 0)
+
+        # The latest values are in the merged base page
+        self.assertEqual(self.select_tail_hops(range(100)), 0)
+
+        # Only the tail records written after the merge are walked, once for each updated column they are searched for
+        for key in range(0, 100, 2):
+            self.assertTrue(self.query.update(key, None, None, -key))
+        self.assertEqual(self.select_tail_hops(range(100)), 50 * 2)
+
+    def test_scheduler_merges_read_hot_page_range(self):
+        for value in range(2, 4):
+            for key in range(1000):
+                self.query.update(key, None, key + value, None)
+        self.table.merge_scheduler.enabled = True
+        self.table.merge_scheduler.busy_ops_per_second = 0
+        for _ in range(200):
+            self.select_tail_hops(range(50))
+            if (self.table.merge_stats()["merges_started"] > 0):
+                break
+        self.table.merge_queue.join()
+        self.assertGreater(self.table.merge_stats()["merges_started"], 0)
+        self.assertEqual(self.select_tail_hops(range(50)), 0)
+
+
+class TestMergeWorkers(unittest.TestCase):
+
+    def test_workers_merge_page_ranges_concurrently(self):
+        db = Database()
+        db.open(tempfile.mkdtemp())
+        table = db.create_table('Grades', 3, 0, merge_workers=3)
+        table.merge_scheduler.enabled = False
+        query = Query(table)
+        num_records = MAX_RECORD_PER_PAGE_RANGE * 2 + 100
+        for key in range(num_records):
+            query.insert(key, key, key)
+        for key in range(0, num_records, 7):
+            self.assertTrue(query.update(key, None, -key, None))
+
+        for page_range_index in range(3):
+            table.merge_queue.put(MergeRequest(page_range_index))
+        table.merge_queue.join()
+        self.assertEqual(table.merge_stats()["merges_started"], 3)
+        self.assertEqual(table.merge_stats()["backlog"], 0)
+
+        for key in range(0, num_records, 7):
+            page_range_index, page_index, page_slot = table.get_base_record_location(key)
+            with table.read_base_page(page_range_index, page_index) as base_page:
+                with table.bufferpool.pin(page_range_index, NUM_HIDDEN_COLUMNS + 1, base_page.page_indexes[1]) as page:
+                    self.assertEqual(page.read(page_slot), -key)
+        self.assertEqual(table.merge_stats()["merge_workers"], 3)
+
+        table.merge_scheduler.close()
+        table.bufferpool.close()
+        shutil.rmtree(db.path)
+
+
+if __name__ == '__main__':
+    unittest.main()
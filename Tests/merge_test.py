@@ -0,0 +1,182 @@
+import sys
+sys.path.append("..")
+import unittest
+import shutil
+import tempfile
+import threading
+from random import Random
+
+from lstore.db import Database
+from lstore.query import Query
+from lstore.page_range import MergeRequest
+from lstore.table import Table
+from lstore.config import NUM_HIDDEN_COLUMNS, UPDATE_TIMESTAMP_COLUMN, TIMESTAMP_COLUMN, SCHEMA_ENCODING_COLUMN, MAX_RECORD_PER_PAGE_RANGE
+import json
+
+class TestMerge(unittest.TestCase):
+
+    def setUp(self):
+        self.db = Database()
+        self.db.open(tempfile.mkdtemp())
+        self.table = self.db.create_table('Grades', 3, 0)
+        self.table.merge_scheduler.enabled = False
+        self.query = Query(self.table)
+        self.latest_values = {}
+        for key in range(2000):
+            self.latest_values[key] = [key, key, key]
+            self.query.insert(key, key, key)
+
+    def tearDown(self):
+        self.table.bufferpool.close()
+        shutil.rmtree(self.db.path)
+
+    def read_slot(self, page_range_index, column, page_index, page_slot):
+        with self.table.bufferpool.pin(page_range_index, column, page_index) as page:
+            return page.read(page_slot)
+
+    def read_base_record(self, rid):
+        '''Returns the data columns and update timestamp held in the base pages of a record'''
+        page_range_index, page_index, page_slot = self.table.get_base_record_location(rid)
+        with self.table.read_base_page(page_range_index, page_index) as base_page:
+            columns = [self.read_slot(page_range_index, NUM_HIDDEN_COLUMNS + column, base_page.page_indexes[column], page_slot) for column in range(3)]
+        return columns, self.read_slot(page_range_index, UPDATE_TIMESTAMP_COLUMN, page_index, page_slot)
+
+    def update(self, key, column, value):
+        columns = [None, None, None]
+        columns[column] = value
+        self.assertTrue(self.query.update(key, *columns))
+        self.latest_values[key][column] = value
+
+    def merge(self):
+        self.table.merge_queue.put(MergeRequest(0))
+        self.table.merge_queue.join()
+
+    def test_merge_writes_latest_values(self):
+        for key in range(0, 2000, 3):
+            self.update(key, 1, key + 1)
+            self.update(key, 2, key + 2)
+            self.update(key, 1, key + 3)
+        self.merge()
+
+        for key in range(2000):
+            columns, _ = self.read_base_record(key)
+            self.assertEqual(columns, self.latest_values[key])
+
+    def test_merge_reads_columns_from_tail_schemas(self):
+        self.update(3, 2, 77)
+        self.update(3, 1, 99)
+
+        # A merge running during the second update can see its indirection with the schema encoding of the first
+        page_range_index, page_index, page_slot = self.table.get_base_record_location(self.table.index.locate(0, 3)[0])
+        base_schema = self.read_slot(page_range_index, SCHEMA_ENCODING_COLUMN, page_index, page_slot)
+        self.table.bufferpool.write_page_slot(page_range_index, SCHEMA_ENCODING_COLUMN, page_index, page_slot, 1 << 2)
+        self.merge()
+        self.table.bufferpool.write_page_slot(page_range_index, SCHEMA_ENCODING_COLUMN, page_index, page_slot, base_schema)
+
+        self.assertEqual(self.read_base_record(3)[0], [3, 99, 77])
+        self.assertEqual(self.query.select(3, 0, [1, 1, 1])[0].columns, [3, 99, 77])
+        self.merge()
+        self.assertEqual(self.query.select(3, 0, [1, 1, 1])[0].columns, [3, 99, 77])
+
+    def test_reads_during_concurrent_merges(self):
+        for table in (self.table, self.db.create_table('Cumulative', 3, 0, cumulative_updates=True)):
+            table.merge_scheduler.enabled = False
+            query = Query(table)
+            latest_values = {}
+            for key in range(2000):
+                latest_values[key] = [key, key, key]
+                if table is not self.table:
+                    query.insert(key, key, key)
+
+            # Merges run back to back while the records they merge are updated and read
+            stop = threading.Event()
+            def merge_loop():
+                while not stop.is_set():
+                    table.merge_queue.put(MergeRequest(0))
+                    table.merge_queue.join()
+            merger = threading.Thread(target=merge_loop)
+            switch_interval = sys.getswitchinterval()
+            sys.setswitchinterval(1e-6)
+            merger.start()
+            random = Random(17)
+            try:
+                for _ in range(3000):
+                    key = random.randrange(2000)
+                    columns = [None, None, None]
+                    columns[random.randint(1, 2)] = random.randint(-1000, 1000)
+                    self.assertTrue(query.update(key, *columns))
+                    latest_values[key] = [value if value is not None else latest_values[key][i] for i, value in enumerate(columns)]
+                    self.assertEqual(query.select(key, 0, [1, 1, 1])[0].columns, latest_values[key])
+            finally:
+                stop.set()
+                merger.join()
+                sys.setswitchinterval(switch_interval)
+
+            table.merge_queue.put(MergeRequest(0))
+            table.merge_queue.join()
+            for key in range(2000):
+                self.assertEqual(query.select(key, 0, [1, 1, 1])[0].columns, latest_values[key])
+            self.assertEqual(query.sum_version(0, 1999, 1, 0), sum(values[1] for values in latest_values.values()))
+
+    def test_repeated_merges(self):
+        for key in range(0, 2000, 2):
+            self.update(key, 1, -key)
+        self.merge()
+        _, first_merge_time = self.read_base_record(0)
+        self.assertGreater(first_merge_time, 0)
+        self.assertLessEqual(first_merge_time, self.table.page_ranges[0].tps)
+
+        for key in range(0, 2000, 4):
+            self.update(key, 2, key * 2)
+        self.merge()
+
+        for key in range(2000):
+            columns, merge_time = self.read_base_record(key)
+            self.assertEqual(columns, self.latest_values[key])
+            if (key % 4 == 0):
+                self.assertGreater(merge_time, first_merge_time)
+        self.assertEqual(self.query.select(4, 0, [1, 1, 1])[0].columns, [4, -4, 8])
+
+    def test_merge_swaps_base_page_versions(self):
+        page_range = self.table.page_ranges[0]
+        first_version = self.table.page_directory[(0, 0)]
+        for key in range(0, 1024, 2):
+            self.update(key, 1, -key)
+
+        # A reader holding the version of a base page keeps its pages while merges swap in new versions
+        held_version = page_range.acquire_base_page(0)
+        self.merge()
+        merged_version = self.table.page_directory[(0, 0)]
+        self.assertIsNot(merged_version, first_version)
+        self.assertEqual(merged_version.tps, max(self.table.page_ranges[0].read_tail_record_column(rid, TIMESTAMP_COLUMN) for rid in range(MAX_RECORD_PER_PAGE_RANGE, page_range.logical_rid_index)))
+        self.assertEqual(self.read_slot(0, NUM_HIDDEN_COLUMNS + 1, held_version.page_indexes[1], 2), 2)
+        self.assertIn(first_version, page_range.retired_versions)
+
+        page_range.release_base_page(held_version)
+        self.assertEqual(page_range.reclaim_base_pages(), 1)
+        self.assertEqual(page_range.free_page_indexes[NUM_HIDDEN_COLUMNS + 1], [0])
+
+        # The next merge reuses the reclaimed pages
+        for key in range(0, 1024, 2):
+            self.update(key, 2, key)
+        self.merge()
+        self.assertEqual(self.table.page_directory[(0, 0)].page_indexes, first_version.page_indexes)
+        for key in range(1024):
+            self.assertEqual(self.read_base_record(key)[0], self.latest_values[key])
+
+    def test_page_directory_round_trip(self):
+        for key in range(0, 2000, 5):
+            self.update(key, 2, -key)
+        self.merge()
+
+        table = Table(self.table.name, self.table.num_columns, self.table.key, self.db.path, self.db.lock_manager, shared_bufferpool=self.table.bufferpool.shared_bufferpool)
+        table.deserialize(json.loads(json.dumps(self.table.serialize())))
+        self.assertEqual(table.page_directory.keys(), self.table.page_directory.keys())
+        for directory_key, version in self.table.page_directory.items():
+            self.assertEqual(table.page_directory[directory_key].page_indexes, version.page_indexes)
+            self.assertEqual(table.page_directory[directory_key].tps, version.tps)
+        self.assertEqual(table.page_ranges[0].next_page_index, self.table.page_ranges[0].next_page_index)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+'''
+Measures how long the merge workers of a table take to drain a backlog of merges, with 1, 2, 4 and 8 workers:
+a table is loaded with updates while merges are held back, then every page range is queued at once
+Run from the Tests directory: python merge_workers_benchmark.py
+'''
+import sys
+sys.path.append("..")
+
+from lstore.db import Database
+from lstore.query import Query
+from lstore.page_range import MergeRequest
+from lstore.config import MAX_RECORD_PER_PAGE_RANGE
+
+from random import randint, seed
+from time import perf_counter
+import shutil
+
+NUM_PAGE_RANGES = 8
+NUM_RECORDS = MAX_RECORD_PER_PAGE_RANGE * NUM_PAGE_RANGES
+NUM_UPDATES = 50000
+NUM_COLUMNS = 5
+WORKER_COUNTS = [1, 2, 4, 8]
+BENCHMARK_PATH = "MergeWorkersBenchmark"
+
+
+def run(merge_workers):
+    '''Returns the seconds taken to drain the merge backlog and the most merges seen waiting or running'''
+    shutil.rmtree(BENCHMARK_PATH, ignore_errors=True)
+    seed(165)
+    db = Database()
+    db.open(BENCHMARK_PATH)
+    grades_table = db.create_table('Grades', NUM_COLUMNS, 0, merge_workers=merge_workers)
+    grades_table.merge_scheduler.enabled = False
+    query = Query(grades_table)
+
+    for key in range(NUM_RECORDS):
+        query.insert(key, *[randint(0, 100) for _ in range(NUM_COLUMNS - 1)])
+    for _ in range(NUM_UPDATES):
+        columns = [None] * NUM_COLUMNS
+        columns[randint(1, NUM_COLUMNS - 1)] = randint(0, 100)
+        query.update(randint(0, NUM_RECORDS - 1), *columns)
+
+    time_0 = perf_counter()
+    for page_range_index in range(NUM_PAGE_RANGES):
+        grades_table.merge_queue.put(MergeRequest(page_range_index))
+    max_backlog = grades_table.merge_stats()["backlog"]
+    grades_table.merge_queue.join()
+    elapsed = perf_counter() - time_0
+
+    grades_table.merge_scheduler.close()
+    grades_table.bufferpool.close()
+    shutil.rmtree(BENCHMARK_PATH, ignore_errors=True)
+    return elapsed, max_backlog
+
+
+if __name__ == '__main__':
+    print(f"draining {NUM_PAGE_RANGES} page range merges after {NUM_UPDATES} updates")
+    baseline = None
+    for merge_workers in WORKER_COUNTS:
+        elapsed, max_backlog = run(merge_workers)
+        baseline = elapsed if baseline is None else baseline
+        print(f"{merge_workers} workers:\tbacklog {max_backlog}\tdrained in {elapsed:.3f}s\t{NUM_RECORDS / elapsed:,.0f} records/s\tspeedup {baseline / elapsed:.2f}x")
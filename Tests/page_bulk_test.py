@@ -0,0 +1,56 @@
+import sys
+sys.path.append("..")
+import unittest
+import shutil
+import tempfile
+from random import randint, sample, seed
+
+from lstore.page import Page
+from lstore.bufferpool import BufferPool
+from lstore.config import MAX_RECORD_PER_PAGE
+
+class TestPageBulk(unittest.TestCase):
+
+    def setUp(self):
+        seed(165)
+        self.values = [randint(-1000, 1000) for _ in range(MAX_RECORD_PER_PAGE)]
+
+    def test_page_bulk_api(self):
+        '''Bulk reads and writes match writing one slot at a time'''
+        page = Page()
+        first_slot = page.append_many(self.values[:100])
+        self.assertEqual(first_slot, 0)
+        self.assertEqual(page.append_many(self.values[100:]), 100)
+        self.assertFalse(page.has_capacity())
+        self.assertRaises(ValueError, page.append_many, [1])
+
+        self.assertEqual(page.read_all(), self.values)
+
+        slots = sample(range(MAX_RECORD_PER_PAGE), 50)
+        self.assertEqual(page.get_many(slots), [self.values[slot] for slot in slots])
+
+        page.write_many(slots, range(50))
+        for i, slot in enumerate(slots):
+            self.assertEqual(page.get(slot), i)
+
+    def test_bufferpool_batch_api(self):
+        '''Batch entry points leave every frame unpinned and survive eviction'''
+        table_path = tempfile.mkdtemp()
+        bufferpool = BufferPool(table_path, 1)
+
+        slots = list(range(MAX_RECORD_PER_PAGE))
+        self.assertTrue(bufferpool.write_page_slots(0, 0, 0, slots, self.values))
+        self.assertEqual(bufferpool.read_full_page(0, 0, 0), self.values)
+        self.assertEqual(bufferpool.read_page_slots(0, 0, 0, [3, 1, 2]), [self.values[3], self.values[1], self.values[2]])
+
+        frame_num = bufferpool.get_page_frame_num(0, 0, 0)
+        self.assertEqual(bufferpool.frames[frame_num].pin.count, 0)
+
+        bufferpool.unload_all_frames()
+        self.assertEqual(bufferpool.read_full_page(0, 0, 0), self.values)
+
+        shutil.rmtree(table_path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+'''
+Compares page load (buffer pool miss) and evict (dirty write back) throughput
+between the legacy JSON+zlib+base64 page files and the binary page format
+Run from the Tests directory: python page_format_benchmark.py
+'''
+import sys
+sys.path.append("..")
+
+from lstore.bufferpool import Frame
+from lstore.page import Page
+from lstore.config import MAX_RECORD_PER_PAGE
+
+from random import randint, seed
+from time import perf_counter
+import json
+import os
+import shutil
+
+NUM_PAGES = 2000
+BENCHMARK_PATH = "PageFormatBenchmark"
+
+
+def legacy_unload(page:Page, page_path):
+    '''The page write back used before the binary page format'''
+    with open(page_path, "w", encoding="utf-8") as page_json_file:
+        json.dump(page.serialize(), page_json_file)
+
+
+def legacy_load(page_path) -> Page:
+    '''The page load used before the binary page format'''
+    page = Page()
+    with open(page_path, "r", encoding="utf-8") as page_file:
+        page.deserialize(json.load(page_file))
+    return page
+
+
+def binary_unload(frame:Frame, page:Page, page_path):
+    frame.page = page
+    frame.page_path = page_path
+    frame.dirty = True
+    frame.unload_page()
+
+
+def binary_load(frame:Frame, page_path):
+    frame.load_page(page_path)
+    frame.page = None
+    frame.page_path = None
+
+
+if __name__ == '__main__':
+    seed(165)
+    os.makedirs(BENCHMARK_PATH, exist_ok=True)
+
+    pages = []
+    for _ in range(NUM_PAGES):
+        page = Page()
+        for _ in range(MAX_RECORD_PER_PAGE):
+            page.write(randint(0, 1000000))
+        pages.append(page)
+
+    json_paths = [os.path.join(BENCHMARK_PATH, f"Page_json_{i}.bin") for i in range(NUM_PAGES)]
+    binary_paths = [os.path.join(BENCHMARK_PATH, f"Page_binary_{i}.bin") for i in range(NUM_PAGES)]
+    frame = Frame()
+
+    time_0 = perf_counter()
+    for page, page_path in zip(pages, json_paths):
+        legacy_unload(page, page_path)
+    json_evict_time = perf_counter() - time_0
+
+    time_0 = perf_counter()
+    for page_path in json_paths:
+        legacy_load(page_path)
+    json_load_time = perf_counter() - time_0
+
+    time_0 = perf_counter()
+    for page, page_path in zip(pages, binary_paths):
+        binary_unload(frame, page, page_path)
+    binary_evict_time = perf_counter() - time_0
+
+    time_0 = perf_counter()
+    for page_path in binary_paths:
+        binary_load(frame, page_path)
+    binary_load_time = perf_counter() - time_0
+
+    print(f"JSON evict {NUM_PAGES} pages:  \t{NUM_PAGES / json_evict_time:,.0f} pages/s")
+    print(f"Binary evict {NUM_PAGES} pages:\t{NUM_PAGES / binary_evict_time:,.0f} pages/s")
+    print(f"JSON load {NUM_PAGES} pages:   \t{NUM_PAGES / json_load_time:,.0f} pages/s")
+    print(f"Binary load {NUM_PAGES} pages: \t{NUM_PAGES / binary_load_time:,.0f} pages/s")
+
+    shutil.rmtree(BENCHMARK_PATH)
@@ -0,0 +1,76 @@
+import sys
+sys.path.append("..")
+import unittest
+import shutil
+import tempfile
+
+from lstore.bufferpool import BufferPool, SharedBufferPool
+from lstore.db import Database
+from lstore.query import Query
+from lstore.transaction import Transaction
+
+class TestPinDebug(unittest.TestCase):
+
+    def setUp(self):
+        self.table_path = tempfile.mkdtemp()
+        self.shared_bufferpool = SharedBufferPool(4, num_shards=1, flush_rate=0, prefetch_threads=0, pin_debug=True)
+        self.bufferpool = BufferPool(self.table_path, 0, shared_bufferpool=self.shared_bufferpool)
+
+    def tearDown(self):
+        self.bufferpool.close()
+        self.shared_bufferpool.close()
+        shutil.rmtree(self.table_path)
+
+    def test_leaked_pin_is_reported(self):
+        self.bufferpool.read_page_slot(0, 0, 0, 0)
+        with self.bufferpool.pin(0, 0, 1) as page:
+            page.write(0, 1)
+
+        report = self.bufferpool.pin_report(min_seconds=0)
+        self.assertEqual(report["pinned_frames"], 1)
+        self.assertEqual(report["lost_frames"], 1)
+        self.assertEqual(report["lost_capacity"], 0.25)
+        self.assertEqual(report["long_pins"][0]["page"], (0, 0, 0))
+        self.assertIn("pin_debug_test.py", report["long_pins"][0]["call_site"])
+        with self.assertRaises(AssertionError):
+            self.bufferpool.assert_pins_released()
+
+        self.bufferpool.mark_frame_used(self.bufferpool.get_page_frame_num(0, 0, 0))
+        self.assertEqual(self.bufferpool.pin_report(min_seconds=0)["long_pins"], [])
+        self.bufferpool.assert_pins_released()
+
+    def test_allocation_error_names_pins(self):
+        handles = [self.bufferpool.pin(0, 0, page_index) for page_index in range(4)]
+        with self.assertRaisesRegex(MemoryError, "pin_debug_test.py"):
+            self.bufferpool.pin(0, 0, 4)
+        for handle in handles:
+            handle.unpin()
+        self.assertEqual(self.bufferpool.pin_report(min_seconds=0)["long_pins"], [])
+
+    def test_pin_debug_off(self):
+        self.bufferpool.enable_pin_debug(False)
+        self.bufferpool.read_page_slot(0, 0, 0, 0)
+        self.bufferpool.assert_pins_released()
+        self.assertEqual(self.bufferpool.pin_report(min_seconds=0)["pinned_frames"], 1)
+        self.bufferpool.mark_frame_used(self.bufferpool.get_page_frame_num(0, 0, 0))
+
+    def test_transactions_release_their_pins(self):
+        db = Database()
+        db.open(tempfile.mkdtemp())
+        db.enable_pin_debug()
+        grades = db.create_table('Grades', 3, 0)
+        query = Query(grades)
+
+        transaction = Transaction()
+        for key in range(10):
+            transaction.add_query(query.insert, grades, key, key, key)
+        transaction.add_query(query.select, grades, 5, 0, [1, 1, 1])
+        self.assertTrue(transaction.run())
+        self.assertEqual(db.pin_report(min_seconds=0)["Grades"]["long_pins"], [])
+
+        grades.bufferpool.close()
+        shutil.rmtree(db.path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import sys
+sys.path.append("..")
+import unittest
+import threading
+import time
+from lstore.db import Database
+from lstore.query import Query
+from lstore.bufferpool import get_page_id, get_page_location
+from lstore.config import INDIRECTION_COLUMN
+from lstore.lock import PinCount
+
+class TestPinnedPageHandle(unittest.TestCase):
+
+    def setUp(self):
+        self.db = Database()
+        self.table = self.db.create_table('Grades', 5, 0)
+        self.query = Query(self.table)
+        for key in range(100):
+            self.query.insert(key, key, key, key, key)
+
+    def test_page_id_round_trip(self):
+        for location in [(0, 0, 0), (3, 9, 8), (1000, 7, 123456)]:
+            self.assertEqual(get_page_location(get_page_id(*location)), location)
+        self.assertNotEqual(get_page_id(0, 1, 0), get_page_id(1, 0, 0))
+
+    def test_handle_unpins_on_exit(self):
+        bufferpool = self.table.bufferpool
+        with bufferpool.pin(0, INDIRECTION_COLUMN, 0) as page:
+            frame = page.frame
+            self.assertEqual(frame.pin.count, 1)
+            page.write(5, 1234)
+            self.assertEqual(page.read(5), 1234)
+            self.assertEqual(page.read_many([5, 6]), [1234, 6])
+        self.assertEqual(frame.pin.count, 0)
+        self.assertEqual(bufferpool.read_slot(0, INDIRECTION_COLUMN, 0, 5), 1234)
+        self.assertEqual(frame.pin.count, 0)
+
+    def test_queries_leave_no_pins(self):
+        for key in range(0, 100, 2):
+            self.query.update(key, None, key + 1, None, None, None)
+        for key in range(100):
+            self.query.select(key, 0, [1, 1, 1, 1, 1])
+        self.query.sum(0, 99, 1)
+        self.table.index.create_index(2)
+
+        pinned_frames = [frame for frame in self.table.bufferpool.frames if frame.pin.count != 0]
+        self.assertEqual(pinned_frames, [])
+
+    def test_failed_update_leaves_no_pins(self):
+        def fail_update(rid, columns, previous_columns=None):
+            raise MemoryError("no frame for the tail page")
+        self.table.update_record = fail_update
+        with self.assertRaises(MemoryError):
+            self.query.update(3, None, 4, None, None, None)
+
+        pinned_frames = [frame for frame in self.table.bufferpool.frames if frame.pin.count != 0]
+        self.assertEqual(pinned_frames, [])
+
+    def test_await_unpinned(self):
+        pin = PinCount()
+        self.assertTrue(pin.await_unpinned(0))
+        pin.count_up()
+        pin.count_up()
+        self.assertFalse(pin.await_unpinned(0.01))
+
+        def unpin():
+            time.sleep(0.05)
+            pin.count_down()
+            pin.count_down()
+
+        thread = threading.Thread(target=unpin)
+        thread.start()
+        self.assertTrue(pin.await_unpinned(5))
+        self.assertEqual(pin.count, 0)
+        thread.join()
+
+
+if __name__ == '__main__':
+    unittest.main()
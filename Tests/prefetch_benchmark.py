@@ -0,0 +1,69 @@
+'''
+Measures range sums over a cold cache with and without prefetching:
+the bufferpool is emptied and the page files are dropped from the OS page cache before every sum
+Run from the Tests directory: python prefetch_benchmark.py
+'''
+import sys
+sys.path.append("..")
+
+from lstore.db import Database
+from lstore.query import Query
+from lstore.bufferpool import BufferPool, SharedBufferPool
+from lstore.config import MAX_NUM_FRAME, NUM_HIDDEN_COLUMNS, BUFFERPOOL_PREFETCH_THREADS
+
+from random import randint, seed
+from time import perf_counter
+import os
+import shutil
+
+NUM_RECORDS = 20000
+NUM_UPDATES = 5000
+NUM_SUMS = 5
+BENCHMARK_PATH = "PrefetchBenchmark"
+
+
+def drop_os_cache(path):
+    '''Asks the OS to forget the cached pages of every file under path'''
+    for directory, _, file_names in os.walk(path):
+        for file_name in file_names:
+            file_descriptor = os.open(os.path.join(directory, file_name), os.O_RDONLY)
+            os.fsync(file_descriptor)
+            os.posix_fadvise(file_descriptor, 0, 0, os.POSIX_FADV_DONTNEED)
+            os.close(file_descriptor)
+
+
+def run(prefetch_threads):
+    seed(165)
+    db = Database()
+    db.open(BENCHMARK_PATH)
+    grades_table = db.create_table('Grades', 5, 0)
+    num_frames = MAX_NUM_FRAME * (grades_table.num_columns + NUM_HIDDEN_COLUMNS)
+    grades_table.bufferpool = BufferPool(grades_table.table_path, grades_table.num_columns, shared_bufferpool=SharedBufferPool(num_frames, prefetch_threads=prefetch_threads))
+    query = Query(grades_table)
+
+    for key in range(NUM_RECORDS):
+        query.insert(key, randint(0, 100), randint(0, 100), randint(0, 100), randint(0, 100))
+    for _ in range(NUM_UPDATES):
+        query.update(randint(0, NUM_RECORDS - 1), None, randint(0, 100), None, None, None)
+
+    elapsed = 0
+    for _ in range(NUM_SUMS):
+        grades_table.bufferpool.unload_all_frames()
+        drop_os_cache(BENCHMARK_PATH)
+
+        time_0 = perf_counter()
+        query.sum(0, NUM_RECORDS - 1, 1)
+        elapsed += perf_counter() - time_0
+
+    prefetched_pages = grades_table.bufferpool.shared_bufferpool.prefetched_pages
+    grades_table.bufferpool.close()
+    # The merge thread of the table can still be writing pages
+    shutil.rmtree(BENCHMARK_PATH, ignore_errors=True)
+    return elapsed / NUM_SUMS, prefetched_pages
+
+
+if __name__ == '__main__':
+    shutil.rmtree(BENCHMARK_PATH, ignore_errors=True)
+    for prefetch_threads in [0, BUFFERPOOL_PREFETCH_THREADS]:
+        sum_time, prefetched_pages = run(prefetch_threads)
+        print(f"{prefetch_threads} prefetch threads:\tcold sum of {NUM_RECORDS} records {sum_time:.3f}s\t{prefetched_pages} pages prefetched")
@@ -0,0 +1,91 @@
+import sys
+sys.path.append("..")
+import unittest
+import shutil
+import tempfile
+import time
+
+from lstore.db import Database
+from lstore.query import Query
+from lstore.bufferpool import BufferPool, get_page_id
+from lstore.config import PAGE_FILE_STORAGE, SEGMENT_STORAGE, BUFFERPOOL_READ_AHEAD_PAGES
+
+def wait_for_prefetch(bufferpool:BufferPool):
+    for _ in range(200):
+        if (not bufferpool.shared_bufferpool.prefetching):
+            return
+        time.sleep(0.01)
+
+class TestPrefetch(unittest.TestCase):
+
+    def setUp(self):
+        self.table_path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.table_path)
+
+    def test_prefetch_loads_unpinned_pages(self):
+        for storage_engine in [PAGE_FILE_STORAGE, SEGMENT_STORAGE]:
+            bufferpool = BufferPool(self.table_path, 0, storage_engine)
+            for page_index in range(8):
+                bufferpool.write_page_slot(storage_engine == SEGMENT_STORAGE, 3, page_index, 0, page_index)
+            bufferpool.unload_all_frames()
+
+            # Pages 8 and 9 were never written so they are skipped
+            page_ids = [get_page_id(storage_engine == SEGMENT_STORAGE, 3, page_index) for page_index in range(10)]
+            self.assertEqual(bufferpool.prefetch(page_ids), 10)
+            wait_for_prefetch(bufferpool)
+
+            for page_index in range(8):
+                frame_num = bufferpool.get_page_frame_num(storage_engine == SEGMENT_STORAGE, 3, page_index)
+                self.assertIsNotNone(frame_num)
+                self.assertEqual(bufferpool.frames[frame_num].pin.count, 0)
+                self.assertEqual(bufferpool.frames[frame_num].page.get(0), page_index)
+            self.assertIsNone(bufferpool.get_page_frame_num(storage_engine == SEGMENT_STORAGE, 3, 8))
+            self.assertEqual(bufferpool.num_resident_frames, 8)
+
+            # Resident pages are not queued again
+            self.assertEqual(bufferpool.prefetch(page_ids[:8]), 0)
+            bufferpool.close()
+
+    def test_sequential_misses_read_ahead(self):
+        bufferpool = BufferPool(self.table_path, 0)
+        for page_index in range(16):
+            bufferpool.write_page_slot(0, 2, page_index, 0, page_index)
+        bufferpool.unload_all_frames()
+
+        for page_index in range(2):
+            with bufferpool.pin(0, 2, page_index) as page:
+                self.assertEqual(page.read(0), page_index)
+        wait_for_prefetch(bufferpool)
+
+        for page_index in range(2, 2 + BUFFERPOOL_READ_AHEAD_PAGES):
+            self.assertIsNotNone(bufferpool.get_page_frame_num(0, 2, page_index))
+        self.assertIsNone(bufferpool.get_page_frame_num(0, 2, 2 + BUFFERPOOL_READ_AHEAD_PAGES))
+
+        # Random misses don't read ahead
+        with bufferpool.pin(0, 2, 12) as page:
+            page.read(0)
+        wait_for_prefetch(bufferpool)
+        self.assertIsNone(bufferpool.get_page_frame_num(0, 2, 13))
+        bufferpool.close()
+
+    def test_cold_sum(self):
+        db = Database()
+        db.open(self.table_path)
+        grades = db.create_table('Grades', 5, 0)
+        query = Query(grades)
+        for key in range(3000):
+            query.insert(key, key * 2, 0, 0, 0)
+        for key in range(0, 3000, 3):
+            query.update(key, None, key, None, None, None)
+
+        grades.bufferpool.unload_all_frames()
+        expected = sum(key if key % 3 == 0 else key * 2 for key in range(3000))
+        self.assertEqual(query.sum(0, 2999, 1), expected)
+        self.assertGreater(grades.bufferpool.shared_bufferpool.prefetched_pages, 0)
+        grades.bufferpool.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
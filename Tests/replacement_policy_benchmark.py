@@ -0,0 +1,65 @@
+'''
+Compares bufferpool hit rate and throughput of each replacement policy on a skewed (Zipfian)
+page access pattern mixed with occasional sequential scans
+Run from the Tests directory: python replacement_policy_benchmark.py
+'''
+import sys
+sys.path.append("..")
+
+from lstore.bufferpool import BufferPool
+from lstore.config import LRU_POLICY, CLOCK_POLICY, TWO_QUEUE_POLICY
+
+from itertools import accumulate
+from random import choices, randrange, seed
+from time import perf_counter
+import shutil
+
+NUM_PAGES = 4000
+NUM_ACCESSES = 100000
+ZIPF_SKEW = 1.0
+SCAN_EVERY = 10000
+SCAN_LENGTH = 1000
+BENCHMARK_PATH = "ReplacementPolicyBenchmark"
+
+
+def zipf_trace():
+    '''Returns a list of page indexes, page i is accessed with probability proportional to 1 / (i + 1)^skew'''
+    cumulative_weights = list(accumulate(1 / ((i + 1) ** ZIPF_SKEW) for i in range(NUM_PAGES)))
+    trace = choices(range(NUM_PAGES), cum_weights=cumulative_weights, k=NUM_ACCESSES)
+
+    # Insert sequential scans over cold pages to show scan resistance
+    for scan_start in range(0, NUM_ACCESSES, SCAN_EVERY):
+        first_page = randrange(NUM_PAGES // 2, NUM_PAGES - SCAN_LENGTH)
+        trace[scan_start:scan_start + SCAN_LENGTH] = range(first_page, first_page + SCAN_LENGTH)
+    return trace
+
+
+def run(replacement_policy, trace):
+    bufferpool = BufferPool(BENCHMARK_PATH, 0, replacement_policy=replacement_policy)
+
+    # Create every page on disk first so misses always read a page file
+    for page_index in range(NUM_PAGES):
+        bufferpool.write_page_slot(0, 0, page_index, 0, page_index)
+    bufferpool.unload_all_frames()
+
+    hits = 0
+    time_0 = perf_counter()
+    for page_index in trace:
+        if bufferpool.get_page_frame_num(0, 0, page_index) is not None:
+            hits += 1
+        with bufferpool.pin(0, 0, page_index) as page:
+            page.read(0)
+    elapsed = perf_counter() - time_0
+
+    bufferpool.unload_all_frames()
+    shutil.rmtree(BENCHMARK_PATH)
+    return hits / len(trace), len(trace) / elapsed, bufferpool.num_frames
+
+
+if __name__ == '__main__':
+    seed(165)
+    trace = zipf_trace()
+
+    for replacement_policy in [LRU_POLICY, CLOCK_POLICY, TWO_QUEUE_POLICY]:
+        hit_rate, throughput, num_frames = run(replacement_policy, trace)
+        print(f"{replacement_policy}:\t{num_frames} frames\thit rate {hit_rate:.2%}\t{throughput:,.0f} accesses/s")
@@ -0,0 +1,98 @@
+import sys
+sys.path.append("..")
+import unittest
+import shutil
+import tempfile
+
+from lstore.replacement import LRUPolicy, ClockPolicy, TwoQueuePolicy
+from lstore.bufferpool import BufferPool
+from lstore.config import LRU_POLICY, CLOCK_POLICY, TWO_QUEUE_POLICY
+
+class VisitLog(dict):
+    '''Reference bits that record the frames they are read for'''
+    def __init__(self, referenced, visited):
+        super().__init__(referenced)
+        self.visited = visited
+
+    def __getitem__(self, frame_num):
+        self.visited.append(frame_num)
+        return super().__getitem__(frame_num)
+
+
+class TestReplacementPolicy(unittest.TestCase):
+
+    def test_lru_order(self):
+        policy = LRUPolicy(4)
+        for frame_num in range(4):
+            policy.insert(frame_num, frame_num)
+        policy.access(0)
+        policy.access(2)
+
+        self.assertEqual(policy.victim(lambda frame_num: True), 1)
+        # Pinned frames are skipped
+        self.assertEqual(policy.victim(lambda frame_num: frame_num != 1), 3)
+        self.assertIsNone(policy.victim(lambda frame_num: False))
+
+    def test_clock_second_chance(self):
+        policy = ClockPolicy(3)
+        for frame_num in range(3):
+            policy.insert(frame_num, frame_num)
+
+        # Every frame is referenced, the first sweep clears the bits and the second returns frame 0
+        self.assertEqual(policy.victim(lambda frame_num: True), 0)
+        policy.remove(0)
+        policy.access(1)
+        self.assertEqual(policy.victim(lambda frame_num: True), 2)
+        self.assertEqual(len(policy), 2)
+
+    def test_clock_coldest_walks_from_the_hand(self):
+        policy = ClockPolicy(6)
+        for frame_num in range(6):
+            policy.insert(frame_num, frame_num)
+        for frame_num in (1, 3, 4):
+            policy.referenced[frame_num] = False
+        policy.hand = 2
+
+        # Unreferenced frames in the order the hand reaches them, then the referenced ones
+        self.assertEqual(list(policy.coldest(6)), [3, 4, 1, 2, 5, 0])
+        self.assertEqual(list(policy.coldest(2)), [3, 4])
+
+        # Stopping early leaves the rest of the ring unvisited
+        visited = []
+        policy.referenced = VisitLog(policy.referenced, visited)
+        next(policy.coldest(6))
+        self.assertEqual(visited, [2, 3])
+
+    def test_two_queue_promotion(self):
+        policy = TwoQueuePolicy(8)
+        for frame_num in range(4):
+            policy.insert(frame_num, 100 + frame_num)
+
+        # A page evicted from A1in and loaded again goes to Am
+        victim = policy.victim(lambda frame_num: True)
+        self.assertEqual(victim, 0)
+        policy.remove(victim)
+        policy.insert(victim, 100)
+        self.assertIn(victim, policy.am)
+        self.assertEqual(len(policy), 4)
+
+    def test_bufferpool_policies(self):
+        '''Every policy keeps pages correct while evicting'''
+        for replacement_policy in [LRU_POLICY, CLOCK_POLICY, TWO_QUEUE_POLICY]:
+            table_path = tempfile.mkdtemp()
+            bufferpool = BufferPool(table_path, 0, replacement_policy=replacement_policy)
+            num_pages = bufferpool.num_frames * 3
+
+            for page_index in range(num_pages):
+                bufferpool.write_page_slot(0, 0, page_index, 0, page_index)
+            for page_index in reversed(range(num_pages)):
+                with bufferpool.pin(0, 0, page_index) as page:
+                    self.assertEqual(page.read(0), page_index)
+
+            bufferpool.unload_all_frames()
+            self.assertEqual(sum(len(shard.replacement_policy) for shard in bufferpool.shards), 0)
+            shutil.rmtree(table_path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import sys
+sys.path.append("..")
+import unittest
+import shutil
+import tempfile
+
+from lstore.bufferpool import BufferPool, SharedBufferPool
+
+class TestScanPartition(unittest.TestCase):
+
+    def setUp(self):
+        self.table_path = tempfile.mkdtemp()
+        self.bufferpool = BufferPool(self.table_path, 0, shared_bufferpool=SharedBufferPool(64, num_shards=4, prefetch_threads=0, num_scan_frames=8))
+
+    def tearDown(self):
+        self.bufferpool.close()
+        self.bufferpool.shared_bufferpool.close()
+        shutil.rmtree(self.table_path)
+
+    def test_scan_does_not_evict_foreground_pages(self):
+        hot_pages = range(32)
+        for page_index in hot_pages:
+            self.bufferpool.write_page_slot(0, 0, page_index, 0, page_index)
+
+        with self.bufferpool.scan_access():
+            for page_index in range(100, 300):
+                self.bufferpool.write_page_slot(0, 1, page_index, 0, page_index)
+
+        for page_index in hot_pages:
+            self.assertIsNotNone(self.bufferpool.get_page_frame_num(0, 0, page_index))
+        self.assertEqual(len(self.bufferpool.shared_bufferpool.scan_partition.replacement_policy), 8)
+
+        # Scan pages were written back when the partition recycled their frames
+        for page_index in range(100, 300):
+            with self.bufferpool.pin(0, 1, page_index) as page:
+                self.assertEqual(page.read(0), page_index)
+
+    def test_scan_hits_foreground_pages(self):
+        self.bufferpool.write_page_slot(0, 0, 0, 0, 165)
+        frame_num = self.bufferpool.get_page_frame_num(0, 0, 0)
+
+        with self.bufferpool.scan_access():
+            with self.bufferpool.pin(0, 0, 0) as page:
+                self.assertEqual(page.read(0), 165)
+        self.assertEqual(self.bufferpool.get_page_frame_num(0, 0, 0), frame_num)
+        self.assertEqual(len(self.bufferpool.shared_bufferpool.scan_partition.replacement_policy), 0)
+
+    def test_pinned_scan_partition_falls_back_to_foreground_frames(self):
+        with self.bufferpool.scan_access():
+            handles = [self.bufferpool.pin(0, 0, page_index) for page_index in range(12)]
+        for handle, page_index in zip(handles, range(12)):
+            handle.write(0, page_index)
+            handle.unpin()
+
+        self.assertEqual(len(self.bufferpool.shared_bufferpool.scan_partition.replacement_policy), 8)
+        self.assertEqual(self.bufferpool.num_resident_frames, 12)
+
+    def test_flush_and_unload_scan_frames(self):
+        with self.bufferpool.scan_access():
+            for page_index in range(8):
+                self.bufferpool.write_page_slot(0, 0, page_index, 0, page_index)
+
+        self.assertEqual(self.bufferpool.flush_dirty_frames(), 8)
+        self.bufferpool.unload_all_frames()
+
+        scan_partition = self.bufferpool.shared_bufferpool.scan_partition
+        self.assertEqual(len(scan_partition.replacement_policy), 0)
+        self.assertEqual(len(scan_partition.available_frames), 8)
+        for page_index in range(8):
+            with self.bufferpool.pin(0, 0, page_index) as page:
+                self.assertEqual(page.read(0), page_index)
+
+
+if __name__ == '__main__':
+    unittest.main()
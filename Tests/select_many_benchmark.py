@@ -0,0 +1,61 @@
+'''
+Compares reading batches of random keys with a loop of Query.select and with one Query.select_many per batch,
+before and after updating the records
+Run from the Tests directory: python select_many_benchmark.py
+'''
+import sys
+sys.path.append("..")
+
+from lstore.db import Database
+from lstore.query import Query
+
+from random import randint, sample, seed
+from time import perf_counter
+import shutil
+
+NUM_RECORDS = 20000
+NUM_BATCHES = 50
+BATCH_SIZE = 200
+BENCHMARK_PATH = "SelectManyBenchmark"
+
+
+def time_batches(query, batches):
+    time_0 = perf_counter()
+    for keys in batches:
+        for key in keys:
+            query.select(key, 0, [1] * 5)
+    looped = perf_counter() - time_0
+
+    time_0 = perf_counter()
+    for keys in batches:
+        query.select_many(keys, 0, [1] * 5)
+    batched = perf_counter() - time_0
+    num_keys = NUM_BATCHES * BATCH_SIZE
+    print(f"\tselect loop:\t{looped / num_keys * 1e6:.1f}us per key\n\tselect_many:\t{batched / num_keys * 1e6:.1f}us per key\t{looped / batched:.1f}x")
+
+
+if __name__ == '__main__':
+    shutil.rmtree(BENCHMARK_PATH, ignore_errors=True)
+    seed(165)
+    db = Database()
+    db.open(BENCHMARK_PATH)
+    grades_table = db.create_table('Grades', 5, 0)
+    grades_table.merge_scheduler.enabled = False
+    query = Query(grades_table)
+    query.insert_many((key, *(randint(0, 100) for _ in range(4))) for key in range(NUM_RECORDS))
+    batches = [sample(range(NUM_RECORDS), BATCH_SIZE) for _ in range(NUM_BATCHES)]
+
+    print(f"{NUM_BATCHES} batches of {BATCH_SIZE} keys out of {NUM_RECORDS} records")
+    print("records without updates")
+    time_batches(query, batches)
+
+    for _ in range(NUM_RECORDS):
+        columns = [None] * 5
+        columns[randint(1, 4)] = randint(0, 100)
+        query.update(randint(0, NUM_RECORDS - 1), *columns)
+    print("after an update per record")
+    time_batches(query, batches)
+
+    grades_table.merge_scheduler.close()
+    grades_table.bufferpool.close()
+    shutil.rmtree(BENCHMARK_PATH, ignore_errors=True)
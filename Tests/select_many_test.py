@@ -0,0 +1,97 @@
+import sys
+sys.path.append("..")
+import unittest
+import shutil
+import tempfile
+from random import Random
+
+from lstore.db import Database
+from lstore.query import Query
+from lstore.page_range import MergeRequest
+from lstore.config import MAX_RECORD_PER_PAGE
+
+NUM_RECORDS = 3000
+
+
+class TestSelectMany(unittest.TestCase):
+
+    def setUp(self):
+        self.db = Database()
+        self.db.open(tempfile.mkdtemp())
+        self.table = self.db.create_table('Grades', 4, 0)
+        self.table.merge_scheduler.enabled = False
+        self.query = Query(self.table)
+        self.random = Random(165)
+        for key in range(NUM_RECORDS):
+            self.query.insert(key, key % 7, key, -key)
+
+    def tearDown(self):
+        self.table.merge_scheduler.close()
+        self.table.bufferpool.close()
+        shutil.rmtree(self.db.path)
+
+    def update_random_records(self, num_updates):
+        for _ in range(num_updates):
+            columns = [None] * 4
+            columns[self.random.randint(1, 3)] = self.random.randint(-100, 100)
+            self.query.update(self.random.randrange(NUM_RECORDS), *columns)
+
+    def assert_matches_select(self, query, keys, search_key_index, projected_columns_index, relative_version=0):
+        results = query.select_many(keys, search_key_index, projected_columns_index, relative_version)
+        self.assertEqual(len(results), len(keys))
+        for key, records in zip(keys, results):
+            expected = query.select_version(key, search_key_index, projected_columns_index, relative_version)
+            self.assertEqual([(record.rid, record.columns) for record in records], [(record.rid, record.columns) for record in expected])
+
+    def test_results_follow_request_order(self):
+        keys = self.random.sample(range(NUM_RECORDS), 500) + [-1, 5, 5]
+        results = self.query.select_many(keys, 0, [1, 1, 1, 1])
+        self.assertEqual(results[-3], [])
+        self.assertEqual([records[0].columns[0] for records in results if records], keys[:500] + [5, 5])
+        self.assert_matches_select(self.query, keys, 0, [1, 0, 1, 1])
+
+    def test_updated_and_merged_records(self):
+        self.update_random_records(2000)
+        keys = self.random.sample(range(NUM_RECORDS), 400)
+        for relative_version in (0, -1, -3):
+            self.assert_matches_select(self.query, keys, 0, [1, 1, 1, 1], relative_version)
+
+        self.table.merge_queue.put(MergeRequest(0))
+        self.table.merge_queue.join()
+        self.update_random_records(500)
+        self.assert_matches_select(self.query, keys, 0, [0, 1, 1, 1])
+        self.assert_matches_select(self.query, keys, 0, [1, 1, 1, 1], -2)
+
+    def test_secondary_search_keys(self):
+        self.update_random_records(500)
+        self.assert_matches_select(self.query, [3, 0, 6, 100], 1, [1, 1, 1, 1])
+        self.assertFalse(self.table.index.exist_index(1))
+        self.table.index.create_index(1)
+        self.assert_matches_select(self.query, [3, 0, 6, 100], 1, [1, 1, 1, 1])
+
+    def test_cumulative_updates(self):
+        table = self.db.create_table('Cumulative', 4, 0, cumulative_updates=True)
+        table.merge_scheduler.enabled = False
+        query = Query(table)
+        for key in range(500):
+            query.insert(key, key, key, key)
+        for key in range(0, 500, 3):
+            query.update(key, None, -key, None, None)
+            query.update(key, None, None, None, key * 2)
+        self.assert_matches_select(query, list(range(500)), 0, [1, 1, 1, 1])
+        table.merge_scheduler.close()
+
+    def test_base_pages_are_read_once(self):
+        self.table.bufferpool.enable_stats()
+        # The first read of a base page version loads its merge times
+        self.query.select(0, 0, [1, 1, 1, 1])
+        keys = list(range(MAX_RECORD_PER_PAGE - 1, -1, -2))
+        stats = self.table.bufferpool.stats()
+        self.query.select_many(keys, 0, [1, 1, 1, 1])
+        after = self.table.bufferpool.stats()
+        # indirection, schema encoding and timestamp and the 4 data columns of one base page
+        self.assertEqual(after["hits"] + after["misses"] - stats["hits"] - stats["misses"], 7)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+import sys
+sys.path.append("..")
+import unittest
+import shutil
+import tempfile
+import os
+
+from lstore.db import Database
+from lstore.query import Query
+from lstore.bufferpool import BufferPool, SharedBufferPool
+from lstore.config import PAGE_SIZE
+
+class TestSharedBufferPool(unittest.TestCase):
+
+    def setUp(self):
+        self.db_path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.db_path)
+
+    def test_tables_share_frames(self):
+        shared_bufferpool = SharedBufferPool(32, num_shards=4, prefetch_threads=0)
+        bufferpool_a = BufferPool(os.path.join(self.db_path, "A"), 0, shared_bufferpool=shared_bufferpool)
+        bufferpool_b = BufferPool(os.path.join(self.db_path, "B"), 0, shared_bufferpool=shared_bufferpool)
+
+        # Same page location in both tables holds different pages
+        bufferpool_a.write_page_slot(0, 0, 0, 0, 111)
+        bufferpool_b.write_page_slot(0, 0, 0, 0, 222)
+        with bufferpool_a.pin(0, 0, 0) as page:
+            self.assertEqual(page.read(0), 111)
+        with bufferpool_b.pin(0, 0, 0) as page:
+            self.assertEqual(page.read(0), 222)
+        shared_bufferpool.close()
+
+        # A busy table can use every frame
+        for page_index in range(64):
+            bufferpool_a.write_page_slot(0, 0, page_index, 0, page_index)
+        self.assertEqual(bufferpool_a.num_resident_frames + bufferpool_b.num_resident_frames, 32)
+
+        bufferpool_a.unload_all_frames()
+        self.assertEqual(bufferpool_a.num_resident_frames, 0)
+        with bufferpool_b.pin(0, 0, 0) as page:
+            self.assertEqual(page.read(0), 222)
+        shared_bufferpool.close()
+
+    def test_table_shares(self):
+        shared_bufferpool = SharedBufferPool(32, num_shards=4, prefetch_threads=0)
+        bufferpool_a = BufferPool(os.path.join(self.db_path, "A"), 0, shared_bufferpool=shared_bufferpool)
+        bufferpool_b = BufferPool(os.path.join(self.db_path, "B"), 0, shared_bufferpool=shared_bufferpool)
+        bufferpool_a.set_share(min_frames=8)
+        bufferpool_b.set_share(max_frames=16)
+
+        for page_index in range(8):
+            bufferpool_a.write_page_slot(0, 0, page_index, 0, page_index)
+        for page_index in range(100):
+            bufferpool_b.write_page_slot(0, 0, page_index, 0, page_index)
+
+        self.assertEqual(bufferpool_a.num_resident_frames, 8)
+        self.assertLessEqual(bufferpool_b.num_resident_frames, 16)
+
+        # Without the maximum table B takes every frame above table A's minimum
+        bufferpool_b.set_share()
+        for page_index in range(100):
+            bufferpool_b.write_page_slot(0, 0, page_index, 0, page_index)
+        self.assertEqual(bufferpool_a.num_resident_frames, 8)
+        self.assertEqual(bufferpool_b.num_resident_frames, 24)
+        shared_bufferpool.close()
+
+    def test_database_budget(self):
+        db = Database(bufferpool_size=64 * PAGE_SIZE)
+        db.open(self.db_path)
+        grades = db.create_table('Grades', 5, 0)
+        scores = db.create_table('Scores', 3, 0)
+        db.set_bufferpool_share('Scores', min_size=4 * PAGE_SIZE)
+
+        grades_query = Query(grades)
+        scores_query = Query(scores)
+        for key in range(2000):
+            grades_query.insert(key, key, key, key, key)
+            scores_query.insert(key, key + 1, key + 2)
+
+        usage = db.bufferpool_usage()
+        self.assertLessEqual(sum(usage.values()), 64 * PAGE_SIZE)
+        self.assertGreaterEqual(usage['Scores'], 4 * PAGE_SIZE)
+
+        for key in range(0, 2000, 7):
+            self.assertEqual(grades_query.select(key, 0, [1, 1, 1, 1, 1])[0].columns, [key] * 5)
+            self.assertEqual(scores_query.select(key, 0, [1, 1, 1])[0].columns, [key, key + 1, key + 2])
+
+        db.drop_table('Grades')
+        self.assertEqual(list(db.bufferpool_usage()), ['Scores'])
+        self.assertEqual(grades.bufferpool.num_resident_frames, 0)
+
+        # Closing the database shuts the shared bufferpool down, reopening it starts a new one
+        shared_bufferpool = db.shared_bufferpool
+        db.close()
+        self.assertIsNone(db.shared_bufferpool)
+        self.assertTrue(shared_bufferpool.flusher_stop.is_set())
+        db.open(self.db_path)
+        self.assertIsNotNone(db.shared_bufferpool)
+        self.assertEqual(Query(db.get_table('Scores')).select(7, 0, [1, 1, 1])[0].columns, [7, 8, 9])
+        db.close()
+
+    def test_table_ids_are_reused(self):
+        shared_bufferpool = SharedBufferPool(8, num_shards=1, prefetch_threads=0)
+        bufferpool_a = BufferPool(os.path.join(self.db_path, "A"), 0, shared_bufferpool=shared_bufferpool)
+        table_id = bufferpool_a.table_id
+        bufferpool_a.write_page_slot(0, 0, 0, 0, 111)
+        bufferpool_a.close()
+        bufferpool_a.close()
+
+        bufferpool_b = BufferPool(os.path.join(self.db_path, "B"), 0, shared_bufferpool=shared_bufferpool)
+        self.assertEqual(bufferpool_b.table_id, table_id)
+        self.assertEqual(bufferpool_b.read_page_slot(0, 0, 0, 0), 0)
+        bufferpool_c = BufferPool(os.path.join(self.db_path, "C"), 0, shared_bufferpool=shared_bufferpool)
+        self.assertNotEqual(bufferpool_c.table_id, table_id)
+
+        # More create and drop cycles than there are table ids
+        for _ in range(70000):
+            BufferPool(os.path.join(self.db_path, "D"), 0, shared_bufferpool=shared_bufferpool).close()
+        self.assertEqual(shared_bufferpool.next_table_id, 3)
+        shared_bufferpool.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import sys
+sys.path.append("..")
+import unittest
+import os
+import shutil
+from lstore.db import Database
+from lstore.query import Query
+from lstore.config import SEGMENT_STORAGE, MAX_RECORD_PER_PAGE, INITIAL_SEGMENT_PAGES
+from lstore.page import PAGE_FILE_SIZE
+
+class TestSegmentStorage(unittest.TestCase):
+
+    def setUp(self):
+        self.test_db_path = "segment_test_db"
+        self.db = Database()
+        self.db.open(self.test_db_path)
+
+    def tearDown(self):
+        if os.path.exists(self.test_db_path):
+            shutil.rmtree(self.test_db_path)
+
+    def test_segment_files(self):
+        '''Pages of a segment table are stored in one segment file per page range column'''
+        table = self.db.create_table("Grades", 3, 0, SEGMENT_STORAGE)
+        query = Query(table)
+
+        for key in range(MAX_RECORD_PER_PAGE * 2):
+            query.insert(key, key * 2, key * 3)
+
+        table.bufferpool.unload_all_frames()
+
+        page_range_path = os.path.join(table.table_path, "PageRange_0")
+        self.assertEqual(sorted(os.listdir(page_range_path)), sorted(f"Column_{i}.seg" for i in range(table.total_num_columns)))
+
+    def test_open_close_persistence(self):
+        '''Records written through memory mapped segments survive closing and reopening the database'''
+        table = self.db.create_table("Grades", 3, 0, SEGMENT_STORAGE)
+        query = Query(table)
+
+        for key in range(1000):
+            query.insert(key, key * 2, key * 3)
+        for key in range(0, 1000, 3):
+            query.update(key, None, key + 7, None)
+
+        self.db.close()
+
+        self.db = Database()
+        self.db.open(self.test_db_path)
+        table = self.db.get_table("Grades")
+        self.assertEqual(table.storage_engine, SEGMENT_STORAGE)
+
+        query = Query(table)
+        for key in range(1000):
+            expected_column = key + 7 if key % 3 == 0 else key * 2
+            record = query.select(key, 0, [1, 1, 1])[0]
+            self.assertEqual(record.columns, [key, expected_column, key * 3])
+
+        self.db.close()
+
+    def test_page_paths_come_from_the_storage_engine(self):
+        segment_table = self.db.create_table("Segments", 3, 0, SEGMENT_STORAGE)
+        page_file_table = self.db.create_table("PageFiles", 3, 0)
+        self.assertEqual(segment_table.bufferpool.get_page_path(0, 1, 2), os.path.join(segment_table.table_path, "PageRange_0", "Column_1.seg") + ":2")
+        self.assertEqual(page_file_table.bufferpool.get_page_path(0, 1, 2), page_file_table.bufferpool.storage.get_page_path(0, 1, 2))
+        self.db.close()
+
+    def test_close_releases_segments(self):
+        '''Closing the database closes every mapping and file of its segments, including mappings replaced by a grow'''
+        table = self.db.create_table("Grades", 3, 0, SEGMENT_STORAGE)
+        table.merge_scheduler.enabled = False
+        query = Query(table)
+        for key in range(1000):
+            query.insert(key, key, key)
+        # More tail records than the first size of a segment makes the tail columns grow
+        for update in range(MAX_RECORD_PER_PAGE * 9):
+            query.update(update % 1000, None, update, None)
+
+        segments = list(table.bufferpool.storage.segments.values())
+        self.assertTrue(any(segment.size > INITIAL_SEGMENT_PAGES * PAGE_FILE_SIZE for segment in segments))
+        self.db.close()
+
+        for segment in segments:
+            self.assertTrue(segment.segment_file.closed)
+            self.assertTrue(segment.segment_map.closed)
+            self.assertEqual(segment.retired_maps, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,11 @@
 import sys
 sys.path.append("..")
 import unittest
-from lstore.page import Page
+import json
+import os
+import tempfile
+from lstore.page import Page, PAGE_FILE_SIZE
+from lstore.bufferpool import Frame
 
 class TestPageSerializeDeserialize(unittest.TestCase):
 
@@ -34,6 +38,48 @@ class TestPageSerializeDeserialize(unittest.TestCase):
     for i, value in enumerate([1, 2, 3, 4, 5]):
       self.assertEqual(new_page.get(i), value)
 
+  def test_binary_round_trip(self):
+    '''Test that a page written in the binary format is read back unchanged'''
+    page = Page()
+    for value in [7, -3, 2**31 - 1, 0, 42]:
+      page.write(value)
+
+    with tempfile.TemporaryDirectory() as directory:
+      page_path = os.path.join(directory, "Page_0_0.bin")
+      with open(page_path, "wb") as page_file:
+        page.write_to_file(page_file)
+      self.assertEqual(os.path.getsize(page_path), PAGE_FILE_SIZE)
+
+      new_page = Page()
+      with open(page_path, "rb") as page_file:
+        self.assertTrue(new_page.read_from_file(page_file))
+
+    self.assertEqual(new_page.num_records, page.num_records)
+    self.assertEqual(new_page.data, page.data)
+
+  def test_json_page_migration(self):
+    '''Test that a legacy JSON page file is loaded and rewritten in the binary format'''
+    page = Page()
+    for value in [1, 2, 3]:
+      page.write(value)
+
+    with tempfile.TemporaryDirectory() as directory:
+      page_path = os.path.join(directory, "Page_0_0.bin")
+      with open(page_path, "w", encoding="utf-8") as page_file:
+        json.dump(page.serialize(), page_file)
+
+      frame = Frame()
+      frame.load_page(page_path)
+      self.assertEqual([frame.page.get(i) for i in range(3)], [1, 2, 3])
+      self.assertTrue(frame.dirty)
+      frame.unload_page()
+
+      new_page = Page()
+      with open(page_path, "rb") as page_file:
+        self.assertTrue(new_page.read_from_file(page_file))
+      self.assertEqual(new_page.num_records, 3)
+      self.assertEqual([new_page.get(i) for i in range(3)], [1, 2, 3])
+
 
 if __name__ == '__main__':
   unittest.main()
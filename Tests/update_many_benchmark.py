@@ -0,0 +1,64 @@
+'''
+Compares the updates per second of a loop of Query.update and of Query.update_many applying the same random updates
+to a table with a secondary index
+Run from the Tests directory: python update_many_benchmark.py
+'''
+import sys
+sys.path.append("..")
+
+from lstore.db import Database
+from lstore.query import Query
+
+from random import randint, seed
+from time import perf_counter
+import shutil
+
+NUM_RECORDS = 20000
+NUM_UPDATES = 50000
+BATCH_SIZE = 1000
+BENCHMARK_PATH = "UpdateManyBenchmark"
+
+
+def create_table(db, name):
+    table = db.create_table(name, 5, 0)
+    table.merge_scheduler.enabled = False
+    table.index.create_index(1)
+    query = Query(table)
+    query.insert_many((key, *(randint(0, 100) for _ in range(4))) for key in range(NUM_RECORDS))
+    return table, query
+
+
+def close_table(table):
+    table.merge_scheduler.close()
+    table.bufferpool.close()
+
+
+if __name__ == '__main__':
+    shutil.rmtree(BENCHMARK_PATH, ignore_errors=True)
+    seed(165)
+    db = Database()
+    db.open(BENCHMARK_PATH)
+    updates = []
+    for _ in range(NUM_UPDATES):
+        columns = [None] * 5
+        columns[randint(1, 4)] = randint(0, 100)
+        updates.append((randint(0, NUM_RECORDS - 1), columns))
+
+    print(f"{NUM_UPDATES} updates of {NUM_RECORDS} records, indexes on columns 0 and 1, batches of {BATCH_SIZE}")
+    table, query = create_table(db, 'Looped')
+    time_0 = perf_counter()
+    for key, columns in updates:
+        query.update(key, *columns)
+    looped_rate = NUM_UPDATES / (perf_counter() - time_0)
+    print(f"update loop:\t{looped_rate:,.0f} updates/s")
+    close_table(table)
+
+    table, query = create_table(db, 'UpdateMany')
+    time_0 = perf_counter()
+    for first in range(0, NUM_UPDATES, BATCH_SIZE):
+        query.update_many(updates[first:first + BATCH_SIZE])
+    rate = NUM_UPDATES / (perf_counter() - time_0)
+    print(f"update_many:\t{rate:,.0f} updates/s\t{rate / looped_rate:.1f}x")
+    close_table(table)
+
+    shutil.rmtree(BENCHMARK_PATH, ignore_errors=True)
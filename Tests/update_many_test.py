@@ -0,0 +1,125 @@
+import sys
+sys.path.append("..")
+import unittest
+import shutil
+import tempfile
+from random import Random
+
+from lstore.db import Database
+from lstore.query import Query
+from lstore.page_range import MergeRequest
+from lstore.config import MAX_RECORD_PER_PAGE, MAX_RECORD_PER_PAGE_RANGE
+
+NUM_RECORDS = 2000
+
+
+class TestUpdateMany(unittest.TestCase):
+
+    def setUp(self):
+        self.db = Database()
+        self.db.open(tempfile.mkdtemp())
+        self.random = Random(165)
+
+    def tearDown(self):
+        for table in self.db.tables.values():
+            table.merge_scheduler.close()
+            table.bufferpool.close()
+        shutil.rmtree(self.db.path)
+
+    def create_tables(self, num_records=NUM_RECORDS, **options):
+        '''Creates a table updated through update_many and a twin updated through update, with the same records'''
+        queries = []
+        for name in ('Batched', 'Looped'):
+            table = self.db.create_table(name, 4, 0, **options)
+            table.merge_scheduler.enabled = False
+            table.index.create_index(2)
+            queries.append(Query(table))
+            queries[-1].insert_many((key, key % 7, key % 11, -key) for key in range(num_records))
+        return queries
+
+    def random_updates(self, num_updates, num_records=NUM_RECORDS):
+        updates = []
+        for _ in range(num_updates):
+            columns = [None] * 4
+            for column in self.random.sample(range(1, 4), self.random.randint(1, 3)):
+                columns[column] = self.random.randint(-20, 20)
+            updates.append((self.random.randrange(num_records), columns))
+        return updates
+
+    def run_updates(self, queries, updates):
+        batched_query, looped_query = queries
+        expected = sum(1 for key, columns in updates if looped_query.update(key, *columns))
+        self.assertEqual(batched_query.update_many(updates), expected)
+
+    def assert_tables_match(self, queries, keys, versions=(0, -1, -2)):
+        batched_query, looped_query = queries
+        for key in keys:
+            for relative_version in versions:
+                batched = batched_query.select_version(key, 0, [1, 1, 1, 1], relative_version)
+                looped = looped_query.select_version(key, 0, [1, 1, 1, 1], relative_version)
+                self.assertEqual([record.columns for record in batched], [record.columns for record in looped])
+        for value in range(-20, 21):
+            self.assertEqual(sorted(batched_query.table.index.locate(2, value) or []), sorted(looped_query.table.index.locate(2, value) or []))
+
+    def test_matches_individual_updates(self):
+        queries = self.create_tables()
+        # Many updates of the same records, more than a tail page of each column
+        self.run_updates(queries, self.random_updates(3 * MAX_RECORD_PER_PAGE))
+        self.assert_tables_match(queries, range(NUM_RECORDS), versions=(0, -1, -3))
+        for column in range(1, 4):
+            self.assertEqual(queries[0].sum(0, NUM_RECORDS - 1, column), queries[1].sum(0, NUM_RECORDS - 1, column))
+
+    def test_missing_keys_and_primary_key_changes(self):
+        queries = self.create_tables()
+        updates = [
+            (5, [None, 1, None, None]),
+            (-1, [None, 2, None, None]),
+            (5, [None, None, 3, None]),
+            (6, [NUM_RECORDS, None, 4, None]),
+            (7, [8, None, None, None]),
+            (NUM_RECORDS, [None, 5, None, 6]),
+            (6, [None, 7, None, None])
+        ]
+        self.run_updates(queries, updates)
+        self.assertEqual(queries[0].update_many([(9, [None, 1, None]), (9, [None, None, 2, None])]), 1)
+        queries[1].update(9, None, None, 2, None)
+        self.assertEqual(queries[0].select(5, 0, [1, 1, 1, 1])[0].columns, [5, 1, 3, -5])
+        self.assertEqual(queries[0].select(NUM_RECORDS, 0, [1, 1, 1, 1])[0].columns[1:], [5, 4, 6])
+        self.assertEqual(queries[0].select(6, 0, [1, 1, 1, 1]), [])
+        self.assert_tables_match(queries, [5, 7, 8, 9, NUM_RECORDS])
+
+    def test_all_none_updates_succeed_and_missing_keys_are_skipped(self):
+        queries = self.create_tables()
+        self.assertTrue(queries[1].update(1, None, None, None, None))
+        self.assertEqual(queries[0].update_many([(1, [None] * 4)]), 1)
+        self.assertEqual(queries[0].update_many([(2, [None] * 4), (3, [None] * 4)]), 2)
+        self.assertEqual(queries[0].update_many([(-5, [None, 1, None, None])]), 0)
+        self.assertEqual(queries[0].update_many([(-5, [None, 1, None, None]), (4, [None, 1, None, None])]), 1)
+        self.assertEqual(queries[0].select(1, 0, [1, 1, 1, 1])[0].columns, [1, 1, 1, -1])
+        self.assertEqual(queries[0].select(4, 0, [1, 1, 1, 1])[0].columns, [4, 1, 4, -4])
+        self.assertEqual(queries[0].table.index.locate(0, -5), None)
+        self.assert_tables_match(queries, [1])
+
+    def test_cumulative_and_fixed_layouts(self):
+        for options in ({'cumulative_updates': True}, {'fixed_tail_layout': True}, {'cumulative_updates': True, 'fixed_tail_layout': True}):
+            queries = self.create_tables(**options)
+            self.run_updates(queries, self.random_updates(2 * MAX_RECORD_PER_PAGE))
+            self.assert_tables_match(queries, range(0, NUM_RECORDS, 3))
+            for name in ('Batched', 'Looped'):
+                self.db.drop_table(name)
+
+    def test_updates_span_page_ranges_and_merges(self):
+        num_records = MAX_RECORD_PER_PAGE_RANGE + 500
+        queries = self.create_tables(num_records)
+        self.run_updates(queries, self.random_updates(2000, num_records))
+        for query in queries:
+            for page_range_index in range(2):
+                query.table.merge_queue.put(MergeRequest(page_range_index))
+            query.table.merge_queue.join()
+        self.run_updates(queries, self.random_updates(2000, num_records))
+        self.assert_tables_match(queries, range(0, num_records, 17))
+        self.assertEqual(queries[0].sum(0, num_records - 1, 3), queries[1].sum(0, num_records - 1, 3))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+'''
+Measures select_version on records with deep histories: every record is updated NUM_VERSIONS times,
+then older and older versions are selected. With the version directory the time and the tail records read per select
+stay flat as the versions get older, a tail chain walk would read one more tail record per version
+Run from the Tests directory: python version_benchmark.py
+'''
+import sys
+sys.path.append("..")
+
+from lstore.db import Database
+from lstore.query import Query
+
+from random import randint, seed
+from time import perf_counter
+import shutil
+
+NUM_RECORDS = 1000
+NUM_VERSIONS = 30
+NUM_SELECTS = 5000
+RELATIVE_VERSIONS = [0, -1, -5, -15, -29]
+BENCHMARK_PATH = "VersionBenchmark"
+
+
+if __name__ == '__main__':
+    shutil.rmtree(BENCHMARK_PATH, ignore_errors=True)
+    seed(165)
+    db = Database()
+    db.open(BENCHMARK_PATH)
+    grades_table = db.create_table('Grades', 5, 0)
+    grades_table.merge_scheduler.enabled = False
+    query = Query(grades_table)
+
+    for key in range(NUM_RECORDS):
+        query.insert(key, randint(0, 100), randint(0, 100), randint(0, 100), randint(0, 100))
+    for _ in range(NUM_VERSIONS):
+        for key in range(NUM_RECORDS):
+            columns = [None] * 5
+            columns[randint(1, 4)] = randint(0, 100)
+            query.update(key, *columns)
+
+    print(f"{NUM_RECORDS} records with {NUM_VERSIONS} versions each, {NUM_SELECTS} selects per version")
+    for relative_version in RELATIVE_VERSIONS:
+        tail_hops = grades_table.merge_stats()["page_ranges"][0]["tail_hops"]
+        time_0 = perf_counter()
+        for _ in range(NUM_SELECTS):
+            query.select_version(randint(0, NUM_RECORDS - 1), 0, [1] * 5, relative_version)
+        elapsed = perf_counter() - time_0
+        tail_hops = grades_table.merge_stats()["page_ranges"][0]["tail_hops"] - tail_hops
+        print(f"version {relative_version}:\t{elapsed / NUM_SELECTS * 1e6:.1f}us per select\t{tail_hops / NUM_SELECTS:.2f} tail records per select")
+
+    memory_stats = grades_table.memory_stats()
+    version_stats = memory_stats["page_ranges"][0]["version_directory"]
+    print(f"version directory: {version_stats['versions']} versions of {version_stats['records']} records in {memory_stats['version_directory_bytes'] / 1024:.0f} KiB")
+
+    grades_table.merge_scheduler.close()
+    grades_table.bufferpool.close()
+    shutil.rmtree(BENCHMARK_PATH, ignore_errors=True)
@@ -0,0 +1,194 @@
+import sys
+sys.path.append("..")
+import unittest
+import shutil
+import tempfile
+import json
+import os
+
+from lstore.db import Database
+from lstore.query import Query
+from lstore.page_range import MergeRequest
+from lstore.version_directory import VersionDirectory
+from lstore.config import NUM_HIDDEN_COLUMNS, RECORD_NONE_VALUE
+
+
+class TestVersionDirectory(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = VersionDirectory(3, max_versions=3)
+        self.tail_values = {}
+
+    def add_version(self, tail_rid, column, value, previous_value):
+        previous_columns = [None] * 3
+        previous_columns[column] = previous_value
+        self.tail_values[(tail_rid, NUM_HIDDEN_COLUMNS + column)] = value
+        return self.directory.add_version(0, tail_rid, 1 << column, previous_columns, lambda tail_rid, column: self.tail_values[(tail_rid, column)])
+
+    def test_versions_jump_to_their_tail_record(self):
+        self.add_version(100, 1, 10, 1)
+        self.add_version(101, 2, 20, 2)
+        self.add_version(102, 1, 11, 10)
+
+        self.assertEqual(self.directory.get_version_location(0, 0, 1), 102)
+        self.assertEqual(self.directory.get_version_location(0, -1, 1), 100)
+        self.assertEqual(self.directory.get_version_location(0, -1, 2), 101)
+        self.assertEqual(self.directory.get_version_location(0, -2, 2), RECORD_NONE_VALUE)
+        self.assertEqual(self.directory.get_version_location(0, -3, 1), RECORD_NONE_VALUE)
+        self.assertEqual(self.directory.get_previous_value(0, 1), 1)
+        self.assertIsNone(self.directory.get_version_location(0, -1, 0))
+        self.assertIsNone(self.directory.get_version_location(1, -1, 1))
+
+    def test_dropped_versions_keep_their_values(self):
+        self.add_version(100, 1, 10, 1)
+        self.add_version(101, 2, 20, 2)
+        self.add_version(102, 1, 11, 10)
+        self.add_version(103, 0, 30, 3)
+        self.assertEqual(self.directory.get_stats()["versions"], 3)
+
+        # Version 100 was dropped, its value is the value of column 1 before the oldest version kept
+        self.assertEqual(self.directory.get_version_location(0, -3, 1), RECORD_NONE_VALUE)
+        self.assertEqual(self.directory.get_previous_value(0, 1), 10)
+        self.assertEqual(self.directory.get_version_location(0, -10, 2), RECORD_NONE_VALUE)
+        self.assertEqual(self.directory.get_previous_value(0, 2), 2)
+        self.assertEqual(self.directory.get_version_location(0, -1, 1), 102)
+
+    def test_memory_is_bounded(self):
+        for tail_rid in range(100, 200):
+            self.add_version(tail_rid, tail_rid % 3, tail_rid, tail_rid - 1)
+        bounded_bytes = self.directory.get_stats()["bytes"]
+        for tail_rid in range(200, 1000):
+            self.add_version(tail_rid, tail_rid % 3, tail_rid, tail_rid - 1)
+        self.assertEqual(self.directory.get_stats()["versions"], 3)
+        self.assertEqual(self.directory.get_stats()["bytes"], bounded_bytes)
+
+    def test_save_and_load(self):
+        for tail_rid in range(100, 106):
+            self.add_version(tail_rid, tail_rid % 3, tail_rid, tail_rid - 1)
+        self.directory.add_version(7, 200, 0b100, [None, None, -7], lambda tail_rid, column: self.tail_values[(tail_rid, column)])
+        path = os.path.join(tempfile.mkdtemp(), "PageRange_0", "VersionDirectory.bin")
+        self.directory.save(path)
+
+        directory = VersionDirectory(3, max_versions=3)
+        directory.load(path)
+        for base_slot in (0, 7):
+            for relative_version in range(0, -4, -1):
+                for column in range(3):
+                    self.assertEqual(directory.get_version_location(base_slot, relative_version, column), self.directory.get_version_location(base_slot, relative_version, column))
+        self.assertEqual(directory.get_previous_value(7, 2), -7)
+        self.assertEqual(directory.get_stats()["versions"], self.directory.get_stats()["versions"])
+        with self.assertRaises(ValueError):
+            VersionDirectory(4).load(path)
+        shutil.rmtree(os.path.dirname(os.path.dirname(path)))
+
+    def test_load_json_directory(self):
+        self.add_version(100, 1, 10, 1)
+        self.add_version(101, 2, 20, 2)
+        json_directory = {
+            base_slot: {
+                "tail_rids": record_versions.tail_rids.tolist(),
+                "first_version": record_versions.first_version,
+                "column_versions": [None if versions is None else versions.tolist() for versions in record_versions.column_versions],
+                "previous_values": record_versions.previous_values
+            }
+            for base_slot, record_versions in self.directory.records.items()
+        }
+        directory = VersionDirectory(3, max_versions=3)
+        directory.load_dict(json.loads(json.dumps(json_directory)))
+        for relative_version in range(0, -4, -1):
+            for column in range(3):
+                self.assertEqual(directory.get_version_location(0, relative_version, column), self.directory.get_version_location(0, relative_version, column))
+
+
+class TestSelectVersion(unittest.TestCase):
+
+    def setUp(self):
+        self.db = Database()
+        self.db.open(tempfile.mkdtemp())
+        self.table = self.db.create_table('Grades', 4, 0)
+        self.table.merge_scheduler.enabled = False
+        self.query = Query(self.table)
+        self.history = {}
+        '''Every version of every record, oldest first'''
+        for key in range(200):
+            self.history[key] = [[key, key, key, key]]
+            self.query.insert(key, key, key, key)
+
+    def tearDown(self):
+        self.table.merge_scheduler.close()
+        self.table.bufferpool.close()
+        shutil.rmtree(self.db.path)
+
+    def update(self, key, column, value):
+        columns = [None] * 4
+        columns[column] = value
+        self.assertTrue(self.query.update(key, *columns))
+        version = self.history[key][-1].copy()
+        version[column] = value
+        self.history[key].append(version)
+
+    def expected_version(self, key, relative_version):
+        return self.history[key][max(len(self.history[key]) - 1 + relative_version, 0)]
+
+    def check_versions(self, keys, relative_versions):
+        for key in keys:
+            for relative_version in relative_versions:
+                self.assertEqual(self.query.select_version(key, 0, [1, 1, 1, 1], relative_version)[0].columns, self.expected_version(key, relative_version))
+        for relative_version in relative_versions:
+            self.assertEqual(self.query.sum_version(0, 199, 2, relative_version), sum(self.expected_version(key, relative_version)[2] for key in range(200)))
+
+    def test_deep_histories(self):
+        for round in range(20):
+            for key in range(0, 200, 3):
+                self.update(key, 1 + (key + round) % 3, key * 100 + round)
+        self.check_versions(range(200), [0, -1, -2, -5, -19, -20, -40])
+
+    def test_versions_survive_merges(self):
+        for round in range(5):
+            for key in range(0, 200, 2):
+                self.update(key, 1 + round % 3, -round)
+        self.table.merge_queue.put(MergeRequest(0))
+        self.table.merge_queue.join()
+        self.check_versions(range(200), [0, -1, -3, -5, -6])
+
+    def test_reads_take_one_tail_record_per_column(self):
+        for round in range(10):
+            for key in range(10):
+                self.update(key, 2, round)
+        tail_hops = self.table.merge_stats()["page_ranges"][0]["tail_hops"]
+        for key in range(10):
+            self.assertEqual(self.query.select_version(key, 0, [1, 1, 1, 1], -7)[0].columns, self.expected_version(key, -7))
+        self.assertEqual(self.table.merge_stats()["page_ranges"][0]["tail_hops"] - tail_hops, 10)
+
+    def test_versions_past_the_history_kept(self):
+        self.table.page_ranges[0].version_directory.max_versions = 4
+        for round in range(10):
+            self.update(0, 1 + round % 2, round)
+        self.assertEqual(self.query.select_version(0, 0, [1, 1, 1, 1], -3)[0].columns, self.expected_version(0, -3))
+        # Older versions read as the state before the oldest version kept
+        self.assertEqual(self.query.select_version(0, 0, [1, 1, 1, 1], -9)[0].columns, self.expected_version(0, -4))
+        self.assertEqual(self.table.memory_stats()["page_ranges"][0]["version_directory"]["versions"], 4)
+
+    def test_reinserted_record_starts_a_new_history(self):
+        self.update(5, 1, 50)
+        self.assertTrue(self.query.delete(5))
+        self.table.deallocation_base_rid_queue.join()
+        self.query.insert(1000, 1, 2, 3)
+        self.assertEqual(self.query.select_version(1000, 0, [1, 1, 1, 1], -1)[0].columns, [1000, 1, 2, 3])
+
+    def test_page_range_round_trip(self):
+        for key in range(0, 200, 4):
+            self.update(key, 3, -key)
+            self.update(key, 1, key * 2)
+        page_range = self.table.page_ranges[0]
+        metadata = json.loads(json.dumps(page_range.serialize()))
+        self.assertNotIn("version_directory", metadata)
+        self.assertTrue(os.path.exists(page_range.get_version_directory_path()))
+        page_range.version_directory.records.clear()
+        page_range.deserialize(metadata)
+        self.check_versions(range(200), [0, -1, -2])
+        self.assertGreater(self.db.memory_stats()["Grades"]["version_directory_bytes"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
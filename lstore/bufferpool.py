@@ -5,29 +5,72 @@ DB Directory: Folder
     -> TableName: Folder
         -> PageRange_{page_range_index}: Folder
             -> Page_{record_column}_{page_index}.bin: File
+
+Page files use the binary format from lstore.page (fixed header + raw page data),
+older JSON page files are migrated to the binary format the next time they are written back
+Tables can also use the memory mapped segment layout, see lstore/storage.py
+
+Inside the bufferpool pages are identified by a compact integer page id
+page_id = (page_range_index << (RECORD_COLUMN_BITS + PAGE_INDEX_BITS)) | (record_column << PAGE_INDEX_BITS) | page_index
+
+Tables can share one SharedBufferPool (see Database bufferpool_size), inside it pages are keyed by
+page_key = (page_id << TABLE_ID_BITS) | table_id
+
+Merge, index builds and scans run inside scan_access(), pages they read from disk go to a small scan partition
+of frames that only replace each other, so background work can't evict the pages foreground queries use
 '''
 
 
-from lstore.config import MAX_NUM_FRAME, NUM_HIDDEN_COLUMNS
-from lstore.page import Page
-from lstore.lock import Latch
+from lstore.config import MAX_NUM_FRAME, MAX_RECORD_PER_PAGE, NUM_HIDDEN_COLUMNS, DEFAULT_STORAGE_ENGINE, DEFAULT_REPLACEMENT_POLICY, BUFFERPOOL_NUM_SHARDS, PAGE_INDEX_BITS, RECORD_COLUMN_BITS, TABLE_ID_BITS, BUFFERPOOL_FLUSH_RATE, BUFFERPOOL_DIRTY_RATIO, BUFFERPOOL_FLUSH_INTERVAL, BUFFERPOOL_PREFETCH_THREADS, BUFFERPOOL_PREFETCH_RATIO, BUFFERPOOL_READ_AHEAD_PAGES, MERGE_FRAME_ALLOCATION, BUFFERPOOL_STATS, BUFFERPOOL_LATENCY_SAMPLES, BUFFERPOOL_PIN_DEBUG, BUFFERPOOL_LONG_PIN_SECONDS
+from lstore.page import Page, PAGE_FILE_HEADER, PAGE_FILE_SIZE
+from lstore.lock import PinCount
+from lstore.storage import create_storage
+from lstore.replacement import create_replacement_policy, LRUPolicy
 import os
+import sys
 import json
 import threading
-from queue import Queue
+import time
+from array import array
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from typing import List, Union
 
+TABLE_ID_MASK = (1 << TABLE_ID_BITS) - 1
+PAGE_INDEX_MASK = (1 << PAGE_INDEX_BITS) - 1
+MAX_READ_AHEAD_STREAMS = 4096
+'''Sequential streams remembered for read ahead, the oldest are forgotten past this'''
+PIN_CALL_SITE_DEPTH = 3
+'''Callers recorded for every pin while pin debugging is on'''
+
 
 class Frame:
     '''Each frame inside the bufferpool'''
     def __init__(self):
-        self.pin = Latch()
+        self.pin = PinCount()
         self.page:Page = None
+        self._page_buffer = Page()
+        '''Page object reused by every page loaded into this frame'''
+        self._flush_buffer = bytearray(PAGE_FILE_SIZE)
+        '''Copy of the page written by the background flusher'''
         self.page_path = None
+        self.page_id = None
+        '''Compact page id of the loaded page'''
+        self.table_id = None
+        '''Id of the table owning the loaded page inside the shared bufferpool'''
+        self.storage = None
+        '''Storage engine the page was loaded from and is written back to'''
+        self.pending_load:PendingIO = None
+        '''Set while the page is being read from disk, threads that hit the frame wait for it'''
+        self.page_view:memoryview = None
+        '''Header and data of a page mapped from a segment file, None for page files'''
         self.dirty:bool = False
         '''If the Dirty bit is true we need to write to disk before discarding the frame'''
 
         self._write_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        '''Keeps two flushes of the page from sharing the flush buffer'''
 
     def load_page(self, page_path:str):
         '''Loads a page from disk to memory
@@ -35,13 +78,17 @@ class Frame:
 
         self._write_lock.acquire()
 
-        self.page = Page()
+        self.page = self._page_buffer
         self.page_path = page_path
         if os.path.exists(page_path):
-            with open(page_path, "r", encoding="utf-8") as page_file:
-                page_json_data = json.load(page_file)
-            self.page.deserialize(page_json_data)
+            with open(page_path, "rb") as page_file:
+                if (not self.page.read_from_file(page_file)):
+                    # Legacy JSON page, rewrite it in the binary format on the next unload
+                    page_file.seek(0)
+                    self.page.deserialize(json.loads(page_file.read()))
+                    self.dirty = True
         else:
+            self.page.clear()
             os.makedirs(os.path.dirname(page_path), exist_ok=True)
             self.dirty = True
 
@@ -54,9 +101,8 @@ class Frame:
         self._write_lock.acquire()
 
         if (self.dirty):
-            with open(self.page_path, "w", encoding="utf-8") as page_json_file:
-                page_data = self.page.serialize()
-                json.dump(page_data, page_json_file)
+            with open(self.page_path, "wb") as page_file:
+                self.page.write_to_file(page_file)
 
         self.dirty = False
         self.page = None
@@ -64,6 +110,64 @@ class Frame:
 
         self._write_lock.release()
 
+    def flush_page(self) -> int:
+        '''Writes a copy of a dirty page to its page file and keeps the page loaded, returns the bytes written
+        The frame must be pinned so it can't be unloaded while the copy is written'''
+        with self._flush_lock:
+            with self._write_lock:
+                if (not self.dirty):
+                    return 0
+
+                # Writes made after the copy mark the page dirty again
+                self.dirty = False
+                self.page.write_header(self._flush_buffer)
+                self._flush_buffer[PAGE_FILE_HEADER.size:] = self.page.data
+
+            try:
+                with open(self.page_path, "wb") as page_file:
+                    page_file.write(self._flush_buffer)
+            except:
+                self.dirty = True
+                raise
+
+            return len(self._flush_buffer)
+
+    def map_page(self, page_view:memoryview, page_path:str):
+        '''Attaches a page living inside a memory mapped segment,
+        page_view covers the binary page header followed by the page data'''
+        with self._write_lock:
+            self.page = Page(page_view[PAGE_FILE_HEADER.size:])
+            self.page_path = page_path
+            self.page_view = page_view
+
+            # Segments are zero filled when they grow so a missing header means a new page
+            if (not self.page.read_header(page_view)):
+                self.dirty = True
+
+    def unmap_page(self):
+        if (self.pin.count > 0):
+            raise MemoryError("Cannot unload a page thats being used by processes")
+
+        with self._write_lock:
+            # Page data is written in place, only the header has to be written back
+            if (self.dirty):
+                self.page.write_header(self.page_view)
+
+            self.dirty = False
+            self.page = None
+            self.page_path = None
+            self.page_view = None
+
+    def flush_mapped_page(self) -> int:
+        '''Writes the header of a dirty segment page into the mapping and keeps the page mapped, returns the bytes written'''
+        with self._write_lock:
+            if (not self.dirty):
+                return 0
+
+            self.dirty = False
+            self.page.write_header(self.page_view)
+            return PAGE_FILE_HEADER.size
+
     def write_precise_with_lock(self, slot_index, value):
         '''Writes a value to a page slot with a lock'''
         with self._write_lock:
@@ -76,204 +180,1265 @@ class Frame:
             self.dirty = True
             return self.page.write(value)
 
+    def append_many_with_lock(self, values) -> tuple[int, int]:
+        '''Appends as many values as the page has room for with a single lock,
+        returns the slot of the first appended value and the number of values appended'''
+        with self._write_lock:
+            num_appended = min(len(values), MAX_RECORD_PER_PAGE - self.page.num_records)
+            if (num_appended == 0):
+                return (self.page.num_records, 0)
+
+            self.dirty = True
+            return (self.page.append_many(values[:num_appended]), num_appended)
+
+    def write_many_with_lock(self, slot_indexes, values):
+        '''Writes several values to their page slots with a single lock'''
+        with self._write_lock:
+            self.dirty = True
+            self.page.write_many(slot_indexes, values)
+
+    def write_range_with_lock(self, first_slot, values):
+        '''Writes an array("i") to consecutive page slots with a single lock'''
+        with self._write_lock:
+            self.dirty = True
+            self.page.write_range(first_slot, values)
+
+    def write_all_with_lock(self, values):
+        '''Overwrites every slot of the page with a lock'''
+        with self._write_lock:
+            self.dirty = True
+            self.page.write_all(values)
+
     
     def get_page_capacity(self) -> bool:
         '''Returns True if the page has capacity for more records'''
         with self._write_lock:
             return self.page.has_capacity()
 
-class BufferPool:
-    '''Every access to pages should go through the bufferpool'''
-    def __init__(self, table_path, num_columns):
+class PageHandle:
+    '''A page pinned inside the bufferpool, the page can't be evicted until the handle is unpinned.
+    Use it as a context manager so the page is unpinned when the block exits'''
+    def __init__(self, frame:Frame, pin_tracker:"PinTracker"=None):
+        self.frame = frame
+        self.page:Page = frame.page
+        self.pin_tracker = pin_tracker
+        self.pin_record:PinRecord = None if pin_tracker is None else pin_tracker.track(frame)
+
+    def read(self, slot_index) -> int:
+        return self.page.get(slot_index)
+
+    def read_many(self, slot_indexes) -> List[int]:
+        return self.page.get_many(slot_indexes)
+
+    def read_all(self) -> List[int]:
+        return self.page.read_all()
+
+    def write(self, slot_index, value):
+        self.frame.write_precise_with_lock(slot_index, value)
+
+    def write_many(self, slot_indexes, values):
+        self.frame.write_many_with_lock(slot_indexes, values)
+
+    def append(self, value) -> int:
+        '''Writes a value after the last record of the page and returns its slot'''
+        return self.frame.write_with_lock(value)
+
+    def has_capacity(self) -> bool:
+        return self.frame.get_page_capacity()
+
+    def unpin(self):
+        if (self.frame is not None):
+            if (self.pin_record is not None):
+                self.pin_tracker.release(self.pin_record)
+                self.pin_record = None
+            self.frame.pin.count_down()
+            self.frame = None
+            self.page = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.unpin()
+
+class PinRecord:
+    '''A pin handed out to a caller while pin debugging is on'''
+    def __init__(self, frame:Frame, call_site):
+        self.frame = frame
+        self.page_id = frame.page_id
+        self.table_id = frame.table_id
+        self.thread_id = threading.get_ident()
+        self.thread_name = threading.current_thread().name
+        self.call_site = call_site
+        '''"file:line function" of the callers that took the pin, innermost first'''
+        self.pinned_at = time.monotonic()
+
+    def as_dict(self) -> dict:
+        page_range_index, record_column, page_index = get_page_location(self.page_id)
+        return {
+            "table_id": self.table_id,
+            "page": (page_range_index, record_column, page_index),
+            "thread": self.thread_name,
+            "call_site": self.call_site,
+            "seconds": time.monotonic() - self.pinned_at,
+        }
+
+class PinTracker:
+    '''Records where every pin handed out to callers was taken so leaked pins can be traced back to their call site'''
+    def __init__(self):
+        self.pins = defaultdict(list)
+        '''Pins currently held on each frame, pins[frame] = [PinRecord]'''
+        self.tracker_lock = threading.Lock()
+
+    def track(self, frame:Frame) -> PinRecord:
+        pin_record = PinRecord(frame, get_call_site())
+        with self.tracker_lock:
+            self.pins[frame].append(pin_record)
+        return pin_record
+
+    def release(self, pin_record:PinRecord):
+        with self.tracker_lock:
+            frame_pins = self.pins.get(pin_record.frame, None)
+            if (frame_pins is not None and pin_record in frame_pins):
+                frame_pins.remove(pin_record)
+                if (not frame_pins):
+                    del self.pins[pin_record.frame]
+
+    def release_frame(self, frame:Frame):
+        '''Releases a pin of the frame taken without a handle, pins of the calling thread go first'''
+        with self.tracker_lock:
+            frame_pins = self.pins.get(frame, None)
+            if (frame_pins is None):
+                return
+            thread_id = threading.get_ident()
+            pin_record = next((pin_record for pin_record in frame_pins if pin_record.thread_id == thread_id), frame_pins[0])
+        self.release(pin_record)
+
+    def held_pins(self, thread_id=None, table_id=None, min_seconds=0.0) -> List[PinRecord]:
+        '''Returns the pins held by a thread and of a table (None matches any) for at least min_seconds, oldest first'''
+        now = time.monotonic()
+        with self.tracker_lock:
+            pin_records = [pin_record for frame_pins in self.pins.values() for pin_record in frame_pins
+                           if (thread_id is None or pin_record.thread_id == thread_id)
+                           and (table_id is None or pin_record.table_id == table_id)
+                           and now - pin_record.pinned_at >= min_seconds]
+        return sorted(pin_records, key=lambda pin_record: pin_record.pinned_at)
+
+class PendingIO:
+    '''A page read or write running without the shard lock, threads that need the page wait on done'''
+    def __init__(self, pending_write=None):
+        self.done = threading.Event()
+        self.failed = False
+        self.pending_write:PendingIO = pending_write
+        '''Write of the same page that has to finish before a read can start'''
+
+class LatencyRecorder:
+    '''Count, total and maximum of an I/O latency, percentiles come from the most recent samples'''
+    def __init__(self, max_samples=BUFFERPOOL_LATENCY_SAMPLES):
+        self.samples = deque(maxlen=max_samples)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recorder_lock = threading.Lock()
+
+    def record(self, seconds):
+        with self.recorder_lock:
+            self.samples.append(seconds)
+            self.count += 1
+            self.total += seconds
+            self.max = max(self.max, seconds)
+
+    def summary(self) -> dict:
+        '''Returns the count of the latency and its average, p50, p95, p99 and maximum in seconds'''
+        with self.recorder_lock:
+            samples = sorted(self.samples)
+            count, total, max_seconds = self.count, self.total, self.max
+
+        def percentile(fraction):
+            return samples[min(len(samples) - 1, int(len(samples) * fraction))] if samples else 0.0
+
+        return {
+            "count": count,
+            "average": total / count if count else 0.0,
+            "p50": percentile(0.5),
+            "p95": percentile(0.95),
+            "p99": percentile(0.99),
+            "max": max_seconds,
+        }
+
+    def reset(self):
+        with self.recorder_lock:
+            self.samples.clear()
+            self.count = 0
+            self.total = 0.0
+            self.max = 0.0
+
+class BufferPoolShard:
+    '''A partition of the bufferpool with its own frame directory, free frames, replacement state and lock.
+    Frames can move between shards when a shard runs out of evictable frames'''
+    def __init__(self, shard_index, frame_nums:List[int], replacement_policy):
+        self.shard_index = shard_index
         self.frame_directory = dict()
-        self.num_frames = MAX_NUM_FRAME * (num_columns + NUM_HIDDEN_COLUMNS)
-        '''Frame directory keeps track of page# to frame#'''
-        self.frames:List[Frame] = []
-        self.available_frames_queue = Queue(self.num_frames)
-        self.unavailable_frames_queue = Queue(self.num_frames)
-        
-        self.table_path = table_path
-        self.bufferpool_lock = threading.Lock()
+        '''Frame directory keeps track of page_key to frame#'''
+        self.available_frames:List[int] = list(frame_nums)
+        self.replacement_policy = create_replacement_policy(replacement_policy, len(frame_nums))
+        '''Tracks every frame of this shard holding a page and picks eviction victims'''
+        self.pending_writes = dict()
+        '''Dirty pages evicted from this shard that are still being written, pending_writes[page_key] = PendingIO'''
+        self.shard_lock = threading.Lock()
 
-        for i in range(self.num_frames):
-            self.frames.append(Frame())
-            self.available_frames_queue.put(i)
+        # Counted under the shard lock while the bufferpool collects stats
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
 
-    def get_page_frame(self, page_range_index, record_column, page_index) -> Union[Frame, None]:
-        '''Returns a Frame of a page if the page can be grabbed from disk, 
-        otherwise returns None'''
+class ScanPartition:
+    '''Frames holding the pages read from disk by scan traffic, they are recycled oldest first among themselves.
+    Scan pages stay in the frame directory of their shard so foreground queries can still hit them'''
+    def __init__(self, frame_nums:List[int]):
+        self.available_frames:List[int] = list(frame_nums)
+        self.replacement_policy = LRUPolicy(len(frame_nums))
+        '''Load order of the frames holding scan pages, hits don't reorder it'''
+        self.partition_lock = threading.Lock()
+        '''Taken after a shard lock, never before one'''
 
-        page_disk_path = self.get_page_path(page_range_index, record_column, page_index)
-        with self.bufferpool_lock:  # Ensure thread safety
-            page_frame_num = self.frame_directory.get(page_disk_path, None)
+class SharedBufferPool:
+    '''
+    Frames, shards and replacement state that can be shared by the bufferpools of several tables.
+    Pages are keyed by (page_id << TABLE_ID_BITS) | table_id so tables never collide.
+    Every table can have a minimum and maximum share of the frames:
+        - frames of a table at or below its minimum are only evicted when no other frame can be
+        - a table at its maximum replaces one of its own pages before taking frames from other tables
+    The last num_scan_frames frames form the scan partition used by misses inside scan_access()
+    '''
+    def __init__(self, num_frames, replacement_policy=DEFAULT_REPLACEMENT_POLICY, num_shards=BUFFERPOOL_NUM_SHARDS, flush_rate=BUFFERPOOL_FLUSH_RATE, dirty_ratio=BUFFERPOOL_DIRTY_RATIO, prefetch_threads=BUFFERPOOL_PREFETCH_THREADS, num_scan_frames=0, collect_stats=BUFFERPOOL_STATS, pin_debug=BUFFERPOOL_PIN_DEBUG):
+        if (num_frames <= 0):
+            raise ValueError("Bufferpool must have at least one frame")
+        if (num_scan_frames < 0 or num_scan_frames >= num_frames):
+            raise ValueError("Scan partition must leave at least one frame for foreground pages")
 
-            if (page_frame_num is None):
-                # If no frames are available and we were unable to diallocate frames due to lock then returns None
-                if (self.available_frames_queue.empty() and not self.__replacement_policy()):
-                    return None
-            
-                current_frame:Frame = self.__load_new_frame(page_disk_path)
+        self.num_frames = num_frames
+        self.frames:List[Frame] = [Frame() for _ in range(self.num_frames)]
+        self.num_scan_frames = num_scan_frames
+        self.first_scan_frame = num_frames - num_scan_frames
+        '''Frames from this frame# on belong to the scan partition'''
+
+        # Pages are spread over the shards by page id so threads touching different pages rarely share a lock
+        self.num_shards = max(1, min(num_shards, self.first_scan_frame))
+        self.shards:List[BufferPoolShard] = [
+            BufferPoolShard(i, range(i, self.first_scan_frame, self.num_shards), replacement_policy) for i in range(self.num_shards)
+        ]
+        self.scan_partition = ScanPartition(range(self.first_scan_frame, self.num_frames))
+        self.scan_state = threading.local()
+        '''scan_state.active is True while the thread is inside scan_access()'''
+
+        self.table_frames = defaultdict(int)
+        '''Number of frames currently holding pages of each table, table_frames[table_id] = count
+        Background threads of a closed table can still load pages so unknown table ids count from 0'''
+        self.table_shares = {}
+        '''Share limits of the tables that set one, table_shares[table_id] = (min_frames, max_frames)'''
+        self.next_table_id = 0
+        self.free_table_ids = []
+        '''Ids of unregistered tables, handed out again before new ids'''
+        self.accounting_lock = threading.Lock()
+
+        self.flushed_pages = 0
+        '''Dirty pages written by the background flusher'''
+        self.flushed_bytes = 0
+        self.dirty_evictions = 0
+        '''Dirty pages a thread had to write before it could reuse their frame'''
+        self.stall_time = 0.0
+        '''Seconds threads spent writing dirty victims'''
+        self.written_back_pages = 0
+        '''Dirty pages written when their frame was freed, by evictions and unloads'''
+        self.load_waits = 0
+        '''Times a thread waited for a page another thread was reading'''
+        self.eviction_failures = 0
+        '''Misses that found every frame of their shard pinned and had to borrow a frame from another shard'''
+        self.allocation_failures = 0
+        '''Misses that found every frame of the bufferpool pinned'''
+
+        # Hits, misses, evictions and latencies are only counted while collect_stats is set
+        self.collect_stats = collect_stats
+        self.load_latency = LatencyRecorder()
+        self.write_latency = LatencyRecorder()
+        '''Latency of dirty pages written back on eviction or by the flusher'''
+
+        self.pin_tracker:PinTracker = PinTracker() if pin_debug else None
+        '''Records the call site of the pins handed out to callers, None unless pin debugging is on'''
+
+        # The flusher trickles dirty pages to disk so evictions mostly find clean victims
+        self.flush_rate = flush_rate
+        '''Maximum pages written per second by the flusher, 0 disables the flusher'''
+        self.dirty_ratio = dirty_ratio
+        '''The flusher writes pages while more than this fraction of the frames is dirty'''
+        self.flush_position = 0
+        self.flusher_stop = threading.Event()
+        self.flusher_thread = None
+        if (flush_rate > 0):
+            self.flusher_thread = threading.Thread(target=self.__flush_worker, daemon=True)
+            self.flusher_thread.start()
+
+        # Prefetched pages are read by a small I/O thread pool that is started on the first prefetch
+        self.prefetch_threads = prefetch_threads
+        '''Number of I/O threads reading prefetched pages, 0 disables prefetching and read ahead'''
+        self.max_prefetching = max(1, int(num_frames * BUFFERPOOL_PREFETCH_RATIO))
+        self.prefetching = set()
+        '''Page keys queued or being read by the I/O threads'''
+        self.prefetch_lock = threading.Lock()
+        self.prefetch_executor:ThreadPoolExecutor = None
+        self.prefetched_pages = 0
+        '''Pages read by the I/O threads'''
+        self.read_ahead_streams = {}
+        '''Last page index read (or read ahead) of every (table, page range, column) stream'''
+
+    def register_table(self) -> int:
+        '''Returns a table id for a bufferpool using this shared pool, ids of unregistered tables are reused'''
+        with self.accounting_lock:
+            reused = bool(self.free_table_ids)
+            if (reused):
+                table_id = self.free_table_ids.pop()
             else:
-                current_frame: Frame = self.frames[page_frame_num]
-        
-            current_frame.pin.count_up()
-        return current_frame
-    
-    def get_page_has_capacity(self, page_range_index, record_column, page_index) -> Union[bool, None]:
-        '''Returns True if the page has capacity for more records'''
-        page_disk_path = self.get_page_path(page_range_index, record_column, page_index)
+                table_id = self.next_table_id
+                if (table_id > TABLE_ID_MASK):
+                    raise ValueError("Too many tables registered in the bufferpool")
 
-        with self.bufferpool_lock:
-            page_frame_num = self.frame_directory.get(page_disk_path, None)
+                self.next_table_id += 1
 
-            if (page_frame_num is None):
-                # If no frames are available and we were unable to diallocate frames due to lock then returns None
-                if (self.available_frames_queue.empty() and not self.__replacement_policy()):
-                    return None
-                
-                current_frame:Frame = self.__load_new_frame(page_disk_path)
+        # Background threads of the table that had the id can still have loaded its pages after it closed
+        if (reused):
+            self.unload_table_frames(table_id)
+
+        with self.accounting_lock:
+            self.table_frames[table_id] = 0
+        return table_id
+
+    def unregister_table(self, table_id):
+        '''Forgets a table and releases its id, its frames must already be unloaded'''
+        with self.accounting_lock:
+            if (table_id in self.table_frames and table_id not in self.free_table_ids):
+                self.free_table_ids.append(table_id)
+            self.table_frames.pop(table_id, None)
+            self.table_shares.pop(table_id, None)
+
+    def set_table_share(self, table_id, min_frames=0, max_frames=None):
+        '''Sets the minimum and maximum number of frames of a table, max_frames None means no limit'''
+        if (max_frames is not None and max_frames < min_frames):
+            raise ValueError("Maximum share of a table can't be below its minimum share")
+
+        with self.accounting_lock:
+            if (min_frames <= 0 and max_frames is None):
+                self.table_shares.pop(table_id, None)
+            else:
+                self.table_shares[table_id] = (min_frames, max_frames)
+
+    @contextmanager
+    def scan_access(self):
+        '''Pages the calling thread reads from disk inside the with block go to the scan partition,
+        pages already in memory are used wherever they are'''
+        was_active = getattr(self.scan_state, "active", False)
+        self.scan_state.active = True
+        try:
+            yield
+        finally:
+            self.scan_state.active = was_active
+
+    def get_pinned_frame(self, table_id, page_id, storage, read_ahead=True) -> Union[Frame, None]:
+        '''Returns the frame of a page pinned exactly once, returns None if no frame could be allocated
+        Misses reserve a frame under the shard lock and read the page after releasing it,
+        misses that continue a sequential stream also read the next pages ahead.
+        Prefetches pass read_ahead False, they are not counted as hits or misses'''
+        page_key = (page_id << TABLE_ID_BITS) | table_id
+        shard = self.__get_shard(page_id, table_id)
+        while True:
+            with shard.shard_lock:
+                page_frame_num = shard.frame_directory.get(page_key, None)
+
+                if (page_frame_num is not None):
+                    current_frame:Frame = self.frames[page_frame_num]
+                    current_frame.pin.count_up()
+                    if (page_frame_num < self.first_scan_frame):
+                        shard.replacement_policy.access(page_frame_num)
+                    if (self.collect_stats and read_ahead):
+                        shard.hits += 1
+                    pending_load = current_frame.pending_load
+                    if (pending_load is None):
+                        return current_frame
+                else:
+                    if (self.collect_stats and read_ahead):
+                        shard.misses += 1
+                    is_scan = self.num_scan_frames > 0 and getattr(self.scan_state, "active", False)
+                    allocation = None if is_scan else self.__allocate_frame(shard, table_id)
+
+            if (page_frame_num is not None):
+                # Another thread is reading the page, wait for its read instead of issuing a second one
+                with self.accounting_lock:
+                    self.load_waits += 1
+                pending_load.done.wait()
+                if (not pending_load.failed):
+                    return current_frame
                 current_frame.pin.count_down()
-                return current_frame.get_page_capacity()
-            
-        current_frame:Frame = self.frames[page_frame_num]
-        return current_frame.get_page_capacity()
-    
-    def read_page_slot(self, page_range_index, record_column, page_index, slot_index) -> Union[int, None]:
-        '''Returns the value within a page if the page can be grabbed from disk,
-        otherwise returns None'''
-        page_disk_path = self.get_page_path(page_range_index, record_column, page_index)
-        with self.bufferpool_lock:
-            page_frame_num = self.frame_directory.get(page_disk_path, None)
+                continue
 
-            if (page_frame_num is None):
-                if (self.available_frames_queue.empty() and not self.__replacement_policy()):
+            if (is_scan):
+                # Scan misses replace scan pages, foreground frames are only used while every scan frame is pinned
+                allocation = self.__allocate_scan_frame()
+                if (allocation is None):
+                    with shard.shard_lock:
+                        allocation = self.__allocate_frame(shard, table_id)
+
+            if (allocation is None):
+                # Every frame of the shard is pinned, borrow a frame from another shard
+                allocation = self.__steal_frame(shard, table_id)
+                with self.accounting_lock:
+                    self.eviction_failures += 1
+                    if (allocation is None):
+                        self.allocation_failures += 1
+                if (allocation is None):
                     return None
 
-                current_frame:Frame = self.__load_new_frame(page_disk_path)
-                return current_frame.page.get(slot_index)
+            page_frame_num, write_back = allocation
+            if (write_back is not None):
+                time_0 = time.perf_counter()
+                self.__write_back(self.frames[page_frame_num], write_back)
+                with self.accounting_lock:
+                    self.dirty_evictions += 1
+                    self.stall_time += time.perf_counter() - time_0
+
+            current_frame = self.__reserve_frame(shard, page_frame_num, page_key, table_id, page_id, storage)
+            if (current_frame is not None):
+                if (read_ahead and self.prefetch_threads > 0):
+                    self.__read_ahead(table_id, page_id, storage)
+                return self.__load_reserved_frame(shard, current_frame, page_key)
+
+    def flush_dirty_frames(self, max_pages=None, dirty_ratio=0.0) -> int:
+        '''
+        Writes dirty unpinned pages to disk without evicting them until at most dirty_ratio of the frames is dirty
+        Writes at most max_pages pages, the pages closest to eviction go first. Returns the number of pages written
+        Pages of the scan partition are written back by the scans that evict them unless dirty_ratio is 0
+        '''
+        num_dirty = sum(1 for current_frame in self.frames[:self.first_scan_frame] if current_frame.dirty)
+        num_to_flush = num_dirty - int(self.first_scan_frame * dirty_ratio)
+        if (max_pages is not None):
+            num_to_flush = min(num_to_flush, max_pages)
+
+        # Every shard gets its part of the budget, the first shard rotates between rounds
+        shard_budget = -(-num_to_flush // self.num_shards)
+        self.flush_position = (self.flush_position + 1) % self.num_shards
+        num_flushed = 0
+        for offset in range(self.num_shards):
+            shard = self.shards[(self.flush_position + offset) % self.num_shards]
+            budget = min(shard_budget, num_to_flush - num_flushed)
+            if (budget <= 0):
+                break
+
+            with shard.shard_lock:
+                frame_nums = []
+                for frame_num in shard.replacement_policy.coldest(len(shard.replacement_policy)):
+                    current_frame:Frame = self.frames[frame_num]
+                    if (current_frame.dirty and current_frame.pin.count == 0 and current_frame.pending_load is None):
+                        # Pinning keeps the frame from being evicted while its copy is written
+                        current_frame.pin.count_up()
+                        frame_nums.append(frame_num)
+                        if (len(frame_nums) >= budget):
+                            break
+
+            for frame_num in frame_nums:
+                if (self.__flush_frame(frame_num)):
+                    num_flushed += 1
+
+        if (dirty_ratio <= 0 and self.num_scan_frames > 0):
+            num_flushed += self.__flush_scan_frames(None if max_pages is None else max_pages - num_flushed)
+        return num_flushed
+
+    def prefetch(self, table_id, page_ids, storage) -> int:
+        '''
+        Queues pages to be read into the bufferpool by the I/O threads without pinning them
+        Pages already in memory or missing on disk are skipped, hints past the prefetch budget are dropped
+        Returns the number of pages queued
+        '''
+        if (self.prefetch_threads <= 0):
+            return 0
+
+        # Prefetches issued inside scan_access() load their pages into the scan partition too
+        is_scan = getattr(self.scan_state, "active", False)
+        num_queued = 0
+        with self.prefetch_lock:
+            if (self.prefetch_executor is None):
+                self.prefetch_executor = ThreadPoolExecutor(self.prefetch_threads, thread_name_prefix="bufferpool-prefetch")
+
+            for page_id in page_ids:
+                if (len(self.prefetching) >= self.max_prefetching):
+                    break
+
+                page_key = (page_id << TABLE_ID_BITS) | table_id
+                if (page_key in self.prefetching or self.get_frame_num(table_id, page_id) is not None):
+                    continue
+
+                self.prefetching.add(page_key)
+                self.prefetch_executor.submit(self.__prefetch_page, table_id, page_id, page_key, storage, is_scan)
+                num_queued += 1
+
+        return num_queued
+
+    def get_stats(self) -> dict:
+        '''
+        Returns the counters of the bufferpool and the frames currently resident, dirty and pinned
+        Hits, misses, evictions and latencies (in seconds) stay 0 unless collect_stats is set
+        '''
+        hits = sum(shard.hits for shard in self.shards)
+        misses = sum(shard.misses for shard in self.shards)
+        with self.accounting_lock:
+            stats = {
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": hits / (hits + misses) if (hits + misses) else 0.0,
+                "evictions": sum(shard.evictions for shard in self.shards),
+                "dirty_writes": self.written_back_pages + self.flushed_pages,
+                "dirty_evictions": self.dirty_evictions,
+                "flushed_pages": self.flushed_pages,
+                "flushed_bytes": self.flushed_bytes,
+                "stall_time": self.stall_time,
+                "prefetched_pages": self.prefetched_pages,
+                "load_waits": self.load_waits,
+                "eviction_failures": self.eviction_failures,
+                "allocation_failures": self.allocation_failures,
+                "table_frames": dict(self.table_frames),
+            }
+
+        stats["load_latency"] = self.load_latency.summary()
+        stats["write_latency"] = self.write_latency.summary()
+        stats["num_frames"] = self.num_frames
+        stats["resident_frames"] = sum(len(shard.frame_directory) for shard in self.shards)
+        stats["dirty_frames"] = sum(1 for current_frame in self.frames if current_frame.dirty)
+        stats["pinned_frames"] = sum(1 for current_frame in self.frames if current_frame.pin.count > 0)
+        return stats
+
+    def reset_stats(self):
+        '''Zeroes every counter and latency of the bufferpool, frame occupancy is not a counter and is kept'''
+        for shard in self.shards:
+            with shard.shard_lock:
+                shard.hits = 0
+                shard.misses = 0
+                shard.evictions = 0
+
+        with self.accounting_lock:
+            self.flushed_pages = 0
+            self.flushed_bytes = 0
+            self.dirty_evictions = 0
+            self.stall_time = 0.0
+            self.prefetched_pages = 0
+            self.written_back_pages = 0
+            self.load_waits = 0
+            self.eviction_failures = 0
+            self.allocation_failures = 0
+
+        self.load_latency.reset()
+        self.write_latency.reset()
+
+    def get_pin_report(self, min_seconds=BUFFERPOOL_LONG_PIN_SECONDS) -> dict:
+        '''
+        Returns the pins held for at least min_seconds (oldest first, only known while pin debugging is on)
+        and the fraction of the frames they keep from being evicted
+        '''
+        long_pins = [] if self.pin_tracker is None else self.pin_tracker.held_pins(min_seconds=min_seconds)
+        lost_frames = len({pin_record.frame for pin_record in long_pins})
+        return {
+            "pinned_frames": sum(1 for current_frame in self.frames if current_frame.pin.count > 0),
+            "long_pins": [pin_record.as_dict() for pin_record in long_pins],
+            "lost_frames": lost_frames,
+            "lost_capacity": lost_frames / self.num_frames,
+        }
+
+    def get_flush_stats(self) -> dict:
+        '''Returns the write back counters of the bufferpool'''
+        with self.accounting_lock:
+            return {
+                "flushed_pages": self.flushed_pages,
+                "flushed_bytes": self.flushed_bytes,
+                "dirty_evictions": self.dirty_evictions,
+                "stall_time": self.stall_time,
+            }
+
+    def close(self):
+        '''Stops the background flusher and the prefetch I/O threads'''
+        self.flusher_stop.set()
+        if (self.flusher_thread is not None and self.flusher_thread is not threading.current_thread()):
+            self.flusher_thread.join()
+
+        with self.prefetch_lock:
+            prefetch_executor = self.prefetch_executor
+            self.prefetch_executor = None
+            self.prefetch_threads = 0
+        if (prefetch_executor is not None):
+            prefetch_executor.shutdown(wait=True, cancel_futures=True)
+            # Cancelled prefetches never ran, forget them
+            with self.prefetch_lock:
+                self.prefetching.clear()
+
+    def get_frame_num(self, table_id, page_id) -> Union[int, None]:
+        '''Returns the frame number of a page if the page is in memory, otherwise returns None'''
+        return self.__get_shard(page_id, table_id).frame_directory.get((page_id << TABLE_ID_BITS) | table_id, None)
+
+    def unload_table_frames(self, table_id):
+        '''Writes back and frees every frame holding a page of the table'''
+        # Prefetches still running would load pages of the table again
+        while True:
+            with self.prefetch_lock:
+                if (not any((page_key & TABLE_ID_MASK) == table_id for page_key in self.prefetching)):
+                    break
+            time.sleep(0.001)
+
+        for shard in self.shards:
+            fail_count = 0
+            while True:
+                pinned_frames = []
+                write_backs = []
+                with shard.shard_lock:
+                    frame_nums = [frame_num for page_key, frame_num in shard.frame_directory.items() if (page_key & TABLE_ID_MASK) == table_id]
+                    for frame_num in frame_nums:
+                        if self.__is_evictable(frame_num):
+                            write_backs.append((frame_num, self.__remove_frame(shard, frame_num)))
+                        else:
+                            pinned_frames.append(self.frames[frame_num])
+
+                    # Pages evicted by other threads may still be on their way to disk
+                    pending_writes = [pending_write for page_key, pending_write in shard.pending_writes.items() if (page_key & TABLE_ID_MASK) == table_id]
+
+                for frame_num, write_back in write_backs:
+                    if (write_back is not None):
+                        self.__write_back(self.frames[frame_num], write_back)
+                with shard.shard_lock:
+                    for frame_num, _ in write_backs:
+                        self.__free_frame(shard, frame_num)
+                for pending_write in pending_writes:
+                    pending_write.done.wait()
+
+                if (not pinned_frames):
+                    break
+
+                fail_count += 1
+                if (fail_count > MAX_NUM_FRAME):
+                    raise MemoryError("Unable to unload all frames")
+                # Give the threads holding the remaining pins a chance to release them
+                pinned_frames[0].pin.await_unpinned(0.001)
+
+    def __get_shard(self, page_id, table_id) -> BufferPoolShard:
+        '''Returns the shard owning a page, the page index is mixed with the page range and column
+        so the columns of one base page land on different shards'''
+        return self.shards[(page_id ^ (page_id >> PAGE_INDEX_BITS) ^ table_id) % self.num_shards]
+
+    def __reserve_frame(self, shard:BufferPoolShard, page_frame_num, page_key, table_id, page_id, storage) -> Union[Frame, None]:
+        '''
+        Publishes a free frame as the frame of a page that is still being read, the frame is pinned once
+        Returns None and frees the frame if another thread reserved the page first
+        '''
+        with shard.shard_lock:
+            if (page_key in shard.frame_directory):
+                self.__free_frame(shard, page_frame_num)
+                return None
 
             current_frame:Frame = self.frames[page_frame_num]
             current_frame.pin.count_up()
-            return current_frame.page.get(slot_index)
-    
-    def write_page_slot(self, page_range_index, record_column, page_index, slot_index, value) -> bool:
-        '''Writes a value to a page slot'''
-        page_disk_path = self.get_page_path(page_range_index, record_column, page_index)
+            current_frame.pending_load = PendingIO(shard.pending_writes.get(page_key, None))
+            current_frame.page_id = page_id
+            current_frame.table_id = table_id
+            current_frame.storage = storage
+            shard.frame_directory[page_key] = page_frame_num
 
-        with self.bufferpool_lock:
-            page_frame_num = self.frame_directory.get(page_disk_path, None)
-            current_frame:Frame = None
+            if (page_frame_num < self.first_scan_frame):
+                shard.replacement_policy.insert(page_frame_num, page_key)
+            else:
+                with self.scan_partition.partition_lock:
+                    self.scan_partition.replacement_policy.insert(page_frame_num, page_key)
+            with self.accounting_lock:
+                self.table_frames[table_id] += 1
 
-            if (page_frame_num is None):
-                if (self.available_frames_queue.empty() and not self.__replacement_policy()):
-                    return False
+        return current_frame
 
-                current_frame:Frame = self.__load_new_frame(page_disk_path)
-            else:
-                current_frame:Frame = self.frames[page_frame_num]
+    def __load_reserved_frame(self, shard:BufferPoolShard, current_frame:Frame, page_key) -> Frame:
+        '''Reads the page of a reserved frame without holding the shard lock and wakes the threads waiting for it'''
+        pending_load:PendingIO = current_frame.pending_load
+        try:
+            # A dirty copy of the page evicted moments ago has to reach the disk before it is read again
+            if (pending_load.pending_write is not None):
+                pending_load.pending_write.done.wait()
+
+            time_0 = time.perf_counter()
+            current_frame.storage.load_page(current_frame, *get_page_location(current_frame.page_id))
+            if (self.collect_stats):
+                self.load_latency.record(time.perf_counter() - time_0)
+        except:
+            with shard.shard_lock:
+                page_frame_num = shard.frame_directory.pop(page_key)
+                self.__untrack_frame(shard, page_frame_num)
+                with self.accounting_lock:
+                    self.table_frames[current_frame.table_id] -= 1
+                current_frame.page_id = None
+                current_frame.table_id = None
+                current_frame.storage = None
+                current_frame.pending_load = None
+                current_frame.pin.count_down()
+                self.__free_frame(shard, page_frame_num)
+
+            pending_load.failed = True
+            pending_load.done.set()
+            raise
+
+        current_frame.pending_load = None
+        pending_load.done.set()
+        return current_frame
+
+    def __allocate_frame(self, shard:BufferPoolShard, table_id) -> Union[tuple, None]:
+        '''
+        Returns (frame#, write_back) of a free frame of the shard, evicting one if needed. The shard lock must be held
+        write_back is the dirty page still held by the frame, it must be written with __write_back before the frame is reused
+        '''
+        if (not self.table_shares):
+            if (shard.available_frames):
+                return shard.available_frames.pop(), None
+            return self.__evict_frame(shard, self.__is_evictable)
+
+        min_frames, max_frames = self.table_shares.get(table_id, (0, None))
+        if (max_frames is not None and self.table_frames[table_id] >= max_frames):
+            # The table replaces its own pages instead of growing past its share
+            allocation = self.__evict_frame(shard, lambda frame_num: self.frames[frame_num].table_id == table_id and self.__is_evictable(frame_num))
+            if (allocation is not None):
+                return allocation
+
+        if (shard.available_frames):
+            return shard.available_frames.pop(), None
+
+        # Frames of tables under their minimum share are taken last
+        allocation = self.__evict_frame(shard, lambda frame_num: self.__is_above_share(frame_num, table_id))
+        if (allocation is not None):
+            return allocation
+        return self.__evict_frame(shard, self.__is_evictable)
+
+    def __steal_frame(self, shard:BufferPoolShard, table_id) -> Union[tuple, None]:
+        '''Takes a free or evicted frame away from another shard, only one shard lock is held at a time'''
+        for offset in range(1, self.num_shards):
+            other_shard = self.shards[(shard.shard_index + offset) % self.num_shards]
+            with other_shard.shard_lock:
+                allocation = self.__allocate_frame(other_shard, table_id)
+            if (allocation is not None):
+                return allocation
+
+        return None
+
+    def __allocate_scan_frame(self) -> Union[tuple, None]:
+        '''
+        Returns (frame#, write_back) of a free frame of the scan partition, evicting the oldest unpinned scan page if needed
+        Returns None if every scan frame is pinned. No shard lock may be held
+        '''
+        with self.scan_partition.partition_lock:
+            if (self.scan_partition.available_frames):
+                return self.scan_partition.available_frames.pop(), None
+            frame_nums = list(self.scan_partition.replacement_policy.coldest(self.num_scan_frames))
+
+        for frame_num in frame_nums:
+            shard = self.__lock_resident_frame(frame_num)
+            if (shard is None):
+                continue
+
+            try:
+                if (self.__is_evictable(frame_num)):
+                    if (self.collect_stats):
+                        shard.evictions += 1
+                    return frame_num, self.__remove_frame(shard, frame_num)
+            finally:
+                shard.shard_lock.release()
+
+        return None
+
+    def __lock_resident_frame(self, frame_num) -> Union[BufferPoolShard, None]:
+        '''Acquires the lock of the shard whose directory holds the page of a frame and returns the shard,
+        returns None without holding a lock if the frame holds no page'''
+        current_frame:Frame = self.frames[frame_num]
+        page_id, table_id = current_frame.page_id, current_frame.table_id
+        if (page_id is None or table_id is None):
+            return None
+
+        shard = self.__get_shard(page_id, table_id)
+        shard.shard_lock.acquire()
+        # The frame could have been reused for another page before the lock was taken
+        if (shard.frame_directory.get((page_id << TABLE_ID_BITS) | table_id, None) != frame_num):
+            shard.shard_lock.release()
+            return None
+        return shard
+
+    def __untrack_frame(self, shard:BufferPoolShard, frame_num):
+        '''Removes a frame from the replacement state it was inserted into, the shard lock must be held'''
+        if (frame_num < self.first_scan_frame):
+            shard.replacement_policy.remove(frame_num)
+        else:
+            with self.scan_partition.partition_lock:
+                self.scan_partition.replacement_policy.remove(frame_num)
+
+    def __free_frame(self, shard:BufferPoolShard, frame_num):
+        '''Returns a frame without a page to the free frames of the shard or of the scan partition, the shard lock must be held'''
+        if (frame_num < self.first_scan_frame):
+            shard.available_frames.append(frame_num)
+        else:
+            with self.scan_partition.partition_lock:
+                self.scan_partition.available_frames.append(frame_num)
+
+    def __evict_frame(self, shard:BufferPoolShard, is_evictable) -> Union[tuple, None]:
+        '''
+        Evicts the victim chosen by the replacement policy of the shard, the shard lock must be held
+        Returns (frame#, write_back) of the freed frame or None if no frame of the shard is evictable
+        '''
+        # If the frame is being used by a process then it can't be deallocated
+        frame_num = shard.replacement_policy.victim(is_evictable)
+        if (frame_num is None):
+            return None
+
+        if (self.collect_stats):
+            shard.evictions += 1
+        return frame_num, self.__remove_frame(shard, frame_num)
+
+    def __remove_frame(self, shard:BufferPoolShard, frame_num) -> Union[tuple, None]:
+        '''
+        Removes an unpinned frame from the shard, the shard lock must be held
+        Clean pages are dropped right away, dirty pages are returned as (shard, page_key, pending_write)
+        so they can be written with __write_back once the lock is released
+        '''
+        current_frame:Frame = self.frames[frame_num]
+        page_key = (current_frame.page_id << TABLE_ID_BITS) | current_frame.table_id
+        self.__untrack_frame(shard, frame_num)
+        del shard.frame_directory[page_key]
+
+        with self.accounting_lock:
+            self.table_frames[current_frame.table_id] -= 1
+
+        if (current_frame.dirty):
+            pending_write = PendingIO()
+            shard.pending_writes[page_key] = pending_write
+            return shard, page_key, pending_write
+
+        current_frame.storage.unload_page(current_frame)
+        current_frame.page_id = None
+        current_frame.table_id = None
+        current_frame.storage = None
+        return None
+
+    def __write_back(self, current_frame:Frame, write_back):
+        '''Writes the dirty page of a removed frame to disk, no shard lock may be held'''
+        shard, page_key, pending_write = write_back
+        try:
+            time_0 = time.perf_counter()
+            current_frame.storage.unload_page(current_frame)
+            if (self.collect_stats):
+                self.write_latency.record(time.perf_counter() - time_0)
+            with self.accounting_lock:
+                self.written_back_pages += 1
+        finally:
+            current_frame.page_id = None
+            current_frame.table_id = None
+            current_frame.storage = None
+            with shard.shard_lock:
+                del shard.pending_writes[page_key]
+            pending_write.done.set()
+
+    def __prefetch_page(self, table_id, page_id, page_key, storage, is_scan):
+        '''Runs on an I/O thread, reads a page into the bufferpool and leaves it unpinned'''
+        self.scan_state.active = is_scan
+        try:
+            if (storage.page_exists(*get_page_location(page_id))):
+                current_frame = self.get_pinned_frame(table_id, page_id, storage, read_ahead=False)
+                if (current_frame is not None):
+                    current_frame.pin.count_down()
+                    with self.accounting_lock:
+                        self.prefetched_pages += 1
+        finally:
+            with self.prefetch_lock:
+                self.prefetching.discard(page_key)
+
+    def __read_ahead(self, table_id, page_id, storage):
+        '''Prefetches the next pages of a (page range, column) stream whose misses arrive in page order'''
+        stream = ((page_id >> PAGE_INDEX_BITS) << TABLE_ID_BITS) | table_id
+        page_index = page_id & PAGE_INDEX_MASK
+        last_page_index = self.read_ahead_streams.get(stream, None)
+        if (len(self.read_ahead_streams) >= MAX_READ_AHEAD_STREAMS):
+            self.read_ahead_streams.clear()
+
+        if (last_page_index is None or page_index != last_page_index + 1):
+            self.read_ahead_streams[stream] = page_index
+            return
+
+        # The next miss of the stream lands right after the pages read ahead and keeps the stream going
+        self.read_ahead_streams[stream] = page_index + BUFFERPOOL_READ_AHEAD_PAGES
+        self.prefetch(table_id, range(page_id + 1, page_id + 1 + BUFFERPOOL_READ_AHEAD_PAGES), storage)
+
+    def __flush_scan_frames(self, max_pages) -> int:
+        '''Writes the dirty unpinned pages of the scan partition without evicting them, returns the number of pages written'''
+        with self.scan_partition.partition_lock:
+            frame_nums = list(self.scan_partition.replacement_policy.coldest(self.num_scan_frames))
+
+        num_flushed = 0
+        for frame_num in frame_nums:
+            if (max_pages is not None and num_flushed >= max_pages):
+                break
+            if (not self.frames[frame_num].dirty):
+                continue
+
+            shard = self.__lock_resident_frame(frame_num)
+            if (shard is None):
+                continue
+            current_frame:Frame = self.frames[frame_num]
+            is_flushable = current_frame.pin.count == 0 and current_frame.pending_load is None
+            if (is_flushable):
                 current_frame.pin.count_up()
+            shard.shard_lock.release()
+
+            if (is_flushable and self.__flush_frame(frame_num)):
+                num_flushed += 1
+
+        return num_flushed
+
+    def __flush_frame(self, frame_num) -> bool:
+        '''Writes the page of a frame pinned by the flusher and unpins it, returns True if the page was written'''
+        current_frame:Frame = self.frames[frame_num]
+        try:
+            time_0 = time.perf_counter()
+            num_bytes = current_frame.storage.flush_page(current_frame)
+        finally:
+            current_frame.pin.count_down()
+
+        if (num_bytes == 0):
+            return False
+
+        if (self.collect_stats):
+            self.write_latency.record(time.perf_counter() - time_0)
+
+        with self.accounting_lock:
+            self.flushed_pages += 1
+            self.flushed_bytes += num_bytes
+        return True
+
+    def __flush_worker(self):
+        '''Background flusher, every BUFFERPOOL_FLUSH_INTERVAL seconds writes up to flush_rate pages per second
+        while more than dirty_ratio of the frames is dirty'''
+        max_pages = max(1, int(self.flush_rate * BUFFERPOOL_FLUSH_INTERVAL))
+        while not self.flusher_stop.wait(BUFFERPOOL_FLUSH_INTERVAL):
+            try:
+                self.flush_dirty_frames(max_pages, self.dirty_ratio)
+            except OSError:
+                # Pages that couldn't be written stay dirty and are written back on eviction
+                pass
+
+    def __is_evictable(self, frame_num) -> bool:
+        return self.frames[frame_num].pin.count == 0
+
+    def __is_above_share(self, frame_num, table_id) -> bool:
+        '''Returns True if the frame is unpinned and evicting it keeps its table at or above its minimum share'''
+        current_frame:Frame = self.frames[frame_num]
+        if (current_frame.pin.count != 0):
+            return False
+        if (current_frame.table_id == table_id):
+            return True
+
+        min_frames, _ = self.table_shares.get(current_frame.table_id, (0, None))
+        return self.table_frames[current_frame.table_id] > min_frames
+
+
+class BufferPool:
+    '''Every access to pages of a table should go through the bufferpool
+    Without a shared_bufferpool the table gets a private pool of MAX_NUM_FRAME frames per column
+    plus a scan partition of MERGE_FRAME_ALLOCATION frames per column, otherwise its pages live in the frames of the shared pool'''
+    def __init__(self, table_path, num_columns, storage_engine=DEFAULT_STORAGE_ENGINE, replacement_policy=DEFAULT_REPLACEMENT_POLICY, num_shards=BUFFERPOOL_NUM_SHARDS, shared_bufferpool:SharedBufferPool=None):
+        self.owns_shared_bufferpool = shared_bufferpool is None
+        if (shared_bufferpool is None):
+            total_columns = num_columns + NUM_HIDDEN_COLUMNS
+            shared_bufferpool = SharedBufferPool((MAX_NUM_FRAME + MERGE_FRAME_ALLOCATION) * total_columns, replacement_policy, num_shards, num_scan_frames=MERGE_FRAME_ALLOCATION * total_columns)
+
+        self.shared_bufferpool = shared_bufferpool
+        self.table_id = shared_bufferpool.register_table()
+
+        self.table_path = table_path
+        self.storage = create_storage(storage_engine, table_path)
+        self.closed = False
+        '''Set by close, the table id may belong to another table after it'''
+
+    @property
+    def frames(self) -> List[Frame]:
+        return self.shared_bufferpool.frames
+
+    @property
+    def shards(self) -> List[BufferPoolShard]:
+        return self.shared_bufferpool.shards
+
+    @property
+    def num_frames(self) -> int:
+        return self.shared_bufferpool.num_frames
+
+    @property
+    def num_resident_frames(self) -> int:
+        '''Number of frames currently holding pages of this table'''
+        return self.shared_bufferpool.table_frames.get(self.table_id, 0)
+
+    def pin(self, page_range_index, record_column, page_index) -> PageHandle:
+        '''Pins a page and returns a handle to it, the handle unpins the page when its with block exits
+        Raises MemoryError if no frame could be allocated for the page'''
+        current_frame = self.__get_pinned_frame(get_page_id(page_range_index, record_column, page_index))
+        if (current_frame is None):
+            raise MemoryError(self.__allocation_error())
+        return PageHandle(current_frame, self.shared_bufferpool.pin_tracker)
+
+    def read_slot(self, page_range_index, record_column, page_index, slot_index) -> int:
+        '''Returns the value of a single slot read through a pinned page handle
+        Raises MemoryError if no frame could be allocated for the page'''
+        with self.pin(page_range_index, record_column, page_index) as page:
+            return page.read(slot_index)
+
+    def get_page_frame(self, page_range_index, record_column, page_index) -> Union[Frame, None]:
+        '''Returns a pinned Frame of a page if the page can be grabbed from disk, 
+        otherwise returns None. Release the pin with mark_frame_used'''
+        current_frame = self.__get_pinned_frame(get_page_id(page_range_index, record_column, page_index))
+        if (current_frame is not None and self.shared_bufferpool.pin_tracker is not None):
+            self.shared_bufferpool.pin_tracker.track(current_frame)
+        return current_frame
+    
+    def get_page_has_capacity(self, page_range_index, record_column, page_index) -> Union[bool, None]:
+        '''Returns True if the page has capacity for more records'''
+        current_frame = self.__get_pinned_frame(get_page_id(page_range_index, record_column, page_index))
+        if (current_frame is None):
+            return None
+
+        has_capacity = current_frame.get_page_capacity()
+        current_frame.pin.count_down()
+        return has_capacity
+    
+    def read_page_slot(self, page_range_index, record_column, page_index, slot_index) -> Union[int, None]:
+        '''Returns the value within a page if the page can be grabbed from disk,
+        otherwise returns None. The page stays pinned until mark_frame_used is called'''
+        current_frame = self.__get_pinned_frame(get_page_id(page_range_index, record_column, page_index))
+        if (current_frame is None):
+            return None
+
+        if (self.shared_bufferpool.pin_tracker is not None):
+            self.shared_bufferpool.pin_tracker.track(current_frame)
+        return current_frame.page.get(slot_index)
+    
+    def write_page_slot(self, page_range_index, record_column, page_index, slot_index, value) -> bool:
+        '''Writes a value to a page slot'''
+        current_frame = self.__get_pinned_frame(get_page_id(page_range_index, record_column, page_index))
+        if (current_frame is None):
+            return False
 
         current_frame.write_precise_with_lock(slot_index, value)
         current_frame.pin.count_down()
         return True
     
     def write_page_next(self, page_range_index, record_column, page_index, value) -> Union[int, None]:
-        '''Write a value to page and returns the slot it was written to, returns None if unable to locate frame'''
-        page_disk_path = self.get_page_path(page_range_index, record_column, page_index)
-        page_frame_num = self.frame_directory.get(page_disk_path, None)
-        current_frame:Frame = None
-
-        if (page_frame_num is None):
-            if (self.available_frames_queue.empty() and not self.__replacement_policy()):
-                for i in range(MAX_NUM_FRAME):
-                    print(f"Frame {i} has pin {self.frames[i].pin}")
-                raise MemoryError("Unable to allocate new frame")
-
-            current_frame:Frame = self.__load_new_frame(page_disk_path)
-        else:
-            current_frame:Frame = self.frames[page_frame_num]
-            current_frame.pin.count_up()
+        '''Write a value to page and returns the slot it was written to, raises MemoryError if unable to locate frame'''
+        current_frame = self.__get_pinned_frame(get_page_id(page_range_index, record_column, page_index))
+        if (current_frame is None):
+            raise MemoryError(self.__allocation_error())
 
         slot_index = current_frame.write_with_lock(value)
         current_frame.pin.count_down()
         return slot_index
     
+    def write_page_next_many(self, page_range_index, record_column, page_index, values) -> tuple[int, int]:
+        '''Appends values to a page with a single pin until the page is full, returns the slot of the first appended value
+        and the number of values appended, raises MemoryError if unable to locate frame'''
+        current_frame = self.__get_pinned_frame(get_page_id(page_range_index, record_column, page_index))
+        if (current_frame is None):
+            raise MemoryError(self.__allocation_error())
+
+        appended = current_frame.append_many_with_lock(values)
+        current_frame.pin.count_down()
+        return appended
+
+    def read_page_slots(self, page_range_index, record_column, page_index, slot_indexes) -> Union[List[int], None]:
+        '''Returns the values of several slots of a page with a single pin,
+        returns None if the page can't be grabbed from disk'''
+        current_frame = self.__get_pinned_frame(get_page_id(page_range_index, record_column, page_index))
+        if (current_frame is None):
+            return None
+
+        values = current_frame.page.get_many(slot_indexes)
+        current_frame.pin.count_down()
+        return values
+
+    def read_full_page(self, page_range_index, record_column, page_index) -> Union[List[int], None]:
+        '''Returns every slot of a page with a single pin,
+        returns None if the page can't be grabbed from disk'''
+        current_frame = self.__get_pinned_frame(get_page_id(page_range_index, record_column, page_index))
+        if (current_frame is None):
+            return None
+
+        values = current_frame.page.read_all()
+        current_frame.pin.count_down()
+        return values
+
+    def read_page_array(self, page_range_index, record_column, page_index) -> Union[array, None]:
+        '''Returns a compact copy of every slot of a page as an array("i") with a single pin,
+        returns None if the page can't be grabbed from disk'''
+        current_frame = self.__get_pinned_frame(get_page_id(page_range_index, record_column, page_index))
+        if (current_frame is None):
+            return None
+
+        values = array("i")
+        values.frombytes(current_frame.page.data)
+        current_frame.pin.count_down()
+        return values
+
+    def write_page_array(self, page_range_index, record_column, page_index, values:array) -> bool:
+        '''Overwrites every slot of a page with an array("i") such as one returned by read_page_array'''
+        current_frame = self.__get_pinned_frame(get_page_id(page_range_index, record_column, page_index))
+        if (current_frame is None):
+            return False
+
+        current_frame.write_all_with_lock(values)
+        current_frame.pin.count_down()
+        return True
+
+    def write_page_range(self, page_range_index, record_column, page_index, first_slot, values:array) -> bool:
+        '''Writes an array("i") to consecutive slots of a page starting at first_slot with a single pin'''
+        current_frame = self.__get_pinned_frame(get_page_id(page_range_index, record_column, page_index))
+        if (current_frame is None):
+            return False
+
+        current_frame.write_range_with_lock(first_slot, values)
+        current_frame.pin.count_down()
+        return True
+
+    def write_page_slots(self, page_range_index, record_column, page_index, slot_indexes, values) -> bool:
+        '''Writes several values to their page slots with a single pin'''
+        current_frame = self.__get_pinned_frame(get_page_id(page_range_index, record_column, page_index))
+        if (current_frame is None):
+            return False
+
+        current_frame.write_many_with_lock(slot_indexes, values)
+        current_frame.pin.count_down()
+        return True
+
     def get_page_frame_num(self, page_range_index, record_column, page_index) -> Union[int, None]:
         '''Returns the frame number of the page if the page is in memory, otherwise returns None'''
-        page_disk_path = self.get_page_path(page_range_index, record_column, page_index)
-        return self.frame_directory.get(page_disk_path, None)
+        return self.shared_bufferpool.get_frame_num(self.table_id, get_page_id(page_range_index, record_column, page_index))
 
     def get_page_path(self, page_range_index, record_column, page_index) -> str:
-        '''Returns the path of the page'''
-        return os.path.join(self.table_path, os.path.join(f"PageRange_{page_range_index}", f"Page_{record_column}_{page_index}.bin"))
+        '''Returns the path of the page given by the storage engine of the table'''
+        return self.storage.get_page_path(page_range_index, record_column, page_index)
     
     def mark_frame_used(self, frame_num):
         '''Use this to close a frame once a page has been used'''
+        if (self.shared_bufferpool.pin_tracker is not None):
+            self.shared_bufferpool.pin_tracker.release_frame(self.frames[frame_num])
         self.frames[frame_num].pin.count_down()
 
+    def scan_access(self):
+        '''Context manager for merge, index build and scan traffic, pages it reads from disk
+        go to the scan partition so they don't evict the pages of foreground queries'''
+        return self.shared_bufferpool.scan_access()
+
+    def set_share(self, min_frames=0, max_frames=None):
+        '''Sets the minimum and maximum number of frames this table can hold in a shared bufferpool'''
+        self.shared_bufferpool.set_table_share(self.table_id, min_frames, max_frames)
+
     def unload_all_frames(self):
-        '''Unloads all frames in the bufferpool'''
-        fail_count = 0
-        while (not self.unavailable_frames_queue.empty()):
-            if (self.__replacement_policy() is False):
-                fail_count += 1
-                if (fail_count > MAX_NUM_FRAME):
-                    raise MemoryError("Unable to unload all frames")
+        '''Unloads all frames of this table'''
+        self.shared_bufferpool.unload_table_frames(self.table_id)
+        self.storage.flush()
 
-    def __load_new_frame(self, page_path:str) -> Frame:
-        '''Loads a new frame into the bufferpool'''
-        
-        # Note: block inside get can be used to block transactions until a frame is available (Milestone 3)
-        page_frame_num = self.available_frames_queue.get()
-        current_frame:Frame = self.frames[page_frame_num]
-        current_frame.pin.count_up()
+    def flush_dirty_frames(self) -> int:
+        '''Writes every dirty unpinned page of the bufferpool to disk without evicting it'''
+        num_flushed = self.shared_bufferpool.flush_dirty_frames()
+        self.storage.flush()
+        return num_flushed
 
-        current_frame.load_page(page_path)
-        self.frame_directory[page_path] = page_frame_num
-        #print(f"Loading frame {page_frame_num} with {page_path}")
+    def prefetch(self, page_ids) -> int:
+        '''Hints that the pages (see get_page_id) are read soon, they are loaded in the background without being pinned
+        Returns the number of pages queued'''
+        return self.shared_bufferpool.prefetch(self.table_id, page_ids, self.storage)
 
-        self.unavailable_frames_queue.put(page_frame_num)
+    def get_flush_stats(self) -> dict:
+        '''Returns the write back counters of the bufferpool, they cover every table sharing it'''
+        return self.shared_bufferpool.get_flush_stats()
 
-        return current_frame
-    
-    # Refactoring in progress
-    # def __frame_load_policy(self, page_disk_path) -> Frame:
-    #     '''Returns a frame with the disk path, returns false if failed'''
-    #     page_frame_num = self.frame_directory.get(page_disk_path, None)
-    #     current_frame:Frame = None
-
-    #     if (page_frame_num is None):
-    #         if (self.available_frames_queue.empty() and not self.__replacement_policy()):
-    #             # If no frames are available and we were unable to diallocate frames due to lock then returns None
-    #             return False
-
-    #         current_frame:Frame = self.__load_new_frame(page_disk_path)
-    #     else:
-    #         current_frame:Frame = self.frames[page_frame_num]
-    #         current_frame.increment_pin()
-
-    #     return current_frame
-        
-    def __replacement_policy(self) -> bool:
-        '''
-        Using LRU Policy
-        Returns true if we were properly able to allocate new space for a frame
-        '''
-        num_used_frames = self.unavailable_frames_queue.qsize()
+    def stats(self) -> dict:
+        '''Returns the counters of the bufferpool, they cover every table sharing it,
+        resident_table_frames is the number of frames holding pages of this table'''
+        stats = self.shared_bufferpool.get_stats()
+        stats["resident_table_frames"] = stats["table_frames"].get(self.table_id, 0)
+        return stats
 
-        for _ in range(num_used_frames):
-            frame_num = self.unavailable_frames_queue.get()
-            current_frame:Frame = self.frames[frame_num]
+    def reset_stats(self):
+        '''Zeroes the counters of the bufferpool, e.g. between the phases of a benchmark'''
+        self.shared_bufferpool.reset_stats()
 
-            if (current_frame.pin.count == 0):
-                #print(f"deleting {current_frame.page_path} from frame_directory")
-                # If the frame is not being used by any processes then we can deallocate it
-                del self.frame_directory[current_frame.page_path]
-                current_frame.unload_page()
-                self.available_frames_queue.put(frame_num)
-                return True
-            else:
-                # If the frame is being used by a process then we put it back in the queue
-                self.unavailable_frames_queue.put(frame_num)
+    def enable_stats(self, enabled=True):
+        '''Starts or stops counting hits, misses, evictions and I/O latencies'''
+        self.shared_bufferpool.collect_stats = enabled
+
+    def enable_pin_debug(self, enabled=True):
+        '''Starts or stops recording the call site of every pin handed out by the bufferpool,
+        pins taken before pin debugging started are not known to the reports'''
+        if (not enabled):
+            self.shared_bufferpool.pin_tracker = None
+        elif (self.shared_bufferpool.pin_tracker is None):
+            self.shared_bufferpool.pin_tracker = PinTracker()
+
+    def pin_report(self, min_seconds=BUFFERPOOL_LONG_PIN_SECONDS) -> dict:
+        '''Returns the pins held for at least min_seconds and the capacity of the bufferpool they take, see SharedBufferPool.get_pin_report'''
+        return self.shared_bufferpool.get_pin_report(min_seconds)
+
+    def assert_pins_released(self):
+        '''Raises AssertionError if pin debugging is on and the calling thread still holds pins of this table'''
+        pin_tracker = self.shared_bufferpool.pin_tracker
+        if (pin_tracker is None):
+            return
+
+        held_pins = pin_tracker.held_pins(thread_id=threading.get_ident(), table_id=self.table_id)
+        if (held_pins):
+            call_sites = "; ".join(pin_record.call_site for pin_record in held_pins)
+            raise AssertionError(f"{len(held_pins)} pins still held: {call_sites}")
+
+    def close(self):
+        '''Unloads all frames of this table, closes its storage and releases its table id in the shared bufferpool'''
+        if (self.closed):
+            return
+
+        self.closed = True
+        self.unload_all_frames()
+        self.storage.close()
+        self.shared_bufferpool.unregister_table(self.table_id)
+        if (self.owns_shared_bufferpool):
+            self.shared_bufferpool.close()
+
+    def __allocation_error(self) -> str:
+        '''Message of the MemoryError raised when every frame is pinned, names the oldest pins while pin debugging is on'''
+        message = "Unable to allocate new frame"
+        if (self.shared_bufferpool.pin_tracker is not None):
+            oldest_pins = self.shared_bufferpool.pin_tracker.held_pins()[:PIN_CALL_SITE_DEPTH]
+            message += ", oldest pins: " + "; ".join(pin_record.call_site for pin_record in oldest_pins)
+        return message
+
+    def __get_pinned_frame(self, page_id) -> Union[Frame, None]:
+        return self.shared_bufferpool.get_pinned_frame(self.table_id, page_id, self.storage)
+
+
+def get_page_id(page_range_index, record_column, page_index) -> int:
+    '''Packs the location of a page into its compact page id'''
+    return (((page_range_index << RECORD_COLUMN_BITS) | record_column) << PAGE_INDEX_BITS) | page_index
+
+def get_page_location(page_id) -> tuple[int, int, int]:
+    '''Unpacks a page id into (page_range_index, record_column, page_index)'''
+    page_index = page_id & ((1 << PAGE_INDEX_BITS) - 1)
+    record_column = (page_id >> PAGE_INDEX_BITS) & ((1 << RECORD_COLUMN_BITS) - 1)
+    page_range_index = page_id >> (PAGE_INDEX_BITS + RECORD_COLUMN_BITS)
+    return page_range_index, record_column, page_index
+
+def get_call_site(depth=PIN_CALL_SITE_DEPTH) -> str:
+    '''Returns "file:line function" of the first callers outside this module, innermost first'''
+    frame = sys._getframe(1)
+    while (frame is not None and frame.f_code.co_filename == __file__):
+        frame = frame.f_back
 
-        return False
\ No newline at end of file
+    call_sites = []
+    while (frame is not None and len(call_sites) < depth):
+        call_sites.append(f"{os.path.basename(frame.f_code.co_filename)}:{frame.f_lineno} {frame.f_code.co_name}")
+        frame = frame.f_back
+    return " <- ".join(call_sites)
@@ -9,6 +9,29 @@ MAX_PAGE_RANGE = 8
 '''How many base pages are in a Page Range'''
 MAX_RECORD_PER_PAGE_RANGE = MAX_RECORD_PER_PAGE * MAX_PAGE_RANGE
 MAX_TAIL_PAGES_BEFORE_MERGING = 4
+CUMULATIVE_UPDATES = False
+'''Tail records carry every column updated since the last merge of their record, reading the latest values then takes
+the base record and the newest tail record only'''
+FIXED_TAIL_LAYOUT = False
+'''Tail records write every data column at the slot of their logical rid instead of appending updated columns only,
+a tail column is then located by arithmetic instead of through the logical directory of the page range'''
+VERSION_DIRECTORY_MAX_VERSIONS = 32
+'''Versions of each record the version directory of a page range keeps for reading older versions'''
+
+BULK_LOAD_BATCH_SIZE = MAX_RECORD_PER_PAGE
+'''Rows a bulk load checks for duplicate primary keys and writes to the base pages at a time'''
+
+# Merge Scheduler Constants
+MERGE_MIN_UPDATES = MAX_RECORD_PER_PAGE
+'''Updates a page range needs since its last merge before the tail hops of its readers can get it merged'''
+MERGE_MAX_UPDATES = MAX_TAIL_PAGES_BEFORE_MERGING * MAX_RECORD_PER_PAGE
+'''Page ranges with this many updates since their last merge are merged even if nobody reads them'''
+MERGE_SCHEDULER_INTERVAL = 0.05
+'''Seconds the merge scheduler sleeps between rounds'''
+MERGE_BUSY_OPS_PER_SECOND = 20000
+'''Foreground reads and updates per second above which only page ranges past MERGE_MAX_UPDATES are merged, 0 never throttles'''
+MERGE_WORKERS = 1
+'''Merge threads per table, page ranges are merged concurrently and each page range by one thread at a time'''
 
 # Record Constants
 INDIRECTION_COLUMN = 0
@@ -16,6 +39,8 @@ RID_COLUMN = 1
 TIMESTAMP_COLUMN = 2
 UPDATE_TIMESTAMP_COLUMN = 3
 SCHEMA_ENCODING_COLUMN = 4
+TAIL_COLUMNS_COLUMN = UPDATE_TIMESTAMP_COLUMN
+'''Bitmap of the data columns a tail record holds in the fixed tail layout, base records keep their merge time there'''
 
 NUM_HIDDEN_COLUMNS = 5
 
@@ -24,4 +49,50 @@ RECORD_NONE_VALUE = -2
 
 # Buffer Pool Constants
 MAX_NUM_FRAME = 64
-MERGE_FRAME_ALLOCATION = 8
\ No newline at end of file
+MERGE_FRAME_ALLOCATION = 8
+'''Frames per column in the scan partition used by merge, index builds and scans'''
+BUFFERPOOL_NUM_SHARDS = 8
+'''Number of independently locked partitions of a bufferpool'''
+PAGE_INDEX_BITS = 32
+'''Bits of a page id used for the page index'''
+RECORD_COLUMN_BITS = 16
+'''Bits of a page id used for the record column'''
+TABLE_ID_BITS = 16
+'''Bits of a shared bufferpool page key used for the table id'''
+DEFAULT_BUFFERPOOL_SIZE = None
+'''Byte budget of the bufferpool shared by every table of a database, None gives each table its own bufferpool'''
+BUFFERPOOL_FLUSH_RATE = 2000
+'''Maximum dirty pages per second the background flusher writes, 0 disables the flusher'''
+BUFFERPOOL_DIRTY_RATIO = 0.25
+'''The flusher writes pages while more than this fraction of the frames is dirty'''
+BUFFERPOOL_FLUSH_INTERVAL = 0.05
+'''Seconds the flusher sleeps between rounds'''
+BUFFERPOOL_PREFETCH_THREADS = 4
+'''I/O threads reading prefetched pages, 0 disables prefetching and read ahead'''
+BUFFERPOOL_PREFETCH_RATIO = 0.25
+'''At most this fraction of the frames can be queued for prefetching at once'''
+BUFFERPOOL_READ_AHEAD_PAGES = 4
+'''Pages read ahead once the misses of a page range column arrive in page order'''
+BUFFERPOOL_STATS = False
+'''Count hits, misses, evictions and I/O latencies, see BufferPool.stats()'''
+BUFFERPOOL_LATENCY_SAMPLES = 4096
+'''Most recent load and write latencies kept for the percentiles of the bufferpool stats'''
+BUFFERPOOL_PIN_DEBUG = False
+'''Record the call site of every pin handed out by the bufferpool to trace leaked pins, see BufferPool.pin_report()'''
+BUFFERPOOL_LONG_PIN_SECONDS = 1.0
+'''Pins held longer than this are reported as long pins'''
+
+# Replacement Policy Constants
+LRU_POLICY = "lru"
+CLOCK_POLICY = "clock"
+TWO_QUEUE_POLICY = "2q"
+DEFAULT_REPLACEMENT_POLICY = LRU_POLICY
+
+# Storage Engine Constants
+PAGE_FILE_STORAGE = "page_file"
+'''One binary file per page'''
+SEGMENT_STORAGE = "segment"
+'''One memory mapped segment file per column of a page range'''
+DEFAULT_STORAGE_ENGINE = PAGE_FILE_STORAGE
+INITIAL_SEGMENT_PAGES = MAX_PAGE_RANGE * 2
+'''Number of pages a new segment file is sized for, segments double when they run out of space'''
@@ -3,15 +3,32 @@ import json
 from lstore.table import Table
 from lstore.index import Index
 from lstore.lock import LockManager
+from lstore.config import DEFAULT_STORAGE_ENGINE, DEFAULT_REPLACEMENT_POLICY, DEFAULT_BUFFERPOOL_SIZE, PAGE_SIZE, MAX_NUM_FRAME, MERGE_FRAME_ALLOCATION, BUFFERPOOL_STATS, BUFFERPOOL_PIN_DEBUG, BUFFERPOOL_LONG_PIN_SECONDS, MERGE_WORKERS, CUMULATIVE_UPDATES, FIXED_TAIL_LAYOUT
+from lstore.bufferpool import SharedBufferPool
 from BTrees.OOBTree import OOBTree
 import atexit
 import shutil
 
 class Database():
 
-    def __init__(self, path="ECS165 DB"):
+    """
+    :param path: string             #Directory the database is stored in
+    :param replacement_policy: str  #Replacement policy of tables that don't choose their own
+    :param bufferpool_size: int     #Byte budget of a bufferpool shared by every table, None gives each table its own bufferpool
+    """
+    def __init__(self, path="ECS165 DB", replacement_policy=DEFAULT_REPLACEMENT_POLICY, bufferpool_size=DEFAULT_BUFFERPOOL_SIZE):
         self.tables:dict = {}
         self.path = path
+        self.replacement_policy = replacement_policy
+        '''Replacement policy used by tables that don't choose their own'''
+        self.shared_bufferpool = None
+        '''Frames shared by every table, tables use the shared pool's replacement policy'''
+        self.bufferpool_size = bufferpool_size
+        self.collect_stats = BUFFERPOOL_STATS
+        '''If the bufferpools of the tables count hits, misses, evictions and I/O latencies'''
+        self.pin_debug = BUFFERPOOL_PIN_DEBUG
+        '''If the bufferpools of the tables record the call site of every pin'''
+        self.__create_shared_bufferpool()
         self.no_path_set = True
         self.lock_manager = LockManager()
         atexit.register(self.__remove_db_path)
@@ -27,6 +44,10 @@ class Database():
             os.makedirs(path)
 
         atexit.unregister(self.__remove_db_path)
+
+        # close() shuts the shared bufferpool down, a reopened database gets a new one
+        if (self.shared_bufferpool is None):
+            self.__create_shared_bufferpool()
         
         # grab table metadata
         # this logic will be skipped if opening for the first time -- close() aggregates all table metadata into tables.json path
@@ -37,7 +58,14 @@ class Database():
 
                 # loops through tables and adds them to the self.tables dictionary
                 for table_name, table_info in tables_metadata.items():
-                    table = Table(table_name, table_info["num_columns"], table_info["key_index"], self.path, self.lock_manager)
+                    storage_engine = table_info.get("storage_engine", DEFAULT_STORAGE_ENGINE)
+                    replacement_policy = table_info.get("replacement_policy", self.replacement_policy)
+                    merge_workers = table_info.get("merge_workers", MERGE_WORKERS)
+                    cumulative_updates = table_info.get("cumulative_updates", False)
+                    fixed_tail_layout = table_info.get("fixed_tail_layout", False)
+                    table = Table(table_name, table_info["num_columns"], table_info["key_index"], self.path, self.lock_manager, storage_engine, replacement_policy, self.shared_bufferpool, merge_workers, cumulative_updates, fixed_tail_layout)
+                    table.bufferpool.enable_stats(self.collect_stats)
+                    table.bufferpool.enable_pin_debug(self.pin_debug)
                     self.tables[table_name] = table
 
                     # restore table metadata
@@ -52,8 +80,12 @@ class Database():
         tables_metadata = {}
 
         for table_name, table in self.tables.items():
+            # let the merges already scheduled finish before their pages are flushed
+            table.merge_scheduler.close()
+            table.merge_queue.join()
+
             # flush dirty pages from table's bufferpool
-            table.bufferpool.unload_all_frames()
+            table.bufferpool.close()
 
             # serialize table metadata
             tables_metadata[table_name] = table.serialize()
@@ -66,6 +98,11 @@ class Database():
         with open(tables_metadata_path, "w", encoding="utf-8") as file:
             json.dump(tables_metadata, file, indent=4)
 
+        # the shared bufferpool's flusher and prefetch threads stop once every table has left it
+        if (self.shared_bufferpool is not None):
+            self.shared_bufferpool.close()
+            self.shared_bufferpool = None
+
         # clear memory references
         self.tables = {}
 
@@ -75,12 +112,22 @@ class Database():
     :param name: string         #Table name
     :param num_columns: int     #Number of Columns: all columns are integer
     :param key: int             #Index of table key in columns
+    :param storage_engine: str  #PAGE_FILE_STORAGE (one file per page) or SEGMENT_STORAGE (memory mapped segments)
+    :param replacement_policy: str #Bufferpool replacement policy of the table, defaults to the database policy
+    :param merge_workers: int   #Threads merging the page ranges of the table concurrently
+    :param cumulative_updates: bool #Tail records carry every column updated since the last merge of their record
+    :param fixed_tail_layout: bool #Tail records keep every column at the slot of their logical rid, no logical directory
     """
-    def create_table(self, name, num_columns, key_index):
+    def create_table(self, name, num_columns, key_index, storage_engine=DEFAULT_STORAGE_ENGINE, replacement_policy=None, merge_workers=MERGE_WORKERS, cumulative_updates=CUMULATIVE_UPDATES, fixed_tail_layout=FIXED_TAIL_LAYOUT):
         if self.tables.get(name) is not None:
             raise NameError(f"Error creating Table! Following table already exists: {name}")
 
-        self.tables[name] = Table(name, num_columns, key_index, self.path, self.lock_manager)
+        if replacement_policy is None:
+            replacement_policy = self.replacement_policy
+
+        self.tables[name] = Table(name, num_columns, key_index, self.path, self.lock_manager, storage_engine, replacement_policy, self.shared_bufferpool, merge_workers, cumulative_updates, fixed_tail_layout)
+        self.tables[name].bufferpool.enable_stats(self.collect_stats)
+        self.tables[name].bufferpool.enable_pin_debug(self.pin_debug)
         return self.tables[name]
 
     
@@ -91,6 +138,10 @@ class Database():
         if self.tables.get(name) is None:
             raise NameError(f"Error dropping Table! Following table does not exist: {name}")
         
+        # release the table's frames so other tables can use them
+        self.tables[name].merge_scheduler.close()
+        self.tables[name].merge_queue.join()
+        self.tables[name].bufferpool.close()
         del self.tables[name]
 
     
@@ -103,6 +154,79 @@ class Database():
         
         return self.tables[name]
     
+    """
+    # Limits the share of the shared bufferpool a table can use
+    :param min_size: int    #Bytes of the table's pages kept in memory before other tables' pages are evicted
+    :param max_size: int    #Bytes above which the table replaces its own pages, None means no limit
+    """
+    def set_bufferpool_share(self, name, min_size=0, max_size=None):
+        if self.shared_bufferpool is None:
+            raise ValueError("Bufferpool shares need a shared bufferpool, create the database with a bufferpool_size")
+
+        max_frames = None if max_size is None else max_size // PAGE_SIZE
+        self.get_table(name).bufferpool.set_share(min_size // PAGE_SIZE, max_frames)
+
+    """
+    # Returns the bytes of bufferpool memory each table currently uses
+    """
+    def bufferpool_usage(self):
+        return {name: table.bufferpool.num_resident_frames * PAGE_SIZE for name, table in self.tables.items()}
+
+    """
+    # Returns the bufferpool stats of every table, see BufferPool.stats()
+    # Tables using the shared bufferpool report the same counters
+    """
+    def stats(self):
+        return {name: table.bufferpool.stats() for name, table in self.tables.items()}
+
+    """
+    # Starts or stops counting bufferpool hits, misses, evictions and I/O latencies for every table
+    """
+    def enable_stats(self, enabled=True):
+        self.collect_stats = enabled
+        for table in self.tables.values():
+            table.bufferpool.enable_stats(enabled)
+
+    """
+    # Zeroes the bufferpool counters of every table, e.g. between the phases of a benchmark
+    """
+    def reset_stats(self):
+        for table in self.tables.values():
+            table.bufferpool.reset_stats()
+
+    """
+    # Starts or stops recording the call site of every bufferpool pin, transactions then check they released their pins
+    """
+    def enable_pin_debug(self, enabled=True):
+        self.pin_debug = enabled
+        for table in self.tables.values():
+            table.bufferpool.enable_pin_debug(enabled)
+
+    """
+    # Returns the pins of every table held for at least min_seconds, see BufferPool.pin_report()
+    """
+    def pin_report(self, min_seconds=BUFFERPOOL_LONG_PIN_SECONDS):
+        return {name: table.bufferpool.pin_report(min_seconds) for name, table in self.tables.items()}
+
+    """
+    # Returns the merge queue, scheduling counters and tail chain stats of every table, see MergeScheduler.get_stats()
+    """
+    def merge_stats(self):
+        return {name: table.merge_stats() for name, table in self.tables.items()}
+
+    """
+    # Returns the memory used by the in memory structures of every table, see Table.memory_stats()
+    """
+    def memory_stats(self):
+        return {name: table.memory_stats() for name, table in self.tables.items()}
+
+    def __create_shared_bufferpool(self):
+        if (self.bufferpool_size is not None):
+            # The scan partition gets the same fraction of the budget as in the private bufferpools of tables
+            num_frames = self.bufferpool_size // PAGE_SIZE
+            num_scan_frames = num_frames * MERGE_FRAME_ALLOCATION // (MAX_NUM_FRAME + MERGE_FRAME_ALLOCATION)
+            self.shared_bufferpool = SharedBufferPool(num_frames, self.replacement_policy, num_scan_frames=num_scan_frames)
+
     def __remove_db_path(self):
         if os.path.exists(self.path):
             shutil.rmtree(self.path)
@@ -32,6 +32,17 @@ class Index:
             
             return list(self.indices[column].get(value, [])) or None
     
+    """
+    # returns the location of all records with each of the given values on column "column", a list per value
+    # the list of a value without records is empty, returns False if the column has no index
+    """
+    def locate_many(self, column, values):
+        with self.index_lock:
+            if self.indices[column] == None:
+                return False
+
+            return [list(self.indices[column].get(value, [])) for value in values]
+
     """
     # Returns the RIDs of all records with values in column "column" between "begin" and "end" as a list
     # returns None if no rid found
@@ -55,70 +66,35 @@ class Index:
 
             self.indices[column_number] = OOBTree()
             # go through value mapper to create new index
-            all_base_rids = self.grab_all()
-
-            column_value =  None
-            tail_timestamp = 0
-            tail = False
-            #read through bufferpool to get latest tail record
-            for rid in all_base_rids:
-
-                page_range_index, page_index, page_slot = self.table.get_base_record_location(rid)
-
-                indir_rid = self.table.bufferpool.read_page_slot(page_range_index, INDIRECTION_COLUMN, page_index, page_slot)
-                frame_num  = self.table.bufferpool.get_page_frame_num(page_range_index, INDIRECTION_COLUMN, page_index)
-                self.table.bufferpool.mark_frame_used(frame_num)
-
-                base_schema = self.table.bufferpool.read_page_slot(page_range_index, SCHEMA_ENCODING_COLUMN, page_index, page_slot)
-                frame_num  = self.table.bufferpool.get_page_frame_num(page_range_index, SCHEMA_ENCODING_COLUMN, page_index)
-                self.table.bufferpool.mark_frame_used(frame_num)
-
-                """ Referencing latest tail page search from sum version """
-                if indir_rid == (rid % MAX_RECORD_PER_PAGE_RANGE) : # if no updates
-
-                    column_value = self.table.bufferpool.read_page_slot(page_range_index, column_number + NUM_HIDDEN_COLUMNS, page_index, page_slot)
-                    frame_num  = self.table.bufferpool.get_page_frame_num(page_range_index, column_number + NUM_HIDDEN_COLUMNS, page_index)
-                    self.table.bufferpool.mark_frame_used(frame_num)
-
-                else: #if updates
-
-                    base_timestamp = self.table.bufferpool.read_page_slot(page_range_index, TIMESTAMP_COLUMN, page_index, page_slot)
-                    frame_num  = self.table.bufferpool.get_page_frame_num(page_range_index, TIMESTAMP_COLUMN, page_index)
-                    self.table.bufferpool.mark_frame_used(frame_num)
-
-                    if(base_schema >> column_number) & 1:
-
-                        while True:
-                            try:
-                                tail_page_index, tail_slot = self.table.page_ranges[page_range_index].get_column_location(indir_rid, column_number + NUM_HIDDEN_COLUMNS)
-                                tail_timestamp = self.table.page_ranges[page_range_index].read_tail_record_column(indir_rid, TIMESTAMP_COLUMN)
-                                tail = True
-                                break
-                            except:
-
-                                prev_rid = indir_rid
-                                indir_rid = self.table.page_ranges[page_range_index].read_tail_record_column(indir_rid, INDIRECTION_COLUMN)
-
-                                if indir_rid == rid: #edge case where latest updated column value is in the first tail record inserted
-                                    least_updated_tail_rid = self.table.page_ranges[page_range_index].read_tail_record_column(prev_rid, RID_COLUMN)
-                                    tail_page_index, tail_slot = self.table.page_ranges[page_range_index].get_column_location(least_updated_tail_rid, column_number + NUM_HIDDEN_COLUMNS)
-                                    tail_timestamp = self.table.page_ranges[page_range_index].read_tail_record_column(least_updated_tail_rid, TIMESTAMP_COLUMN)
-                                    tail = True
-                                    break
-
-                    # if the tail page for column is latest updated 
-                    if (base_schema >> column_number) & 1 and tail_timestamp >= base_timestamp and tail:
-                        column_value = self.table.bufferpool.read_page_slot(page_range_index, column_number + NUM_HIDDEN_COLUMNS, tail_page_index, tail_slot)
-                        frame_num  = self.table.bufferpool.get_page_frame_num(page_range_index, column_number + NUM_HIDDEN_COLUMNS, page_index)
-                        self.table.bufferpool.mark_frame_used(frame_num)
-
-                    else: # if merged page is latest updated
-                        column_value = self.table.bufferpool.read_page_slot(page_range_index, column_number + NUM_HIDDEN_COLUMNS, page_index, page_slot)
-                        frame_num  = self.table.bufferpool.get_page_frame_num(page_range_index, column_number + NUM_HIDDEN_COLUMNS, page_index)
-                        self.table.bufferpool.mark_frame_used(frame_num)
+            # Building an index reads every base page, keep them in the scan partition of the bufferpool
+            with self.table.bufferpool.scan_access():
+                all_base_rids = self.grab_all()
+                self.table.prefetch_base_pages(all_base_rids, [INDIRECTION_COLUMN, SCHEMA_ENCODING_COLUMN, TIMESTAMP_COLUMN, column_number + NUM_HIDDEN_COLUMNS])
+
+                column_value =  None
+                #read through bufferpool to get latest tail record
+                for rid in all_base_rids:
+
+                    page_range_index, page_index, page_slot = self.table.get_base_record_location(rid)
+                    with self.table.read_base_page(page_range_index, page_index) as base_page:
+
+                        indir_rid = self.table.bufferpool.read_slot(page_range_index, INDIRECTION_COLUMN, page_index, page_slot)
+                        base_schema = self.table.bufferpool.read_slot(page_range_index, SCHEMA_ENCODING_COLUMN, page_index, page_slot)
+
+                        """ Referencing latest tail page search from sum version """
+                        tail_location = None
+                        if (base_schema >> column_number) & 1: #if updates
+                            tail_location = self.table.page_ranges[page_range_index].find_tail_column_location(indir_rid, column_number + NUM_HIDDEN_COLUMNS)
+
+                        # if the tail page for column is latest updated 
+                        if tail_location is not None and tail_location[2] >= self.table.bufferpool.read_slot(page_range_index, TIMESTAMP_COLUMN, page_index, page_slot):
+                            column_value = self.table.bufferpool.read_slot(page_range_index, column_number + NUM_HIDDEN_COLUMNS, tail_location[0], tail_location[1])
+
+                        else: # if no updates or merged page is latest updated
+                            column_value = self.table.bufferpool.read_slot(page_range_index, column_number + NUM_HIDDEN_COLUMNS, base_page.page_indexes[column_number], page_slot)
                 
-                #insert {primary_index: {rid: True}} into primary index BTree
-                self.insert_to_index(column_number, column_value, rid)
+                    #insert {primary_index: {rid: True}} into primary index BTree
+                    self.insert_to_index(column_number, column_value, rid)
 
             return True
         else:
@@ -171,6 +147,37 @@ class Index:
 
         return True
     
+    """
+    # Returns the values, out of the given values, that records already have in the index of column "column"
+    """
+    def get_existing_values(self, column, values) -> set:
+        with self.index_lock:
+            index = self.indices[column]
+            return {value for value in values if index.get(value)}
+
+    """
+    # Adds records loaded by Table.bulk_load to the index of column "column", values[i] is the value of rids[i]
+    # Entries are grouped by value and go into the BTree in sorted order
+    """
+    def bulk_insert(self, column, values, rids):
+        entries = {}
+        for value, rid in zip(values, rids):
+            value_rids = entries.get(value)
+            if value_rids is None:
+                entries[value] = {rid: True}
+            else:
+                value_rids[rid] = True
+
+        with self.index_lock:
+            index = self.indices[column]
+            if index is None:
+                return False
+
+            for value in [value for value in entries if index.get(value)]:
+                index[value].update(entries.pop(value))
+            index.update(sorted(entries.items()))
+            return True
+
     """
     # Takes a record and insert it into value_mapper, primary and secondary index
     """
@@ -219,38 +226,50 @@ class Index:
     """
     def update_all_indices(self, primary_key, new_columns, prev_columns):
         with self.index_lock:
-            #get rid from primary key
-            if not self.indices[self.key].get(primary_key):
-                return False
-            
-            rid = list(self.indices[self.key][primary_key].keys())[0]
+            return self.__update_indices(primary_key, new_columns, prev_columns)
+
+    """
+    # update the indices for many updates in one critical section, changes holds (primary_key, new_columns, prev_columns)
+    # of every update in the order they were made
+    """
+    def update_many_indices(self, changes):
+        with self.index_lock:
+            for primary_key, new_columns, prev_columns in changes:
+                self.__update_indices(primary_key, new_columns, prev_columns)
+
+    def __update_indices(self, primary_key, new_columns, prev_columns):
+        #get rid from primary key
+        if not self.indices[self.key].get(primary_key):
+            return False
+        
+        rid = list(self.indices[self.key][primary_key].keys())[0]
 
-            #update primary key first if needed
-            if (new_columns[NUM_HIDDEN_COLUMNS + self.key] != None) and  (self.indices[self.key] != None) and (prev_columns[self.key] != None):
+        #update primary key first if needed
+        if (new_columns[NUM_HIDDEN_COLUMNS + self.key] != None) and  (self.indices[self.key] != None) and (prev_columns[self.key] != None):
 
-                if self.indices[self.key].get(primary_key) and self.indices[self.key][primary_key].get(rid, []):
-                    del self.indices[self.key][primary_key][rid]
+            if self.indices[self.key].get(primary_key) and self.indices[self.key][primary_key].get(rid, []):
+                del self.indices[self.key][primary_key][rid]
 
-                    if self.indices[self.key][primary_key] == {}:
-                        del self.indices[self.key][primary_key]
-                    self.insert_to_index(self.key, new_columns[self.key + NUM_HIDDEN_COLUMNS], rid)
-                        
-                primary_key = new_columns[self.key + NUM_HIDDEN_COLUMNS]
-            
-            #update other indices
-            for i in range(0, self.num_columns):
-                if (new_columns[NUM_HIDDEN_COLUMNS + i] != None) and (self.indices[i] != None) and (prev_columns[i] != None) and (i != self.key):
-                    key = prev_columns[i]
+                if self.indices[self.key][primary_key] == {}:
+                    del self.indices[self.key][primary_key]
+                self.insert_to_index(self.key, new_columns[self.key + NUM_HIDDEN_COLUMNS], rid)
+                    
+            primary_key = new_columns[self.key + NUM_HIDDEN_COLUMNS]
+        
+        #update other indices
+        for i in range(0, self.num_columns):
+            if (new_columns[NUM_HIDDEN_COLUMNS + i] != None) and (self.indices[i] != None) and (prev_columns[i] != None) and (i != self.key):
+                key = prev_columns[i]
 
-                    if self.indices[i].get(key) and self.indices[i][key].get(rid, []):
-                        del self.indices[i][key][rid]
+                if self.indices[i].get(key) and self.indices[i][key].get(rid, []):
+                    del self.indices[i][key][rid]
 
-                        if self.indices[i][key] == {}:
-                            del self.indices[i][key]
+                    if self.indices[i][key] == {}:
+                        del self.indices[i][key]
 
-                        self.insert_to_index(i, new_columns[i + NUM_HIDDEN_COLUMNS], rid)
+                    self.insert_to_index(i, new_columns[i + NUM_HIDDEN_COLUMNS], rid)
 
-            return True
+        return True
     
 
     """
@@ -38,6 +38,41 @@ class Latch:
             while self.count > 0:
                 self.lock.wait()
                 
+class PinCount:
+    '''Pin count of a bufferpool frame, pinning and unpinning take one plain lock.
+    A condition is only created once a thread has to wait for the frame to be unpinned'''
+    __slots__ = ("count", "lock", "unpinned", "num_waiters")
+
+    def __init__(self, count=0):
+        self.count = count
+        self.lock = threading.Lock()
+        self.unpinned:threading.Condition = None
+        self.num_waiters = 0
+
+    def count_up(self):
+        with self.lock:
+            self.count += 1
+
+    def count_down(self):
+        with self.lock:
+            self.count -= 1
+            if self.num_waiters and self.count <= 0:
+                self.unpinned.notify_all()
+
+    def await_unpinned(self, timeout=None) -> bool:
+        '''Waits until the frame is unpinned, returns False if it is still pinned after timeout seconds'''
+        with self.lock:
+            if self.count <= 0:
+                return True
+            if self.unpinned is None:
+                self.unpinned = threading.Condition(self.lock)
+
+            self.num_waiters += 1
+            try:
+                return self.unpinned.wait_for(lambda: self.count <= 0, timeout)
+            finally:
+                self.num_waiters -= 1
+
 class WaitForGraph:
     def __init__(self):
         self.graph = defaultdict(lambda: set())
@@ -0,0 +1,111 @@
+'''
+The logical directory of a page range maps the logical rid of every tail record to the physical rid of each data column
+the tail record holds. Entries live in one preallocated array("i"), indexed by logical_rid - MAX_RECORD_PER_PAGE_RANGE
+with num_columns slots per tail record, columns a tail record doesn't hold keep NO_PHYSICAL_RID.
+The directory is saved as a binary file: a header followed by the raw array.
+'''
+
+from lstore.config import *
+from array import array
+from typing import Union
+import struct
+import sys
+import os
+
+NO_PHYSICAL_RID = -1
+'''Entry of a column the tail record doesn't hold'''
+
+LOGICAL_DIRECTORY_MAGIC = b"LSLD"
+LOGICAL_DIRECTORY_VERSION = 1
+LOGICAL_DIRECTORY_HEADER = struct.Struct("=4sHHI")
+'''Binary logical directory header: magic, format version, num_columns, num_records'''
+
+INITIAL_LOGICAL_DIRECTORY_RECORDS = MAX_RECORD_PER_PAGE
+'''Tail records a new logical directory has room for, the array doubles when it runs out'''
+
+
+class LogicalDirectory:
+    '''
+    :param num_columns: int     #Data columns of the table
+    '''
+    def __init__(self, num_columns):
+        self.num_columns = num_columns
+        self.num_records = 0
+        '''Tail records up to the highest logical rid added'''
+        self.physical_rids = array("i", [NO_PHYSICAL_RID]) * (INITIAL_LOGICAL_DIRECTORY_RECORDS * num_columns)
+
+    def add_record(self, logical_rid):
+        '''Makes room for a tail record, a recycled logical rid starts without columns'''
+        record_index = logical_rid - MAX_RECORD_PER_PAGE_RANGE
+        offset = record_index * self.num_columns
+        if (offset + self.num_columns > len(self.physical_rids)):
+            capacity = max(len(self.physical_rids) * 2, offset + self.num_columns)
+            self.physical_rids.extend(array("i", [NO_PHYSICAL_RID]) * (capacity - len(self.physical_rids)))
+
+        self.physical_rids[offset:offset + self.num_columns] = array("i", [NO_PHYSICAL_RID]) * self.num_columns
+        self.num_records = max(self.num_records, record_index + 1)
+
+    def set(self, logical_rid, column, physical_rid):
+        '''Sets where a data column (0 for the first data column) of a tail record is stored'''
+        self.physical_rids[(logical_rid - MAX_RECORD_PER_PAGE_RANGE) * self.num_columns + column] = physical_rid
+
+    def get(self, logical_rid, column) -> Union[int, None]:
+        '''Returns the physical rid of a data column of a tail record, None if the tail record doesn't hold the column'''
+        physical_rid = self.physical_rids[(logical_rid - MAX_RECORD_PER_PAGE_RANGE) * self.num_columns + column]
+        return None if physical_rid == NO_PHYSICAL_RID else physical_rid
+
+    def get_record(self, logical_rid) -> list:
+        '''Returns the physical rid of every data column of a tail record, None for the columns it doesn't hold'''
+        offset = (logical_rid - MAX_RECORD_PER_PAGE_RANGE) * self.num_columns
+        return [None if physical_rid == NO_PHYSICAL_RID else physical_rid for physical_rid in self.physical_rids[offset:offset + self.num_columns]]
+
+    def get_stats(self) -> dict:
+        '''Returns the number of tail records, the capacity and the memory of the directory'''
+        return {
+            "records": self.num_records,
+            "capacity": len(self.physical_rids) // self.num_columns,
+            "bytes": sys.getsizeof(self.physical_rids)
+        }
+
+    def save(self, path):
+        '''Writes the entries of the tail records added so far to a binary file'''
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as directory_file:
+            directory_file.write(LOGICAL_DIRECTORY_HEADER.pack(LOGICAL_DIRECTORY_MAGIC, LOGICAL_DIRECTORY_VERSION, self.num_columns, self.num_records))
+            directory_file.write(memoryview(self.physical_rids)[:self.num_records * self.num_columns])
+
+    def load(self, path):
+        '''Reads a file written by save'''
+        with open(path, "rb") as directory_file:
+            magic, version, num_columns, num_records = LOGICAL_DIRECTORY_HEADER.unpack(directory_file.read(LOGICAL_DIRECTORY_HEADER.size))
+            if (magic != LOGICAL_DIRECTORY_MAGIC):
+                raise ValueError(f"{path} is not a logical directory file")
+            if (version != LOGICAL_DIRECTORY_VERSION):
+                raise ValueError(f"Unsupported logical directory version {version}")
+            if (num_columns != self.num_columns):
+                raise ValueError(f"Logical directory has {num_columns} columns, expected {self.num_columns}")
+
+            physical_rids = array("i")
+            physical_rids.frombytes(directory_file.read())
+        if (len(physical_rids) != num_records * num_columns):
+            raise ValueError("Logical directory file is truncated")
+
+        self.num_records = num_records
+        capacity = max(INITIAL_LOGICAL_DIRECTORY_RECORDS, num_records) * num_columns
+        self.physical_rids = physical_rids
+        self.physical_rids.extend(array("i", [NO_PHYSICAL_RID]) * (capacity - len(physical_rids)))
+
+    def load_dict(self, json_directory):
+        '''Reads the logical directory of metadata saved before the binary format, {logical_rid: [physical_rid or None]}'''
+        for logical_rid, physical_rids in sorted((int(logical_rid), physical_rids) for logical_rid, physical_rids in json_directory.items()):
+            self.add_record(logical_rid)
+            for column, physical_rid in enumerate(physical_rids):
+                if (physical_rid is not None):
+                    self.set(logical_rid, column, physical_rid)
+
+    def __eq__(self, other) -> bool:
+        if (not isinstance(other, LogicalDirectory)):
+            return NotImplemented
+        num_entries = self.num_records * self.num_columns
+        return self.num_columns == other.num_columns and self.num_records == other.num_records and \
+            self.physical_rids[:num_entries] == other.physical_rids[:num_entries]
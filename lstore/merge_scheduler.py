@@ -0,0 +1,251 @@
+'''
+The merge scheduler decides which page ranges the merge workers of a table consolidate next
+Queries report the updates of every page range and the tail records readers walked through to reach its latest values,
+the page range whose merge saves readers the most tail hops goes first. Page ranges nobody reads are merged once
+their tail chains get too long, and while the foreground is busy only those merges are scheduled.
+'''
+
+from lstore.config import *
+from lstore.page_range import MergeRequest
+from time import monotonic
+from typing import Union
+from collections import deque
+import threading
+import queue
+
+
+class MergeQueue(queue.Queue):
+    '''Merge queue holding at most one request per page range, requests for a page range already waiting are dropped.
+    A page range being merged can be queued again, its merge lock keeps the second merge waiting for the first'''
+    def _init(self, maxsize):
+        self.queue = deque()
+        self.queued_page_ranges = set()
+        self.coalesced_requests = 0
+        '''Requests dropped because their page range was already waiting'''
+
+    def _put(self, merge_request:MergeRequest):
+        self.queue.append(merge_request)
+        self.queued_page_ranges.add(merge_request.page_range_index)
+
+    def _get(self) -> MergeRequest:
+        merge_request = self.queue.popleft()
+        self.queued_page_ranges.discard(merge_request.page_range_index)
+        return merge_request
+
+    def put(self, merge_request:MergeRequest, block=True, timeout=None) -> bool:
+        '''Queues the merge of a page range, returns False if its page range is already waiting.
+        The queue is unbounded so puts never block'''
+        with self.not_full:
+            if (merge_request.page_range_index in self.queued_page_ranges):
+                self.coalesced_requests += 1
+                return False
+
+            self._put(merge_request)
+            self.unfinished_tasks += 1
+            self.not_empty.notify()
+            return True
+
+    def get_queued_page_ranges(self) -> set:
+        with self.mutex:
+            return set(self.queued_page_ranges)
+
+    def get_backlog(self) -> tuple[int, int]:
+        '''Returns the number of merges waiting and the number of merges running'''
+        with self.mutex:
+            return len(self.queue), self.unfinished_tasks - len(self.queue)
+
+
+class PageRangeMergeStats:
+    '''What the scheduler knows about a page range since its last merge started.
+    Queries count without a lock, a lost increment only shifts the priority a little'''
+    __slots__ = ("updates", "reads", "tail_hops", "since")
+
+    def __init__(self):
+        self.updates = 0
+        '''Tail records written, each one adds a hop to the chain of its record'''
+        self.reads = 0
+        '''Records read'''
+        self.tail_hops = 0
+        '''Tail records readers walked through, a merge saves the ones behind merged records'''
+        self.since = monotonic()
+
+    def get_rates(self, now) -> tuple[float, float, float]:
+        '''Returns the updates, reads and tail hops per second'''
+        elapsed = max(now - self.since, MERGE_SCHEDULER_INTERVAL)
+        return self.updates / elapsed, self.reads / elapsed, self.tail_hops / elapsed
+
+    def get_priority(self, now) -> float:
+        '''Tail hops readers pay per second, discounted by how fast updates grow the chains back after a merge'''
+        update_rate, _, hop_rate = self.get_rates(now)
+        return hop_rate / (1 + update_rate / MAX_RECORD_PER_PAGE_RANGE)
+
+    def as_dict(self, now) -> dict:
+        update_rate, read_rate, hop_rate = self.get_rates(now)
+        return {
+            "updates": self.updates,
+            "reads": self.reads,
+            "tail_hops": self.tail_hops,
+            "average_chain_length": self.updates / MAX_RECORD_PER_PAGE_RANGE,
+            "read_amplification": self.tail_hops / self.reads if self.reads else 0.0,
+            "update_rate": update_rate,
+            "read_rate": read_rate,
+            "tail_hop_rate": hop_rate,
+            "priority": self.get_priority(now)
+        }
+
+
+class MergeScheduler:
+    '''
+    Puts MergeRequests for the best page ranges on the merge queue whenever a merge worker is idle
+    :param merge_queue: MergeQueue      #Merge queue drained by the merge workers of the table
+    :param min_updates: int             #Updates a page range needs before its readers can get it merged
+    :param max_updates: int             #Updates after which a page range is merged even if nobody reads it
+    :param busy_ops_per_second: int     #Foreground rate above which only page ranges past max_updates are merged, 0 never throttles
+    :param interval: float              #Seconds between scheduling rounds, 0 leaves scheduling to next_merge calls
+    :param max_merges: int              #Merges scheduled at once, one per merge worker
+    '''
+    def __init__(self, merge_queue:MergeQueue, min_updates=MERGE_MIN_UPDATES, max_updates=MERGE_MAX_UPDATES, busy_ops_per_second=MERGE_BUSY_OPS_PER_SECOND, interval=MERGE_SCHEDULER_INTERVAL, max_merges=MERGE_WORKERS):
+        self.merge_queue = merge_queue
+        self.max_merges = max_merges
+        self.min_updates = min_updates
+        self.max_updates = max_updates
+        self.busy_ops_per_second = busy_ops_per_second
+        self.interval = interval
+        self.enabled = True
+        '''If False page ranges are still tracked but merges are only requested by hand'''
+
+        self.page_ranges = {}
+        '''Maps page_range_index to its PageRangeMergeStats'''
+        self.merging_page_ranges = set()
+        '''Page ranges a merge worker is merging, they are not scheduled again until their merge is done'''
+        self.scheduler_lock = threading.Lock()
+
+        self.foreground_ops = 0
+        '''Reads and updates reported so far'''
+        self.foreground_rate = 0.0
+        '''Reads and updates per second over the last scheduling round'''
+        self.last_round = (monotonic(), 0)
+        '''Time and foreground_ops of the last scheduling round'''
+        self.throttled = False
+        '''If the last scheduling round found the foreground busy'''
+
+        self.scheduled_merges = 0
+        self.forced_merges = 0
+        '''Scheduled merges of page ranges past max_updates'''
+        self.throttled_rounds = 0
+        '''Rounds that held back a merge because the foreground was busy'''
+        self.merges_started = 0
+
+        self.stop_event = threading.Event()
+        self.scheduler_thread = None
+        if (interval > 0):
+            self.scheduler_thread = threading.Thread(target=self.__schedule_worker, daemon=True)
+            self.scheduler_thread.start()
+
+    def record_update(self, page_range_index):
+        self.__get_page_range(page_range_index).updates += 1
+        self.foreground_ops += 1
+
+    def record_read(self, page_range_index, tail_hops):
+        '''Counts a record read and the tail records walked to read it'''
+        page_range_stats = self.__get_page_range(page_range_index)
+        page_range_stats.reads += 1
+        page_range_stats.tail_hops += tail_hops
+        self.foreground_ops += 1
+
+    def merge_started(self, page_range_index):
+        '''Called by the merge thread before it copies a page range, everything counted so far gets merged'''
+        with self.scheduler_lock:
+            self.page_ranges[page_range_index] = PageRangeMergeStats()
+            self.merging_page_ranges.add(page_range_index)
+            self.merges_started += 1
+
+    def merge_finished(self, page_range_index):
+        with self.scheduler_lock:
+            self.merging_page_ranges.discard(page_range_index)
+
+    def next_merge(self, exclude=()) -> Union[int, None]:
+        '''Returns the page range that should be merged next, None if no page range needs a merge right now.
+        Page ranges being merged and the excluded ones are skipped'''
+        now = monotonic()
+        with self.scheduler_lock:
+            last_time, last_ops = self.last_round
+            if (now > last_time):
+                self.foreground_rate = (self.foreground_ops - last_ops) / (now - last_time)
+                self.last_round = (now, self.foreground_ops)
+            self.throttled = (self.busy_ops_per_second > 0 and self.foreground_rate > self.busy_ops_per_second)
+
+            best_priority = None
+            best_page_range = None
+            held_back = False
+            for page_range_index, page_range_stats in self.page_ranges.items():
+                if (page_range_index in self.merging_page_ranges or page_range_index in exclude):
+                    continue
+
+                forced = page_range_stats.updates >= self.max_updates
+                if (not forced and (page_range_stats.updates < self.min_updates or page_range_stats.tail_hops == 0)):
+                    continue
+                if (not forced and self.throttled):
+                    held_back = True
+                    continue
+
+                priority = (page_range_stats.get_priority(now), page_range_stats.updates)
+                if (best_priority is None or priority > best_priority):
+                    best_priority = priority
+                    best_page_range = page_range_index
+
+            if (held_back and best_page_range is None):
+                self.throttled_rounds += 1
+            if (best_page_range is not None):
+                self.scheduled_merges += 1
+                self.forced_merges += (self.page_ranges[best_page_range].updates >= self.max_updates)
+            return best_page_range
+
+    def get_stats(self) -> dict:
+        '''Returns the merge queue, the scheduling policy counters and what is known about every page range'''
+        now = monotonic()
+        queued_merges, running_merges = self.merge_queue.get_backlog()
+        with self.scheduler_lock:
+            return {
+                "merge_workers": self.max_merges,
+                "queue_length": queued_merges,
+                "running_merges": running_merges,
+                "backlog": queued_merges + running_merges,
+                "coalesced_requests": self.merge_queue.coalesced_requests,
+                "foreground_ops_per_second": self.foreground_rate,
+                "throttled": self.throttled,
+                "scheduled_merges": self.scheduled_merges,
+                "forced_merges": self.forced_merges,
+                "throttled_rounds": self.throttled_rounds,
+                "merges_started": self.merges_started,
+                "page_ranges": {page_range_index: page_range_stats.as_dict(now) for page_range_index, page_range_stats in self.page_ranges.items()}
+            }
+
+    def close(self):
+        '''Stops the scheduler thread, merges already on the queue still run'''
+        self.stop_event.set()
+        if (self.scheduler_thread is not None):
+            self.scheduler_thread.join()
+            self.scheduler_thread = None
+
+    def __get_page_range(self, page_range_index) -> PageRangeMergeStats:
+        page_range_stats = self.page_ranges.get(page_range_index, None)
+        if (page_range_stats is None):
+            with self.scheduler_lock:
+                page_range_stats = self.page_ranges.setdefault(page_range_index, PageRangeMergeStats())
+        return page_range_stats
+
+    def __schedule_worker(self):
+        while (not self.stop_event.wait(self.interval)):
+            # Only idle workers get a merge, later picks see the reads and updates made during the running merges
+            if (not self.enabled):
+                continue
+
+            queued_merges, running_merges = self.merge_queue.get_backlog()
+            scheduled = self.merge_queue.get_queued_page_ranges()
+            for _ in range(self.max_merges - queued_merges - running_merges):
+                page_range_index = self.next_merge(scheduled)
+                if (page_range_index is None):
+                    break
+                self.merge_queue.put(MergeRequest(page_range_index))
+                scheduled.add(page_range_index)
@@ -1,18 +1,32 @@
 from lstore.config import *
+from array import array
 import struct
 import base64
 import zlib
 
+PAGE_FILE_MAGIC = b"LSPG"
+PAGE_FILE_VERSION = 1
+PAGE_FILE_HEADER = struct.Struct("=4sHHI")
+'''Binary page file header: magic, format version, reserved, num_records'''
+PAGE_FILE_SIZE = PAGE_FILE_HEADER.size + PAGE_SIZE
+
+EMPTY_PAGE_DATA = bytes(PAGE_SIZE)
+
 class Page:
-    def __init__(self):
+    def __init__(self, data=None):
         self.num_records = 0
-        self.data = bytearray(PAGE_SIZE)
+        self.data = bytearray(PAGE_SIZE) if data is None else data
+        '''Either an owned bytearray or a writable memoryview into a memory mapped segment'''
+        self.values = memoryview(self.data).cast("i")
+        '''Integer view over the same buffer as data, every slot read and write goes through it'''
+        self.header = bytearray(PAGE_FILE_HEADER.size)
+        '''Reusable buffer for the binary file header'''
 
     def has_capacity(self):
         return self.num_records < MAX_RECORD_PER_PAGE
 
     def write(self, value):
-        struct.pack_into("i", self.data, self.num_records * INTEGER_BYTE_SIZE, value)
+        self.values[self.num_records] = value
         self.num_records += 1
         return (self.num_records - 1)
 
@@ -21,12 +35,86 @@ class Page:
         This function should be able to write data on a precise index inside the table.
         Useful for changing the indirection column on the base page
         '''
-        struct.pack_into("i", self.data, index * INTEGER_BYTE_SIZE, value)
+        self.values[index] = value
 
     def get(self, index):
         '''This funciton should be able to grab a data located at a certain index in the page'''
-        return struct.unpack_from("i", self.data, index * INTEGER_BYTE_SIZE)[0]
-    
+        return self.values[index]
+
+    def get_many(self, indexes) -> list:
+        '''Returns the values stored at each of the given indexes'''
+        values = self.values
+        return [values[index] for index in indexes]
+
+    def read_all(self) -> list:
+        '''Returns every slot of the page, base pages are written with write_precise so
+        num_records does not bound them'''
+        return self.values.tolist()
+
+    def write_many(self, indexes, values):
+        '''Writes each value to its matching index'''
+        page_values = self.values
+        for index, value in zip(indexes, values):
+            page_values[index] = value
+
+    def write_range(self, first_index, values):
+        '''Writes an array("i") to consecutive slots starting at first_index'''
+        self.values[first_index:first_index + len(values)] = values
+
+    def write_all(self, values):
+        '''Overwrites every slot of the page with an array("i") of MAX_RECORD_PER_PAGE values'''
+        self.values[:] = values
+
+    def append_many(self, values) -> int:
+        '''Appends the values after the last record, returns the slot of the first appended value'''
+        values = array("i", values)
+        first_slot = self.num_records
+        if (first_slot + len(values) > MAX_RECORD_PER_PAGE):
+            raise ValueError("Not enough capacity in the page to append all values")
+
+        self.values[first_slot:first_slot + len(values)] = values
+        self.num_records += len(values)
+        return first_slot
+
+    def clear(self):
+        '''Resets the page so its buffer can be reused for another page'''
+        self.num_records = 0
+        self.data[:] = EMPTY_PAGE_DATA
+
+    def write_header(self, header):
+        '''Packs the binary page header into the given buffer'''
+        PAGE_FILE_HEADER.pack_into(header, 0, PAGE_FILE_MAGIC, PAGE_FILE_VERSION, 0, self.num_records)
+
+    def read_header(self, header) -> bool:
+        '''Restores num_records from a binary page header, returns False if the buffer holds no page header'''
+        magic, version, _, num_records = PAGE_FILE_HEADER.unpack_from(header)
+        if (magic != PAGE_FILE_MAGIC):
+            return False
+        if (version != PAGE_FILE_VERSION):
+            raise ValueError(f"Unsupported page file version {version}")
+
+        self.num_records = num_records
+        return True
+
+    def write_to_file(self, page_file):
+        '''Writes the page in the binary page format (header followed by the raw page data)'''
+        self.write_header(self.header)
+        page_file.write(self.header)
+        page_file.write(self.data)
+
+    def read_from_file(self, page_file) -> bool:
+        '''Reads a page written by write_to_file into the existing buffers,
+        returns False if the file is not in the binary page format'''
+        if (page_file.readinto(self.header) != PAGE_FILE_HEADER.size):
+            return False
+
+        if (not self.read_header(self.header)):
+            return False
+
+        if (page_file.readinto(self.data) != PAGE_SIZE):
+            raise ValueError("Page file is truncated")
+        return True
+
     def serialize(self):
         '''Returns page metadata as a JSON-compatible dictionary'''
         compressed_data = zlib.compress(self.data)
@@ -41,4 +129,4 @@ class Page:
         '''Loads a page from serialized data'''
         self.num_records = json_data["num_records"]
         compressed_data = base64.b64decode(json_data["data"])
-        self.data = bytearray(zlib.decompress(compressed_data))
+        self.data[:] = zlib.decompress(compressed_data)
@@ -1,8 +1,13 @@
 import threading
 from lstore.config import *
-from lstore.bufferpool import BufferPool
+from lstore.bufferpool import BufferPool, get_page_id
+from lstore.lock import PinCount
+from lstore.version_directory import VersionDirectory
+from lstore.logical_directory import LogicalDirectory
+from array import array
 import json
-from typing import Type
+import os
+from typing import Type, Union
 import queue
 
 class MergeRequest:
@@ -11,16 +16,36 @@ class MergeRequest:
         self.turn_off = turn_off
         self.page_range_index = page_range_index
 
+class BasePageVersion:
+    '''The pages holding the data columns of a base page, merges swap in a new version instead of writing into the current one'''
+    __slots__ = ("page_indexes", "tps", "merge_times", "readers")
+
+    def __init__(self, page_indexes, tps=0, merge_times=None):
+        self.page_indexes = page_indexes
+        '''Page index of every data column'''
+        self.tps = tps
+        '''Timestamp of the newest tail record merged into the version'''
+        self.merge_times:array = merge_times
+        '''Timestamp of the newest tail record merged into each slot, tail records up to it are in the version.
+        None until loaded from the UPDATE_TIMESTAMP_COLUMN, which is only written after the version is replaced'''
+        self.readers = PinCount()
+        '''Readers holding the version, a replaced version is reclaimed once none are left'''
+
 class PageRange:
     '''
     Each PageRange contains all columns of a record
     Indirection column of a base page would contain the logical_rid of its corresponding tail record
     '''
 
-    def __init__(self, page_range_index, num_columns, bufferpool:BufferPool):
+    def __init__(self, page_range_index, num_columns, bufferpool:BufferPool, page_directory=None, fixed_tail_layout=FIXED_TAIL_LAYOUT):
         self.bufferpool = bufferpool
-        self.logical_directory = {}
-        '''Maps logical rid's to physical locations in page for each column (except hidden columns)'''
+        self.fixed_tail_layout = fixed_tail_layout
+        '''Tail records keep every data column at the slot of their logical rid, see FIXED_TAIL_LAYOUT'''
+        self.logical_directory = None if fixed_tail_layout else LogicalDirectory(num_columns)
+        '''Maps logical rid's to physical locations in page for each column (except hidden columns), None with the fixed tail layout'''
+        self.tail_block_pages = [array("i", [MAX_PAGE_RANGE] if fixed_tail_layout else []) for _ in range(num_columns)]
+        '''Fixed tail layout: page index of every block of MAX_RECORD_PER_PAGE logical rids, for each data column.
+        Merged base page versions take pages of the data columns too, so a block can't use the page index of its logical rids'''
         self.logical_rid_index = MAX_RECORD_PER_PAGE_RANGE
         '''Used to assign logical rids to updates'''
 
@@ -30,37 +55,106 @@ class PageRange:
         self.tail_page_index = [MAX_PAGE_RANGE] * self.total_num_columns
         '''Tail page index for each column'''
 
+        self.next_page_index = [MAX_PAGE_RANGE + 1] * self.total_num_columns
+        '''Next unused page index of each column, shared by tail pages and merged base page versions'''
+
+        self.free_page_indexes = [[] for _ in range(self.total_num_columns)]
+        '''Pages of reclaimed base page versions, reused by later merges'''
+
+        self.retired_versions = []
+        '''Replaced base page versions that readers may still hold'''
+
+        self.inserted_base_slots = [set() for _ in range(MAX_PAGE_RANGE)]
+        '''Base slots written since the last merge started, for each base page'''
+
         self.tps = 0
         '''Tail page sequence number'''
 
         self.page_range_lock = threading.Lock()
+        self.merge_lock = threading.Lock()
+        '''Held by the merge worker merging the page range, one merge of a page range runs at a time'''
 
         self.page_range_index = page_range_index
 
+        self.page_directory = {} if page_directory is None else page_directory
+        '''Maps (page_range_index, page_index) of every base page to its current BasePageVersion, shared with the table'''
+        num_data_columns = self.total_num_columns - NUM_HIDDEN_COLUMNS
+        for page_index in range(MAX_PAGE_RANGE):
+            self.page_directory.setdefault((page_range_index, page_index), BasePageVersion([page_index] * num_data_columns))
+
+        self.version_directory = VersionDirectory(num_columns)
+        '''Tail records of the versions of every base record, see VersionDirectory'''
+
         '''setup queue for logical rid allocation'''
         self.allocation_logical_rid_queue = queue.Queue()
 
     def write_base_record(self, page_index, page_slot, columns) -> bool:
         columns[INDIRECTION_COLUMN] = self.__normalize_rid(columns[RID_COLUMN])
-        for (i, column) in enumerate(columns):
-            self.bufferpool.write_page_slot(self.page_range_index, i, page_index, page_slot, column)
+        for i in range(NUM_HIDDEN_COLUMNS):
+            self.bufferpool.write_page_slot(self.page_range_index, i, page_index, page_slot, columns[i])
+
+        # Data columns go to the current version of the base page, merges swap versions under the same lock
         with self.page_range_lock:
+            version:BasePageVersion = self.page_directory[(self.page_range_index, page_index)]
+            for (i, column) in enumerate(columns[NUM_HIDDEN_COLUMNS:]):
+                self.bufferpool.write_page_slot(self.page_range_index, NUM_HIDDEN_COLUMNS + i, version.page_indexes[i], page_slot, column)
+            if (version.merge_times is not None):
+                version.merge_times[page_slot] = columns[UPDATE_TIMESTAMP_COLUMN]
+            self.inserted_base_slots[page_index].add(page_slot)
+            self.version_directory.remove_record(self.__normalize_rid(columns[RID_COLUMN]))
             self.tps += 1
         return True
-    
-    def copy_base_record(self, page_index, page_slot) -> list:
-        '''Costly function mostly used by table merge on the background'''
-        base_record_columns = [None] * self.total_num_columns
-        # Read buffer pool frames
-        for i in range(self.total_num_columns):
-            base_record_columns[i] = self.bufferpool.read_page_slot(self.page_range_index, i, page_index, page_slot)
-
-        # mark the frame used after reading
-        for i in range(self.total_num_columns):
-            frame_num = self.bufferpool.get_page_frame_num(self.page_range_index, i, page_index)
-            self.bufferpool.mark_frame_used(frame_num)
-
-        return base_record_columns
+
+    def write_base_records(self, page_index, first_slot, first_rid, data_columns) -> bool:
+        '''
+        Writes records with consecutive rids to consecutive slots of a base page, a column at a time
+        :param data_columns: list   #array("i") of the values of every record for each data column
+        The records get consecutive timestamps and no updates, like records written by write_base_record
+        '''
+        num_records = len(data_columns[0])
+        with self.page_range_lock:
+            first_timestamp = self.tps
+            self.tps += num_records
+
+        hidden_columns = [None] * NUM_HIDDEN_COLUMNS
+        hidden_columns[INDIRECTION_COLUMN] = array("i", range(self.__normalize_rid(first_rid), self.__normalize_rid(first_rid) + num_records))
+        hidden_columns[RID_COLUMN] = array("i", range(first_rid, first_rid + num_records))
+        hidden_columns[TIMESTAMP_COLUMN] = array("i", range(first_timestamp, first_timestamp + num_records))
+        hidden_columns[UPDATE_TIMESTAMP_COLUMN] = array("i", [RECORD_NONE_VALUE]) * num_records
+        hidden_columns[SCHEMA_ENCODING_COLUMN] = array("i", [0]) * num_records
+        for (i, values) in enumerate(hidden_columns):
+            self.bufferpool.write_page_range(self.page_range_index, i, page_index, first_slot, values)
+
+        with self.page_range_lock:
+            version:BasePageVersion = self.page_directory[(self.page_range_index, page_index)]
+            for (i, values) in enumerate(data_columns):
+                self.bufferpool.write_page_range(self.page_range_index, NUM_HIDDEN_COLUMNS + i, version.page_indexes[i], first_slot, values)
+            if (version.merge_times is not None):
+                version.merge_times[first_slot:first_slot + num_records] = hidden_columns[UPDATE_TIMESTAMP_COLUMN]
+            self.inserted_base_slots[page_index].update(range(first_slot, first_slot + num_records))
+        return True
+
+    def acquire_base_page(self, page_index) -> BasePageVersion:
+        '''Returns the current version of a base page, its pages aren't reclaimed until release_base_page'''
+        directory_key = (self.page_range_index, page_index)
+        while True:
+            version:BasePageVersion = self.page_directory[directory_key]
+            version.readers.count_up()
+            # A merge may have swapped the version before it was held, the reclaimer skips held versions
+            if (self.page_directory[directory_key] is version):
+                if (version.merge_times is None):
+                    self.__load_merge_times(page_index, version)
+                return version
+            version.readers.count_down()
+
+    def release_base_page(self, version:BasePageVersion):
+        version.readers.count_down()
+
+    def __load_merge_times(self, page_index, version:BasePageVersion):
+        '''Reads the merge times of a version from the UPDATE_TIMESTAMP_COLUMN, merges load them before they write the column'''
+        with self.page_range_lock:
+            if (version.merge_times is None):
+                version.merge_times = self.bufferpool.read_page_array(self.page_range_index, UPDATE_TIMESTAMP_COLUMN, page_index)
     
     def find_records_last_logical_rid(self, logical_rid):
         '''Merge Helper API Call: Returns the last logical rid of a record given a starting logical rid'''
@@ -68,17 +162,167 @@ class PageRange:
         while (logical_rid >= MAX_RECORD_PER_PAGE_RANGE):
             last_logical_rid = logical_rid
             page_index, page_slot = self.get_column_location(logical_rid, INDIRECTION_COLUMN)
-            logical_rid = self.bufferpool.read_page_slot(self.page_range_index, INDIRECTION_COLUMN, page_index, page_slot)
-            frame_num = self.bufferpool.get_page_frame_num(self.page_range_index, INDIRECTION_COLUMN, page_index)
-            if (frame_num):
-                self.bufferpool.mark_frame_used(frame_num)
+            with self.bufferpool.pin(self.page_range_index, INDIRECTION_COLUMN, page_index) as page:
+                logical_rid = page.read(page_slot)
 
         return last_logical_rid
 
+    def merge_base_pages(self, num_base_records) -> int:
+        '''
+        Merge Helper API Call: Writes the newest value of every column updated since the last merge into new versions of the base pages
+        Pages are read whole and the tail chains are walked in memory, the merged copy of a base page is written next to
+        its current version and swapped in through the page directory so readers never see a half merged record.
+        The merge time of a record, kept by the version and in the UPDATE_TIMESTAMP_COLUMN, is the timestamp of the newest
+        tail record merged into it, readers of the latest values stop walking the tail chain there.
+        Returns the number of records merged
+        '''
+        num_base_pages = -(-num_base_records // MAX_RECORD_PER_PAGE)
+        num_data_columns = self.total_num_columns - NUM_HIDDEN_COLUMNS
+        all_columns = (1 << num_data_columns) - 1
+
+        # Records inserted from here on are written to the current versions, the swap keeps their values
+        with self.page_range_lock:
+            self.inserted_base_slots = [set() for _ in range(MAX_PAGE_RANGE)]
+
+        # Every base page is copied before any tail page is read, tail records reachable from the copies are complete
+        base_pages = [
+            (self.bufferpool.read_page_array(self.page_range_index, INDIRECTION_COLUMN, page_index), self.__get_merge_times(page_index)[:])
+            for page_index in range(num_base_pages)
+        ]
+
+        tail_pages = {}
+        '''Copies of the tail pages read so far, tail_pages[(column, page_index)] = array'''
+        def read_tail(column, physical_rid):
+            page_index, page_slot = divmod(physical_rid, MAX_RECORD_PER_PAGE)
+            tail_page = tail_pages.get((column, page_index), None)
+            if (tail_page is None):
+                tail_page = self.bufferpool.read_page_array(self.page_range_index, column, page_index)
+                tail_pages[(column, page_index)] = tail_page
+            return tail_page[page_slot]
+
+        num_merged = 0
+        for page_index, (indirections, merge_times) in enumerate(base_pages):
+            merged_slots = [[] for _ in range(num_data_columns)]
+            merged_values = [[] for _ in range(num_data_columns)]
+            merge_slots = []
+            merge_timestamps = []
+
+            for page_slot in range(min(MAX_RECORD_PER_PAGE, num_base_records - page_index * MAX_RECORD_PER_PAGE)):
+                logical_rid = indirections[page_slot]
+                if (logical_rid < MAX_RECORD_PER_PAGE_RANGE):
+                    continue
+
+                merge_time = merge_times[page_slot]
+                latest_timestamp = read_tail(TIMESTAMP_COLUMN, logical_rid)
+                timestamp = latest_timestamp
+
+                # Newest tail records come first, a column takes the value of the first one that updated it.
+                # The columns to merge come from the tail records' own schema encodings, an update writes the base
+                # schema encoding after the indirection so the copy of it may not cover the newest tail record yet
+                merged_columns = 0
+                while (logical_rid >= MAX_RECORD_PER_PAGE_RANGE and merged_columns != all_columns and timestamp > merge_time):
+                    updated_columns = read_tail(SCHEMA_ENCODING_COLUMN, logical_rid) & ~merged_columns
+                    if (updated_columns):
+                        merged_columns |= updated_columns
+                        for column in range(num_data_columns):
+                            if (updated_columns & (1 << column)):
+                                merged_slots[column].append(page_slot)
+                                tail_page_index, tail_slot = self.__get_known_column_location(logical_rid, NUM_HIDDEN_COLUMNS + column)
+                                merged_values[column].append(read_tail(NUM_HIDDEN_COLUMNS + column, tail_page_index * MAX_RECORD_PER_PAGE + tail_slot))
+
+                    logical_rid = read_tail(INDIRECTION_COLUMN, logical_rid)
+                    if (logical_rid >= MAX_RECORD_PER_PAGE_RANGE):
+                        timestamp = read_tail(TIMESTAMP_COLUMN, logical_rid)
+
+                if (latest_timestamp > merge_time):
+                    merge_slots.append(page_slot)
+                    merge_timestamps.append(latest_timestamp)
+
+            if (not merge_slots):
+                continue
+
+            num_merged += self.__swap_base_page(page_index, merged_slots, merged_values, merge_slots, merge_timestamps)
+
+        self.reclaim_base_pages()
+        return num_merged
+
+    def __get_merge_times(self, page_index) -> array:
+        '''Returns the merge times of the current version of a base page'''
+        version:BasePageVersion = self.page_directory[(self.page_range_index, page_index)]
+        if (version.merge_times is None):
+            self.__load_merge_times(page_index, version)
+        return version.merge_times
+
+    def __swap_base_page(self, page_index, merged_slots, merged_values, merge_slots, merge_timestamps) -> int:
+        '''Writes the merged data columns of a base page into new pages and makes them the current version,
+        returns the number of records merged. Slots inserted while the merge ran keep the values of their insert'''
+        directory_key = (self.page_range_index, page_index)
+        current_version:BasePageVersion = self.page_directory[directory_key]
+
+        with self.page_range_lock:
+            new_page_indexes = [self.__allocate_page_index(NUM_HIDDEN_COLUMNS + column, reuse=True) for column in range(len(merged_slots))]
+
+        # Nobody reads the new pages until the swap, they're written without holding the lock
+        for column, (page_slots, values) in enumerate(zip(merged_slots, merged_values)):
+            page_values = self.bufferpool.read_page_array(self.page_range_index, NUM_HIDDEN_COLUMNS + column, current_version.page_indexes[column])
+            for page_slot, value in zip(page_slots, values):
+                page_values[page_slot] = value
+            self.bufferpool.write_page_array(self.page_range_index, NUM_HIDDEN_COLUMNS + column, new_page_indexes[column], page_values)
+
+        with self.page_range_lock:
+            inserted_slots = self.inserted_base_slots[page_index]
+            if (inserted_slots):
+                page_slots = list(inserted_slots)
+                for column, current_page_index in enumerate(current_version.page_indexes):
+                    values = self.bufferpool.read_page_slots(self.page_range_index, NUM_HIDDEN_COLUMNS + column, current_page_index, page_slots)
+                    self.bufferpool.write_page_slots(self.page_range_index, NUM_HIDDEN_COLUMNS + column, new_page_indexes[column], page_slots, values)
+
+            # Records inserted while the merge ran keep the merge time of their insert
+            merged_records = [(page_slot, timestamp) for page_slot, timestamp in zip(merge_slots, merge_timestamps) if page_slot not in inserted_slots]
+            merge_times = current_version.merge_times[:]
+            for page_slot, timestamp in merged_records:
+                merge_times[page_slot] = timestamp
+
+            tps = max((timestamp for _, timestamp in merged_records), default=current_version.tps)
+            self.page_directory[directory_key] = BasePageVersion(new_page_indexes, tps, merge_times)
+            self.retired_versions.append(current_version)
+
+        # Readers of the replaced version use the merge times it holds, the column is only read by later merges and on reload
+        self.bufferpool.write_page_slots(self.page_range_index, UPDATE_TIMESTAMP_COLUMN, page_index, [page_slot for page_slot, _ in merged_records], [timestamp for _, timestamp in merged_records])
+        return len(merged_records)
+
+    def reclaim_base_pages(self) -> int:
+        '''Frees the pages of replaced base page versions that no reader holds anymore, returns the number of versions reclaimed'''
+        with self.page_range_lock:
+            held_versions = []
+            for version in self.retired_versions:
+                if (version.readers.count > 0):
+                    held_versions.append(version)
+                    continue
+
+                for column, page_index in enumerate(version.page_indexes):
+                    self.free_page_indexes[NUM_HIDDEN_COLUMNS + column].append(page_index)
+
+            num_reclaimed = len(self.retired_versions) - len(held_versions)
+            self.retired_versions = held_versions
+            return num_reclaimed
+
+    def __allocate_page_index(self, column, reuse=False) -> int:
+        '''Returns an unused page index of a column, reuse takes the pages of reclaimed base page versions first.
+        Must be called with the page range lock held'''
+        if (reuse and self.free_page_indexes[column]):
+            return self.free_page_indexes[column].pop()
+
+        self.next_page_index[column] += 1
+        return self.next_page_index[column] - 1
+
     def write_tail_record(self, logical_rid, *columns) -> bool:
         '''Writes a set of columns to the tail pages returns true on success'''
+        if (self.fixed_tail_layout):
+            return self.__write_fixed_tail_record(logical_rid, columns)
 
-        self.logical_directory[logical_rid] = [None] * (self.total_num_columns - NUM_HIDDEN_COLUMNS)
+        with self.page_range_lock:
+            self.logical_directory.add_record(logical_rid)
 
         for (i, column) in enumerate(columns):
             if (column is None):
@@ -94,27 +338,171 @@ class PageRange:
                     has_capacity =  self.bufferpool.get_page_has_capacity(self.page_range_index, i, self.tail_page_index[i])
 
                     if not has_capacity:
-                        self.tail_page_index[i] += 1
+                        self.tail_page_index[i] = self.__allocate_page_index(i)
 
                     elif has_capacity is None:
                         return False
                         
                     page_slot = self.bufferpool.write_page_next(self.page_range_index, i, self.tail_page_index[i], column)
                     
-                    self.logical_directory[logical_rid][i - NUM_HIDDEN_COLUMNS] = (self.tail_page_index[i] * MAX_RECORD_PER_PAGE) + page_slot
+                    self.logical_directory.set(logical_rid, i - NUM_HIDDEN_COLUMNS, (self.tail_page_index[i] * MAX_RECORD_PER_PAGE) + page_slot)
+
+        with self.page_range_lock:
+            self.tps += 1
+        return True
+
+    def __write_fixed_tail_record(self, logical_rid, columns) -> bool:
+        '''Writes the columns of a tail record at the slot of its logical rid, the data columns it holds go to TAIL_COLUMNS_COLUMN'''
+        self.__allocate_tail_blocks(logical_rid)
+
+        tail_columns = 0
+        for (i, column) in enumerate(columns[NUM_HIDDEN_COLUMNS:]):
+            if (column is not None):
+                tail_columns |= (1 << i)
+                self.bufferpool.write_page_slot(self.page_range_index, NUM_HIDDEN_COLUMNS + i, *self.__get_known_column_location(logical_rid, NUM_HIDDEN_COLUMNS + i), column)
+
+        page_index, page_slot = self.__get_hidden_column_location(logical_rid)
+        for (i, column) in enumerate(columns[:NUM_HIDDEN_COLUMNS]):
+            if (i == TAIL_COLUMNS_COLUMN):
+                column = tail_columns
+            if (column is not None):
+                self.bufferpool.write_page_slot(self.page_range_index, i, page_index, page_slot, column)
 
         with self.page_range_lock:
             self.tps += 1
         return True
     
+    def __allocate_tail_blocks(self, logical_rid):
+        '''Gives every data column the block pages of the fixed layout up to the block of a logical rid'''
+        block = logical_rid // MAX_RECORD_PER_PAGE - MAX_PAGE_RANGE
+        # The last data column gets the pages of a new block last, once it has them every column has
+        if (block >= len(self.tail_block_pages[-1])):
+            with self.page_range_lock:
+                for (i, block_pages) in enumerate(self.tail_block_pages):
+                    while (block >= len(block_pages)):
+                        block_pages.append(self.__allocate_page_index(NUM_HIDDEN_COLUMNS + i))
+
+    def write_tail_records(self, records) -> bool:
+        '''
+        Writes many tail records, each one a list of columns like write_tail_record takes them.
+        The records get consecutive timestamps in their order, every column is written a page at a time
+        and the data columns of the log layout are appended to their tail pages in the same order
+        '''
+        with self.page_range_lock:
+            for columns in records:
+                columns[TIMESTAMP_COLUMN] = self.tps
+                self.tps += 1
+                if (not self.fixed_tail_layout):
+                    self.logical_directory.add_record(columns[RID_COLUMN])
+
+        tail_columns = [0] * len(records)
+        if (self.fixed_tail_layout and records):
+            self.__allocate_tail_blocks(max(columns[RID_COLUMN] for columns in records))
+
+        for column in range(NUM_HIDDEN_COLUMNS, self.total_num_columns):
+            updated = []
+            for (record_index, columns) in enumerate(records):
+                if (columns[column] is not None):
+                    updated.append((columns[RID_COLUMN], columns[column]))
+                    tail_columns[record_index] |= (1 << (column - NUM_HIDDEN_COLUMNS))
+
+            if (self.fixed_tail_layout):
+                self.__write_slots(column, [(*self.__get_known_column_location(logical_rid, column), value) for (logical_rid, value) in updated])
+            else:
+                self.__append_tail_values(column, updated)
+
+        for column in range(NUM_HIDDEN_COLUMNS):
+            if (self.fixed_tail_layout and column == TAIL_COLUMNS_COLUMN):
+                values = [(*self.__get_hidden_column_location(columns[RID_COLUMN]), tail_columns[record_index]) for (record_index, columns) in enumerate(records)]
+            else:
+                values = [(*self.__get_hidden_column_location(columns[RID_COLUMN]), columns[column]) for columns in records if columns[column] is not None]
+            self.__write_slots(column, values)
+
+        return True
+
+    def __write_slots(self, column, values):
+        '''Writes (page_index, page_slot, value) tuples of a column with one write per page'''
+        pages = {}
+        for (page_index, page_slot, value) in values:
+            slots = pages.setdefault(page_index, ([], []))
+            slots[0].append(page_slot)
+            slots[1].append(value)
+
+        for (page_index, (page_slots, page_values)) in pages.items():
+            self.bufferpool.write_page_slots(self.page_range_index, column, page_index, page_slots, page_values)
+
+    def __append_tail_values(self, column, values):
+        '''Appends (logical_rid, value) pairs of a data column to its tail pages in order, a tail page at a time'''
+        next_value = 0
+        while (next_value < len(values)):
+            with self.page_range_lock:
+                page_index = self.tail_page_index[column]
+                first_slot, num_appended = self.bufferpool.write_page_next_many(self.page_range_index, column, page_index, [value for (_, value) in values[next_value:next_value + MAX_RECORD_PER_PAGE]])
+                if (num_appended == 0):
+                    self.tail_page_index[column] = self.__allocate_page_index(column)
+                    continue
+
+                for (offset, (logical_rid, _)) in enumerate(values[next_value:next_value + num_appended]):
+                    self.logical_directory.set(logical_rid, column - NUM_HIDDEN_COLUMNS, (page_index * MAX_RECORD_PER_PAGE) + first_slot + offset)
+            next_value += num_appended
+
+    def prefetch_tail_pages(self, columns):
+        '''Hints the bufferpool to read every tail page of the given columns'''
+        page_ids = []
+        for column in columns:
+            if (column < NUM_HIDDEN_COLUMNS):
+                last_page_index = (self.logical_rid_index - 1) // MAX_RECORD_PER_PAGE
+            elif (self.fixed_tail_layout):
+                page_ids.extend(get_page_id(self.page_range_index, column, page_index) for page_index in self.tail_block_pages[column - NUM_HIDDEN_COLUMNS])
+                continue
+            else:
+                last_page_index = self.tail_page_index[column]
+            page_ids.extend(get_page_id(self.page_range_index, column, page_index) for page_index in range(MAX_PAGE_RANGE, last_page_index + 1))
+
+        self.bufferpool.prefetch(page_ids)
+
     def read_tail_record_column(self, logical_rid, column) -> int:
         '''Reads a column from the tail pages given a logical rid'''
         page_index, page_slot = self.get_column_location(logical_rid, column)
-        column_value = self.bufferpool.read_page_slot(self.page_range_index, column, page_index, page_slot)
-        frame_num = self.bufferpool.get_page_frame_num(self.page_range_index, column, page_index)
-        self.bufferpool.mark_frame_used(frame_num)
-        return column_value
+        with self.bufferpool.pin(self.page_range_index, column, page_index) as page:
+            return page.read(page_slot)
     
+    def get_tail_column_location(self, logical_rid, column) -> Union[tuple[int, int], None]:
+        '''Returns the location of a data column within tail pages, None if the tail record doesn't hold the column'''
+        if (self.fixed_tail_layout):
+            if ((self.read_tail_record_column(logical_rid, TAIL_COLUMNS_COLUMN) >> (column - NUM_HIDDEN_COLUMNS)) & 1 == 0):
+                return None
+            return self.__get_known_column_location(logical_rid, column)
+
+        physical_rid = self.logical_directory.get(logical_rid, column - NUM_HIDDEN_COLUMNS)
+        if (physical_rid is None):
+            return None
+        return physical_rid // MAX_RECORD_PER_PAGE, physical_rid % MAX_RECORD_PER_PAGE
+
+    def read_tail_record_data(self, logical_rid) -> list:
+        '''Returns the data columns held by a tail record, None for the columns it doesn't hold'''
+        if (self.fixed_tail_layout):
+            tail_columns = self.read_tail_record_column(logical_rid, TAIL_COLUMNS_COLUMN)
+            return [self.read_tail_record_column(logical_rid, NUM_HIDDEN_COLUMNS + column) if (tail_columns >> column) & 1 else None for column in range(self.total_num_columns - NUM_HIDDEN_COLUMNS)]
+
+        values = []
+        for column, physical_rid in enumerate(self.logical_directory.get_record(logical_rid)):
+            if (physical_rid is None):
+                values.append(None)
+                continue
+            with self.bufferpool.pin(self.page_range_index, NUM_HIDDEN_COLUMNS + column, physical_rid // MAX_RECORD_PER_PAGE) as page:
+                values.append(page.read(physical_rid % MAX_RECORD_PER_PAGE))
+        return values
+
+    def find_tail_column_location(self, logical_rid, column) -> Union[tuple[int, int, int], None]:
+        '''Walks a tail chain from logical_rid to the newest tail record that updated a data column,
+        returns the location of the column within tail pages and the timestamp of the tail record, None if no tail record did'''
+        while (logical_rid >= MAX_RECORD_PER_PAGE_RANGE):
+            if (self.read_tail_record_column(logical_rid, SCHEMA_ENCODING_COLUMN) >> (column - NUM_HIDDEN_COLUMNS)) & 1:
+                return *self.__get_known_column_location(logical_rid, column), self.read_tail_record_column(logical_rid, TIMESTAMP_COLUMN)
+            logical_rid = self.read_tail_record_column(logical_rid, INDIRECTION_COLUMN)
+        return None
+
     # Only use this function for API calls
     def get_column_location(self, logical_rid, column) -> tuple[int, int]:
         '''Returns the location of a column within tail pages given a logical rid'''
@@ -131,7 +519,10 @@ class PageRange:
     
     def __get_known_column_location(self, logical_rid, column) -> tuple[int, int]:
         '''Returns the location of a column within tail pages given a logical rid'''
-        physical_rid = self.logical_directory[logical_rid][column - NUM_HIDDEN_COLUMNS]
+        if (self.fixed_tail_layout):
+            return self.tail_block_pages[column - NUM_HIDDEN_COLUMNS][logical_rid // MAX_RECORD_PER_PAGE - MAX_PAGE_RANGE], logical_rid % MAX_RECORD_PER_PAGE
+
+        physical_rid = self.logical_directory.get(logical_rid, column - NUM_HIDDEN_COLUMNS)
         page_index = physical_rid // MAX_RECORD_PER_PAGE
         page_slot = physical_rid % MAX_RECORD_PER_PAGE
         return page_index, page_slot
@@ -152,21 +543,52 @@ class PageRange:
             self.logical_rid_index += 1
             return self.logical_rid_index - 1
     
+    def get_logical_directory_path(self) -> str:
+        return os.path.join(self.bufferpool.table_path, f"PageRange_{self.page_range_index}", "LogicalDirectory.bin")
+
+    def get_version_directory_path(self) -> str:
+        return os.path.join(self.bufferpool.table_path, f"PageRange_{self.page_range_index}", "VersionDirectory.bin")
+
     def serialize(self):
-        '''Returns page metadata as a JSON-compatible dictionary'''
+        '''Returns page metadata as a JSON-compatible dictionary, the logical and version directories are written to their own binary files'''
+        if (self.logical_directory is not None):
+            self.logical_directory.save(self.get_logical_directory_path())
+        self.version_directory.save(self.get_version_directory_path())
+        return self.get_metadata()
+
+    def get_metadata(self) -> dict:
         return {
-            "logical_directory": self.logical_directory,
             "tail_page_index": self.tail_page_index,
+            "next_page_index": self.next_page_index,
+            # Replaced versions are free once the database is closed
+            "free_page_indexes": [
+                free_page_indexes + [version.page_indexes[column - NUM_HIDDEN_COLUMNS] for version in self.retired_versions if column >= NUM_HIDDEN_COLUMNS]
+                for column, free_page_indexes in enumerate(self.free_page_indexes)
+            ],
+            "tail_block_pages": [block_pages.tolist() for block_pages in self.tail_block_pages],
             "logical_rid_index": self.logical_rid_index,
             "tps": self.tps
         }
     
     def deserialize(self, json_data):
         '''Loads a page from serialized data'''
-        self.logical_directory = {int(k): v for k, v in json_data["logical_directory"].items()}
+        self.tail_block_pages = [array("i", block_pages) for block_pages in json_data.get("tail_block_pages", [[] for _ in self.tail_block_pages])]
+        self.logical_directory = None
+        if (not self.fixed_tail_layout):
+            self.logical_directory = LogicalDirectory(self.total_num_columns - NUM_HIDDEN_COLUMNS)
+            if ("logical_directory" in json_data):
+                self.logical_directory.load_dict(json_data["logical_directory"])
+            else:
+                self.logical_directory.load(self.get_logical_directory_path())
         self.tail_page_index = json_data["tail_page_index"]
+        self.next_page_index = json_data.get("next_page_index", [page_index + 1 for page_index in self.tail_page_index])
+        self.free_page_indexes = json_data.get("free_page_indexes", [[] for _ in range(self.total_num_columns)])
         self.logical_rid_index = json_data["logical_rid_index"]
         self.tps = json_data["tps"]
+        if ("version_directory" in json_data):
+            self.version_directory.load_dict(json_data["version_directory"])
+        elif (os.path.exists(self.get_version_directory_path())):
+            self.version_directory.load(self.get_version_directory_path())
 
     def __hash__(self):
         return self.page_range_index
@@ -175,9 +597,9 @@ class PageRange:
         return self.page_range_index == other.page_range_index
     
     def __str__(self):
-        return json.dumps(self.serialize())
+        return json.dumps(self.get_metadata())
 
     def __repr__(self):
-        return json.dumps(self.serialize())
+        return json.dumps(self.get_metadata())
     
     
\ No newline at end of file
@@ -108,6 +108,15 @@ class Query:
 
         return True
 
+    """
+    # Insert many records, every row holds the columns of one record
+    # Rows are written a base page at a time and indexed together once all are written, see Table.bulk_load
+    # Rows with the wrong number of columns or an existing primary key are skipped, inserts aren't logged
+    # Returns the number of records inserted
+    """
+    def insert_many(self, rows):
+        return self.table.bulk_load(rows)
+
     
     """
     # Read matching record with specified search key
@@ -146,77 +155,69 @@ class Query:
         if rid_list == None:
             return []
         
+        projected_columns_schema = self.__get_columns_schema(projected_columns_index)
         record_objs = []
 
         for rid in rid_list:
-            record_columns = [None] * self.table.num_columns
-            page_range_index, base_page_index, base_page_slot = self.table.get_base_record_location(rid)
-            
-            projected_columns_schema = 0
-            for i in range(len(projected_columns_index)):
-                if projected_columns_index[i] == 1:
-                    projected_columns_schema |= (1 << i)
+            page_range_index, base_page_index, _ = self.table.get_base_record_location(rid)
+            with self.table.read_base_page(page_range_index, base_page_index) as base_page:
+                record_columns, tail_hops = self.__read_record(rid, base_page, projected_columns_schema, relative_version)
+                record_objs.append(Record(rid, record_columns[self.table.key], record_columns))
+            self.table.merge_scheduler.record_read(page_range_index, tail_hops)
+        
+        return record_objs
 
-            if (projected_columns_schema >> self.table.key) & 1 == 1:
-                record_columns[self.table.key] = self.__readAndMarkSlot(page_range_index, NUM_HIDDEN_COLUMNS + self.table.key, base_page_index, base_page_slot)
-                projected_columns_schema &= ~(1 << self.table.key)
+    """
+    # Read the matching records of many search keys at once
+    # :param search_keys: the values you want to search based on
+    # :param search_key_index: the column index you want to search based on
+    # :param projected_columns_index: what columns to return. array of 1 or 0 values.
+    # :param relative_version: the relative version of the records you need to retreive.
+    # Records are read grouped by base page, each base page column a record needs is pinned once for the whole group
+    # Returns a list with the list of Record objects of every search key, in the order of search_keys
+    """
+    def select_many(self, search_keys, search_key_index, projected_columns_index, relative_version=0):
+        search_keys = list(search_keys)
+        if not self.table.index.exist_index(search_key_index):
 
-            base_schema = self.__readAndMarkSlot(page_range_index, SCHEMA_ENCODING_COLUMN, base_page_index, base_page_slot)
-            base_timestamp = self.__readAndMarkSlot(page_range_index, TIMESTAMP_COLUMN, base_page_index, base_page_slot)
-            current_tail_rid = self.__readAndMarkSlot(page_range_index, INDIRECTION_COLUMN, base_page_index, base_page_slot)
+            self.table.index.create_index(search_key_index)
+            rid_lists = self.table.index.locate_many(search_key_index, search_keys)
+            self.table.index.drop_index(search_key_index)
 
-            if current_tail_rid < MAX_RECORD_PER_PAGE_RANGE:
-                
-                # Current RID = base RID, read all columns from the base page
-                for i in range(self.table.num_columns):
-                    if (projected_columns_schema >> i) & 1:
-                        record_columns[i] = self.__readAndMarkSlot(page_range_index, NUM_HIDDEN_COLUMNS + i, base_page_index, base_page_slot)
-            
-            else:
-                current_version = 0
-                
-                for i in range(self.table.num_columns):
-                    if (projected_columns_schema >> i) & 1:
-                        if (base_schema >> i) & 1 == 0:
-                            record_columns[i] = self.__readAndMarkSlot(page_range_index, NUM_HIDDEN_COLUMNS + i, base_page_index, base_page_slot)
-                            continue
-
-                        temp_tail_rid = current_tail_rid
-                        found_value = False
-                        
-                        while temp_tail_rid >= MAX_RECORD_PER_PAGE_RANGE and current_version <= relative_version:
-                            tail_schema = self.table.page_ranges[page_range_index].read_tail_record_column(temp_tail_rid, SCHEMA_ENCODING_COLUMN)
-                            tail_timestamp = self.table.page_ranges[page_range_index].read_tail_record_column(temp_tail_rid, TIMESTAMP_COLUMN)
-                            
-                            if (tail_schema >> i) & 1:
-
-                                # Tail_timestamp should be greater than the base_timestamp for current version
-                                if tail_timestamp >= base_timestamp:
-                                    
-                                    if relative_version == 0:
-                                        tail_page_index, tail_slot = self.table.page_ranges[page_range_index].get_column_location(temp_tail_rid, NUM_HIDDEN_COLUMNS + i)
-                                        record_columns[i] = self.__readAndMarkSlot(page_range_index, NUM_HIDDEN_COLUMNS + i, tail_page_index, tail_slot)
-                                        found_value = True
-                                        break
-                                
-                                 # Reading from an older version of the record
-                                else:
-                                    current_version += 1
-
-                                    if current_version == relative_version:
-                                        tail_page_index, tail_slot = self.table.page_ranges[page_range_index].get_column_location(temp_tail_rid, NUM_HIDDEN_COLUMNS + i)
-                                        record_columns[i] = self.__readAndMarkSlot(page_range_index, NUM_HIDDEN_COLUMNS + i, tail_page_index, tail_slot)
-                                        found_value = True
-                                        break
-
-                            temp_tail_rid = self.table.page_ranges[page_range_index].read_tail_record_column(temp_tail_rid, INDIRECTION_COLUMN)
-                        
-                        if not found_value:
-                            record_columns[i] = self.__readAndMarkSlot(page_range_index, NUM_HIDDEN_COLUMNS + i, base_page_index, base_page_slot)
-            
-            record_objs.append(Record(rid, record_columns[self.table.key], record_columns))
-        
-        return record_objs
+        else:
+            rid_lists = self.table.index.locate_many(search_key_index, search_keys)
+
+        projected_columns_schema = self.__get_columns_schema(projected_columns_index)
+        base_columns = [INDIRECTION_COLUMN, SCHEMA_ENCODING_COLUMN, TIMESTAMP_COLUMN] + [NUM_HIDDEN_COLUMNS + i for i in range(self.table.num_columns) if (projected_columns_schema >> i) & 1]
+        if (projected_columns_schema >> self.table.key) & 1 == 0:
+            base_columns.append(NUM_HIDDEN_COLUMNS + self.table.key)
+
+        # Every record to read with where its Record goes in the results, grouped by base page
+        results = [[None] * len(rid_list) for rid_list in rid_lists]
+        base_page_records = {}
+        for key_position, rid_list in enumerate(rid_lists):
+            for record_position, rid in enumerate(rid_list):
+                base_page_records.setdefault(rid // MAX_RECORD_PER_PAGE, []).append((rid, key_position, record_position))
+
+        for base_page_number in sorted(base_page_records):
+            records = base_page_records[base_page_number]
+            page_range_index, base_page_index, _ = self.table.get_base_record_location(records[0][0])
+            page_slots = [rid % MAX_RECORD_PER_PAGE for rid, _, _ in records]
+            with self.table.read_base_page(page_range_index, base_page_index) as base_page:
+                base_values = {}
+                for column in base_columns:
+                    page_index = base_page_index if column < NUM_HIDDEN_COLUMNS else base_page.page_indexes[column - NUM_HIDDEN_COLUMNS]
+                    values = self.table.bufferpool.read_page_slots(page_range_index, column, page_index, page_slots)
+                    if values is not None:
+                        base_values[column] = values
+
+                for record_index, (rid, key_position, record_position) in enumerate(records):
+                    record_base_columns = {column: values[record_index] for column, values in base_values.items()}
+                    record_columns, tail_hops = self.__read_record(rid, base_page, projected_columns_schema, relative_version, record_base_columns)
+                    results[key_position][record_position] = Record(rid, record_columns[self.table.key], record_columns)
+                    self.table.merge_scheduler.record_read(page_range_index, tail_hops)
+
+        return results
 
 
     """
@@ -250,28 +251,29 @@ class Query:
 
         page_range_index, page_index, page_slot = self.table.get_base_record_location(rid_location[0])
         
-        prev_tail_rid = self.table.bufferpool.read_page_slot(page_range_index, INDIRECTION_COLUMN, page_index, page_slot)
-        base_schema = self.table.bufferpool.read_page_slot(page_range_index, SCHEMA_ENCODING_COLUMN, page_index, page_slot)
+        # The handles unpin both pages even if writing the tail record or the base page raises
+        with self.table.bufferpool.pin(page_range_index, INDIRECTION_COLUMN, page_index) as indirection_page, \
+                self.table.bufferpool.pin(page_range_index, SCHEMA_ENCODING_COLUMN, page_index) as schema_page:
+            prev_tail_rid = indirection_page.read(page_slot)
+            base_schema = schema_page.read(page_slot)
+
+            if self.table.cumulative_updates and prev_tail_rid >= MAX_RECORD_PER_PAGE_RANGE:
+                self.__carry_cumulative_columns(page_range_index, page_index, page_slot, prev_tail_rid, new_columns)
         
-        updated_base_schema = base_schema | schema_encoding
+            updated_base_schema = base_schema | schema_encoding
 
-        new_columns[INDIRECTION_COLUMN] = prev_tail_rid
-        new_columns[SCHEMA_ENCODING_COLUMN] = schema_encoding
-        #new_columns[TIMESTAMP_COLUMN] = int(time())
+            new_columns[INDIRECTION_COLUMN] = prev_tail_rid
+            new_columns[SCHEMA_ENCODING_COLUMN] = schema_encoding
+            #new_columns[TIMESTAMP_COLUMN] = int(time())
 
-        new_record = Record(rid = self.table.page_ranges[page_range_index].assign_logical_rid(), key = primary_key, columns = new_columns)
+            new_record = Record(rid = self.table.page_ranges[page_range_index].assign_logical_rid(), key = primary_key, columns = new_columns)
 
-        new_columns[RID_COLUMN] = new_record.rid
+            new_columns[RID_COLUMN] = new_record.rid
 
-        self.table.update_record(rid_location[0], new_columns)
+            self.table.update_record(rid_location[0], new_columns, prev_columns)
         
-        self.table.bufferpool.write_page_slot(page_range_index, INDIRECTION_COLUMN, page_index, page_slot, new_record.rid)
-        self.table.bufferpool.write_page_slot(page_range_index, SCHEMA_ENCODING_COLUMN, page_index, page_slot, updated_base_schema)
-
-        indirFrame_num = self.table.bufferpool.get_page_frame_num(page_range_index, INDIRECTION_COLUMN, page_index)
-        schemaFrame_num = self.table.bufferpool.get_page_frame_num(page_range_index, SCHEMA_ENCODING_COLUMN, page_index)
-        self.table.bufferpool.mark_frame_used(indirFrame_num)
-        self.table.bufferpool.mark_frame_used(schemaFrame_num)
+            indirection_page.write(page_slot, new_record.rid)
+            schema_page.write(page_slot, updated_base_schema)
 
         # Update successful
         self.table.index.update_all_indices(primary_key, new_columns, prev_columns)
@@ -300,6 +302,34 @@ class Query:
 
 
     
+    """
+    # Update many records, updates is a list of (primary_key, columns) with columns like update takes them
+    # The updates of a page range append their tail records a tail page at a time and the indexes take every change
+    # in one critical section, the records end up as if update was called for each in order
+    # Updates that change the primary key run through update on their own. Updates aren't logged
+    # Returns the number of successful updates, an update with None for every column succeeds like it does through update
+    # Updates of keys that aren't found and updates with the wrong number of columns are skipped and not counted
+    """
+    def update_many(self, updates):
+        num_updated = 0
+        batch = []
+        for primary_key, columns in updates:
+            columns = list(columns)
+            if len(columns) != self.table.num_columns:
+                continue
+
+            if columns[self.table.key] is None:
+                batch.append((primary_key, columns))
+                continue
+
+            num_updated += self.__update_batch(batch)
+            batch = []
+            if self.update(primary_key, *columns):
+                num_updated += 1
+
+        return num_updated + self.__update_batch(batch)
+
+
     """
     :param start_range: int         # Start of the key range to aggregate 
     :param end_range: int           # End of the key range to aggregate 
@@ -328,64 +358,94 @@ class Query:
         if not records_list:
             return False
 
-        sum_total = 0
-        for rid in records_list:
-            page_range_index, base_page_index, base_page_slot = self.table.get_base_record_location(rid)
+        # Sums scan a range of records, their misses go to the scan partition of the bufferpool
+        with self.table.bufferpool.scan_access():
+            # Read the base pages the sum visits in the background
+            self.table.prefetch_base_pages(records_list, [SCHEMA_ENCODING_COLUMN, TIMESTAMP_COLUMN, INDIRECTION_COLUMN, NUM_HIDDEN_COLUMNS + aggregate_column_index])
 
-            # Step 3: Get Base Record Details
-            base_schema = self.__readAndMarkSlot(page_range_index, SCHEMA_ENCODING_COLUMN, base_page_index, base_page_slot)
-            base_timestamp = self.__readAndMarkSlot(page_range_index, TIMESTAMP_COLUMN, base_page_index, base_page_slot)
+            sum_total = 0
+            for rid in records_list:
+                page_range_index, base_page_index, base_page_slot = self.table.get_base_record_location(rid)
+                with self.table.read_base_page(page_range_index, base_page_index) as base_page:
+
+                    # Step 3: Get Base Record Details
+                    base_schema = self.__readAndMarkSlot(page_range_index, SCHEMA_ENCODING_COLUMN, base_page_index, base_page_slot)
+                    base_timestamp = self.__readAndMarkSlot(page_range_index, TIMESTAMP_COLUMN, base_page_index, base_page_slot)
             
-            # Get the current tail RID from the base record
-            current_tail_rid = self.__readAndMarkSlot(page_range_index, INDIRECTION_COLUMN, base_page_index, base_page_slot)
-
-            # Step 4: Check if the RID points to the base record
-            if current_tail_rid == (rid % MAX_RECORD_PER_PAGE_RANGE):
-                # Base RID, read directly from the base page
-                aggregate_value = self.__readAndMarkSlot(page_range_index, NUM_HIDDEN_COLUMNS + aggregate_column_index, base_page_index, base_page_slot)
-                sum_total += aggregate_value
-                continue
+                    # Get the current tail RID from the base record
+                    current_tail_rid = self.__readAndMarkSlot(page_range_index, INDIRECTION_COLUMN, base_page_index, base_page_slot)
+
+                    # Step 4: Check if the RID points to the base record
+                    if current_tail_rid == (rid % MAX_RECORD_PER_PAGE_RANGE):
+                        # Base RID, read directly from the base page
+                        aggregate_value = self.__readAndMarkSlot(page_range_index, NUM_HIDDEN_COLUMNS + aggregate_column_index, base_page.page_indexes[aggregate_column_index], base_page_slot)
+                        sum_total += aggregate_value
+                        self.table.merge_scheduler.record_read(page_range_index, 0)
+                        continue
+
+                    if relative_version == 0 and self.table.cumulative_updates:
+                        record_columns = [None] * self.table.num_columns
+                        tail_hops = self.__read_cumulative_columns(page_range_index, base_page, rid, current_tail_rid, 1 << aggregate_column_index, record_columns)
+                        sum_total += record_columns[aggregate_column_index]
+                        self.table.merge_scheduler.record_read(page_range_index, tail_hops)
+                        continue
+
+                    if relative_version <= 0 and self.table.page_ranges[page_range_index].version_directory.has_versions(rid % MAX_RECORD_PER_PAGE_RANGE):
+                        record_columns = [None] * self.table.num_columns
+                        tail_hops = self.__read_version_columns(page_range_index, base_page, rid, current_tail_rid, relative_version, 1 << aggregate_column_index, record_columns)
+                        sum_total += record_columns[aggregate_column_index]
+                        self.table.merge_scheduler.record_read(page_range_index, tail_hops)
+                        continue
             
-            # Traverse Tail Records by Version
-            current_version = 0
-            found_value = False
+                    # Traverse Tail Records by Version
+                    current_version = 0
+                    found_value = False
+                    tail_hops = 0
+
+                    # Tail records up to the merge time are already in the base page, the latest value stops walking there
+                    merge_time = base_page.merge_times[base_page_slot] if relative_version == 0 else RECORD_NONE_VALUE
             
-            current_version_rid = current_tail_rid
-            while current_version_rid >= MAX_RECORD_PER_PAGE_RANGE and current_version <= relative_version:
-                # Read schema and timestamp from the tail record
-                tail_schema = self.table.page_ranges[page_range_index].read_tail_record_column(current_version_rid, SCHEMA_ENCODING_COLUMN)
-                tail_timestamp = self.table.page_ranges[page_range_index].read_tail_record_column(current_version_rid, TIMESTAMP_COLUMN)
-
-                # Check if the column was updated in this version
-                if (tail_schema >> aggregate_column_index) & 1:
-                    
-                    # Tail_timestamp should be greater than the base_timestamp for current version
-                    if tail_timestamp >= base_timestamp:
-                        # If looking for the latest version
-                        if relative_version == 0:
-                            tail_page_index, tail_slot = self.table.page_ranges[page_range_index].get_column_location(current_version_rid, NUM_HIDDEN_COLUMNS + aggregate_column_index)
-                            aggregate_value = self.__readAndMarkSlot(page_range_index, NUM_HIDDEN_COLUMNS + aggregate_column_index, tail_page_index, tail_slot)
-                            sum_total += aggregate_value
-                            found_value = True
+                    current_version_rid = current_tail_rid
+                    while current_version_rid >= MAX_RECORD_PER_PAGE_RANGE and current_version <= relative_version:
+                        # Read timestamp and schema from the tail record
+                        tail_timestamp = self.table.page_ranges[page_range_index].read_tail_record_column(current_version_rid, TIMESTAMP_COLUMN)
+                        if tail_timestamp <= merge_time:
                             break
 
-                    # Reading from an older version of the record
-                    else:
-                        current_version += 1
-                        if current_version == relative_version:
-                            tail_page_index, tail_slot = self.table.page_ranges[page_range_index].get_column_location(current_version_rid, NUM_HIDDEN_COLUMNS + aggregate_column_index)
-                            aggregate_value = self.__readAndMarkSlot(page_range_index, NUM_HIDDEN_COLUMNS + aggregate_column_index, tail_page_index, tail_slot)
-                            sum_total += aggregate_value
-                            found_value = True
-                            break
+                        tail_hops += 1
+                        tail_schema = self.table.page_ranges[page_range_index].read_tail_record_column(current_version_rid, SCHEMA_ENCODING_COLUMN)
+
+                        # Check if the column was updated in this version
+                        if (tail_schema >> aggregate_column_index) & 1:
+                    
+                            # Tail_timestamp should be greater than the base_timestamp for current version
+                            if tail_timestamp >= base_timestamp:
+                                # If looking for the latest version
+                                if relative_version == 0:
+                                    tail_page_index, tail_slot = self.table.page_ranges[page_range_index].get_column_location(current_version_rid, NUM_HIDDEN_COLUMNS + aggregate_column_index)
+                                    aggregate_value = self.__readAndMarkSlot(page_range_index, NUM_HIDDEN_COLUMNS + aggregate_column_index, tail_page_index, tail_slot)
+                                    sum_total += aggregate_value
+                                    found_value = True
+                                    break
+
+                            # Reading from an older version of the record
+                            else:
+                                current_version += 1
+                                if current_version == relative_version:
+                                    tail_page_index, tail_slot = self.table.page_ranges[page_range_index].get_column_location(current_version_rid, NUM_HIDDEN_COLUMNS + aggregate_column_index)
+                                    aggregate_value = self.__readAndMarkSlot(page_range_index, NUM_HIDDEN_COLUMNS + aggregate_column_index, tail_page_index, tail_slot)
+                                    sum_total += aggregate_value
+                                    found_value = True
+                                    break
 
-                # Move to the previous version
-                current_version_rid = self.table.page_ranges[page_range_index].read_tail_record_column(current_version_rid, INDIRECTION_COLUMN)
+                        # Move to the previous version
+                        current_version_rid = self.table.page_ranges[page_range_index].read_tail_record_column(current_version_rid, INDIRECTION_COLUMN)
 
-            # If no value found in tail records, read from base page
-            if not found_value:
-                aggregate_value = self.__readAndMarkSlot(page_range_index, NUM_HIDDEN_COLUMNS + aggregate_column_index, base_page_index, base_page_slot)
-                sum_total += aggregate_value
+                    # If no value found in tail records, read from base page
+                    if not found_value:
+                        aggregate_value = self.__readAndMarkSlot(page_range_index, NUM_HIDDEN_COLUMNS + aggregate_column_index, base_page.page_indexes[aggregate_column_index], base_page_slot)
+                        sum_total += aggregate_value
+                    self.table.merge_scheduler.record_read(page_range_index, tail_hops)
 
         return sum_total
 
@@ -408,65 +468,282 @@ class Query:
         return False
     
 
-    def __readAndMarkSlot(self, page_range_index, column, page_index, page_slot):
-        value = self.table.bufferpool.read_page_slot(page_range_index, column, page_index, page_slot)
-        frame_num = self.table.bufferpool.get_page_frame_num(page_range_index, column, page_index)
-        self.table.bufferpool.mark_frame_used(frame_num)
+    def __get_columns_schema(self, projected_columns_index) -> int:
+        '''Returns the bitmask of the projected columns'''
+        projected_columns_schema = 0
+        for i in range(len(projected_columns_index)):
+            if projected_columns_index[i] == 1:
+                projected_columns_schema |= (1 << i)
+        return projected_columns_schema
+
+    def __read_base_column(self, rid, base_page, column, base_columns=None):
+        '''Reads a column (hidden or data) of a base record, base_columns holds the columns select_many already read for it'''
+        if base_columns is not None and column in base_columns:
+            return base_columns[column]
+
+        page_range_index, base_page_index, base_page_slot = self.table.get_base_record_location(rid)
+        if column >= NUM_HIDDEN_COLUMNS:
+            base_page_index = base_page.page_indexes[column - NUM_HIDDEN_COLUMNS]
+        return self.__readAndMarkSlot(page_range_index, column, base_page_index, base_page_slot)
+
+    def __read_record(self, rid, base_page, projected_columns_schema, relative_version, base_columns=None) -> tuple[list, int]:
+        '''Reads the projected columns of a version of a record from its held base page and tail records,
+        returns the record columns (None for columns not projected) and the number of tail records read'''
+        record_columns = [None] * self.table.num_columns
+        page_range_index, _, base_page_slot = self.table.get_base_record_location(rid)
+        tail_hops = 0
+
+        if (projected_columns_schema >> self.table.key) & 1 == 1:
+            record_columns[self.table.key] = self.__read_base_column(rid, base_page, NUM_HIDDEN_COLUMNS + self.table.key, base_columns)
+            projected_columns_schema &= ~(1 << self.table.key)
+
+        base_schema = self.__read_base_column(rid, base_page, SCHEMA_ENCODING_COLUMN, base_columns)
+        base_timestamp = self.__read_base_column(rid, base_page, TIMESTAMP_COLUMN, base_columns)
+        current_tail_rid = self.__read_base_column(rid, base_page, INDIRECTION_COLUMN, base_columns)
+
+        if current_tail_rid < MAX_RECORD_PER_PAGE_RANGE:
+        
+            # Current RID = base RID, read all columns from the base page
+            for i in range(self.table.num_columns):
+                if (projected_columns_schema >> i) & 1:
+                    record_columns[i] = self.__read_base_column(rid, base_page, NUM_HIDDEN_COLUMNS + i, base_columns)
 
-        return value
+        elif relative_version == 0 and self.table.cumulative_updates:
+            tail_hops = self.__read_cumulative_columns(page_range_index, base_page, rid, current_tail_rid, projected_columns_schema, record_columns, base_columns)
+
+        elif relative_version <= 0 and self.table.page_ranges[page_range_index].version_directory.has_versions(rid % MAX_RECORD_PER_PAGE_RANGE):
+            tail_hops = self.__read_version_columns(page_range_index, base_page, rid, current_tail_rid, relative_version, projected_columns_schema, record_columns, base_columns)
     
-    def __readAndTrack(self, page_range_index, column, page_index, slot, frames_used):
-        value = self.table.bufferpool.read_page_slot(page_range_index, column, page_index, slot)
-        frame_num = self.table.bufferpool.get_page_frame_num(page_range_index, column, page_index)
-        frames_used.put(frame_num)
-        return value
+        else:
+            current_version = 0
+
+            # Tail records up to the merge time are already in the base page, the latest values stop walking there.
+            # A merge only moves the merge time past tail records it merged every column of
+            merge_time = base_page.merge_times[base_page_slot] if relative_version == 0 else RECORD_NONE_VALUE
+        
+            for i in range(self.table.num_columns):
+                if (projected_columns_schema >> i) & 1:
+                    if (base_schema >> i) & 1 == 0:
+                        record_columns[i] = self.__read_base_column(rid, base_page, NUM_HIDDEN_COLUMNS + i, base_columns)
+                        continue
+
+                    temp_tail_rid = current_tail_rid
+                    found_value = False
+                
+                    while temp_tail_rid >= MAX_RECORD_PER_PAGE_RANGE and current_version <= relative_version:
+                        tail_timestamp = self.table.page_ranges[page_range_index].read_tail_record_column(temp_tail_rid, TIMESTAMP_COLUMN)
+                        if tail_timestamp <= merge_time:
+                            break
+
+                        tail_hops += 1
+                        tail_schema = self.table.page_ranges[page_range_index].read_tail_record_column(temp_tail_rid, SCHEMA_ENCODING_COLUMN)
+                    
+                        if (tail_schema >> i) & 1:
+
+                            # Tail_timestamp should be greater than the base_timestamp for current version
+                            if tail_timestamp >= base_timestamp:
+                            
+                                if relative_version == 0:
+                                    tail_page_index, tail_slot = self.table.page_ranges[page_range_index].get_column_location(temp_tail_rid, NUM_HIDDEN_COLUMNS + i)
+                                    record_columns[i] = self.__readAndMarkSlot(page_range_index, NUM_HIDDEN_COLUMNS + i, tail_page_index, tail_slot)
+                                    found_value = True
+                                    break
+                        
+                             # Reading from an older version of the record
+                            else:
+                                current_version += 1
+
+                                if current_version == relative_version:
+                                    tail_page_index, tail_slot = self.table.page_ranges[page_range_index].get_column_location(temp_tail_rid, NUM_HIDDEN_COLUMNS + i)
+                                    record_columns[i] = self.__readAndMarkSlot(page_range_index, NUM_HIDDEN_COLUMNS + i, tail_page_index, tail_slot)
+                                    found_value = True
+                                    break
+
+                        temp_tail_rid = self.table.page_ranges[page_range_index].read_tail_record_column(temp_tail_rid, INDIRECTION_COLUMN)
+                
+                    if not found_value:
+                        record_columns[i] = self.__read_base_column(rid, base_page, NUM_HIDDEN_COLUMNS + i, base_columns)
+
+        return record_columns, tail_hops
+
+    def __readAndMarkSlot(self, page_range_index, column, page_index, page_slot):
+        return self.table.bufferpool.read_slot(page_range_index, column, page_index, page_slot)
     
-    def __get_prev_columns(self, rid, *columns):
-        prev_columns = [None] * self.table.num_columns
-        tail = False
+    def __read_cumulative_columns(self, page_range_index, base_page, rid, tail_rid, columns_schema, record_columns, base_columns=None) -> int:
+        '''Reads the latest values of the columns set in columns_schema into record_columns for tables with cumulative updates.
+        The newest tail record holds every column updated since the last merge, the other columns are read from the base page.
+        Returns the number of tail records read'''
+        page_range = self.table.page_ranges[page_range_index]
+        tail_hops = 0
+        if page_range.read_tail_record_column(tail_rid, TIMESTAMP_COLUMN) > base_page.merge_times[rid % MAX_RECORD_PER_PAGE]:
+            tail_hops = 1
 
-        page_range_index, page_index, page_slot = self.table.get_base_record_location(rid)
+        for i in range(self.table.num_columns):
+            if (columns_schema >> i) & 1 == 0:
+                continue
+
+            tail_location = page_range.get_tail_column_location(tail_rid, NUM_HIDDEN_COLUMNS + i) if tail_hops else None
+            if tail_location is None:
+                record_columns[i] = self.__read_base_column(rid, base_page, NUM_HIDDEN_COLUMNS + i, base_columns)
+            else:
+                record_columns[i] = self.__readAndMarkSlot(page_range_index, NUM_HIDDEN_COLUMNS + i, *tail_location)
+        return tail_hops
 
-        indir_rid = self.__readAndMarkSlot(page_range_index, INDIRECTION_COLUMN, page_index, page_slot)
-        base_timestamp = self.__readAndMarkSlot(page_range_index, TIMESTAMP_COLUMN, page_index, page_slot)
-        base_schema = self.__readAndMarkSlot(page_range_index, SCHEMA_ENCODING_COLUMN, page_index, page_slot)
+    def __read_version_columns(self, page_range_index, base_page, rid, current_tail_rid, relative_version, columns_schema, record_columns, base_columns=None) -> int:
+        '''Reads the columns set in columns_schema of a version of a record into record_columns through the version
+        directory of its page range, every column takes at most one tail record. Returns the number of tail records read'''
+        page_range = self.table.page_ranges[page_range_index]
+        base_slot = rid % MAX_RECORD_PER_PAGE_RANGE
+        base_page_slot = rid % MAX_RECORD_PER_PAGE
 
-        tail_timestamp = self.table.page_ranges[page_range_index].read_tail_record_column(indir_rid, TIMESTAMP_COLUMN)
+        # The latest values of a record merged since its last update are all in the base page, a merge only moves
+        # the merge time past tail records it merged every column of
+        latest_merged = relative_version == 0 and page_range.read_tail_record_column(current_tail_rid, TIMESTAMP_COLUMN) <= base_page.merge_times[base_page_slot]
 
+        tail_hops = 0
         for i in range(self.table.num_columns):
-            if columns[i] != None:
-                indir_rid = self.__readAndMarkSlot(page_range_index, INDIRECTION_COLUMN, page_index, page_slot)
-                if indir_rid == (rid % MAX_RECORD_PER_PAGE_RANGE) : # if no updates
-                    prev_columns[i] = self.__readAndMarkSlot(page_range_index, NUM_HIDDEN_COLUMNS + i, page_index, page_slot)
+            if (columns_schema >> i) & 1 == 0:
+                continue
 
+            tail_rid = None if latest_merged else page_range.version_directory.get_version_location(base_slot, relative_version, i)
+            if tail_rid is None:
+                record_columns[i] = self.__read_base_column(rid, base_page, NUM_HIDDEN_COLUMNS + i, base_columns)
+            elif tail_rid == RECORD_NONE_VALUE:
+                record_columns[i] = page_range.version_directory.get_previous_value(base_slot, i)
+            else:
+                tail_hops += 1
+                record_columns[i] = self.__readAndMarkSlot(page_range_index, NUM_HIDDEN_COLUMNS + i, *page_range.get_column_location(tail_rid, NUM_HIDDEN_COLUMNS + i))
+        return tail_hops
+
+    def __carry_cumulative_columns(self, page_range_index, page_index, page_slot, prev_tail_rid, new_columns):
+        '''Copies the columns the previous tail record holds into a new tail record that doesn't update them,
+        columns of a previous tail record that is already merged are in the base page and aren't carried'''
+        page_range = self.table.page_ranges[page_range_index]
+        with self.table.read_base_page(page_range_index, page_index) as base_page:
+            merge_time = base_page.merge_times[page_slot]
+        if page_range.read_tail_record_column(prev_tail_rid, TIMESTAMP_COLUMN) <= merge_time:
+            return
+
+        for i, value in enumerate(page_range.read_tail_record_data(prev_tail_rid)):
+            if value is not None and new_columns[NUM_HIDDEN_COLUMNS + i] is None:
+                new_columns[NUM_HIDDEN_COLUMNS + i] = value
+
+    def __update_batch(self, batch) -> int:
+        '''Runs updates that keep the primary key grouped by page range, returns the number of records updated'''
+        if not batch:
+            return 0
+
+        rid_lists = self.table.index.locate_many(self.table.key, [primary_key for primary_key, _ in batch])
+        page_range_updates = {}
+        for (primary_key, columns), rid_list in zip(batch, rid_lists):
+            if rid_list:
+                page_range_updates.setdefault(rid_list[0] // MAX_RECORD_PER_PAGE_RANGE, []).append((rid_list[0], primary_key, columns))
+
+        index_changes = []
+        for page_range_index, updates in page_range_updates.items():
+            index_changes.extend(self.__update_page_range(page_range_index, updates))
+
+        self.table.index.update_many_indices(index_changes)
+        return len(index_changes)
+
+    def __update_page_range(self, page_range_index, updates) -> list:
+        '''Writes the tail records of (rid, primary_key, columns) updates of one page range together,
+        returns the (primary_key, new_columns, prev_columns) of every update for the indexes'''
+        page_range = self.table.page_ranges[page_range_index]
+
+        # The indirection and schema encoding of every base record are read a base page at a time, each update of the batch
+        # moves its record's [tail rid, schema encoding, values updated in the batch, data of the newest tail record] along
+        base_pages = {}
+        for rid, _, _ in updates:
+            base_pages.setdefault(rid // MAX_RECORD_PER_PAGE, {})[rid] = None
+        base_records = {}
+        for page_rids in base_pages.values():
+            page_rids = list(page_rids)
+            _, page_index, _ = self.table.get_base_record_location(page_rids[0])
+            page_slots = [rid % MAX_RECORD_PER_PAGE for rid in page_rids]
+            indirections = self.table.bufferpool.read_page_slots(page_range_index, INDIRECTION_COLUMN, page_index, page_slots)
+            schemas = self.table.bufferpool.read_page_slots(page_range_index, SCHEMA_ENCODING_COLUMN, page_index, page_slots)
+            for rid, prev_tail_rid, base_schema in zip(page_rids, indirections, schemas):
+                base_records[rid] = [prev_tail_rid, base_schema, {}, None]
+
+        rids, records, previous_columns, index_changes = [], [], [], []
+        for rid, primary_key, columns in updates:
+            base_record = base_records[rid]
+            prev_tail_rid, base_schema, batch_values, prev_tail_data = base_record
+
+            # Columns an earlier update of the batch changed aren't on the pages yet, their previous value is the batch's
+            prev_columns = self.__get_prev_columns(rid, *(None if i in batch_values else value for i, value in enumerate(columns)))
+            new_columns = [None] * self.table.total_num_columns
+            schema_encoding = 0
+            for i, value in enumerate(columns):
+                if value is not None:
+                    schema_encoding |= (1 << i)
+                    if i in batch_values:
+                        prev_columns[i] = batch_values[i]
+                new_columns[NUM_HIDDEN_COLUMNS + i] = value
+
+            if self.table.cumulative_updates and prev_tail_rid >= MAX_RECORD_PER_PAGE_RANGE:
+                if prev_tail_data is None:
+                    _, page_index, page_slot = self.table.get_base_record_location(rid)
+                    self.__carry_cumulative_columns(page_range_index, page_index, page_slot, prev_tail_rid, new_columns)
                 else:
-                    # if the tail page for column is latest updated 
-                    if(base_schema >> i) & 1:
-                        while True:
-                            try:
-                                tail_page_index, tail_slot = self.table.page_ranges[page_range_index].get_column_location(indir_rid, i + NUM_HIDDEN_COLUMNS)
-                                tail_timestamp = self.table.page_ranges[page_range_index].read_tail_record_column(indir_rid, TIMESTAMP_COLUMN)
-                                tail = True
-                                break
-                            except:
-                                prev_rid = indir_rid
-                                indir_rid = self.table.page_ranges[page_range_index].read_tail_record_column(indir_rid, INDIRECTION_COLUMN)
-
-                                if indir_rid == rid: #edge case where latest updated column value is in the first tail record inserted
-                                    least_updated_tail_rid = self.table.page_ranges[page_range_index].read_tail_record_column(prev_rid, RID_COLUMN)
-                                    tail_page_index, tail_slot = self.table.page_ranges[page_range_index].get_column_location(least_updated_tail_rid, i + NUM_HIDDEN_COLUMNS)
-                                    tail_timestamp = self.table.page_ranges[page_range_index].read_tail_record_column(least_updated_tail_rid, TIMESTAMP_COLUMN)
-                                    tail = True
-                                    break
+                    for i, value in enumerate(prev_tail_data):
+                        if value is not None and new_columns[NUM_HIDDEN_COLUMNS + i] is None:
+                            new_columns[NUM_HIDDEN_COLUMNS + i] = value
+
+            new_columns[INDIRECTION_COLUMN] = prev_tail_rid
+            new_columns[SCHEMA_ENCODING_COLUMN] = schema_encoding
+            new_columns[RID_COLUMN] = page_range.assign_logical_rid()
+
+            base_record[0] = new_columns[RID_COLUMN]
+            base_record[1] = base_schema | schema_encoding
+            base_record[3] = new_columns[NUM_HIDDEN_COLUMNS:]
+            for i, value in enumerate(columns):
+                if value is not None:
+                    batch_values[i] = value
+
+            rids.append(rid)
+            records.append(new_columns)
+            previous_columns.append(prev_columns)
+            index_changes.append((primary_key, new_columns, prev_columns))
+
+        self.table.update_records(page_range_index, rids, records, previous_columns)
+
+        # Base records point to their newest tail record once every tail record is written
+        for page_rids in base_pages.values():
+            page_rids = list(page_rids)
+            _, page_index, _ = self.table.get_base_record_location(page_rids[0])
+            page_slots = [rid % MAX_RECORD_PER_PAGE for rid in page_rids]
+            self.table.bufferpool.write_page_slots(page_range_index, INDIRECTION_COLUMN, page_index, page_slots, [base_records[rid][0] for rid in page_rids])
+            self.table.bufferpool.write_page_slots(page_range_index, SCHEMA_ENCODING_COLUMN, page_index, page_slots, [base_records[rid][1] for rid in page_rids])
+
+        return index_changes
+
+    def __get_prev_columns(self, rid, *columns):
+        prev_columns = [None] * self.table.num_columns
+
+        page_range_index, page_index, page_slot = self.table.get_base_record_location(rid)
+        page_range = self.table.page_ranges[page_range_index]
+        with self.table.read_base_page(page_range_index, page_index) as base_page:
+
+            indir_rid = self.__readAndMarkSlot(page_range_index, INDIRECTION_COLUMN, page_index, page_slot)
+            base_timestamp = self.__readAndMarkSlot(page_range_index, TIMESTAMP_COLUMN, page_index, page_slot)
+            base_schema = self.__readAndMarkSlot(page_range_index, SCHEMA_ENCODING_COLUMN, page_index, page_slot)
 
+            for i in range(self.table.num_columns):
+                if columns[i] is None:
+                    continue
 
-                    # if the tail page for column is latest updated 
-                    if (base_schema >> i) & 1 and tail_timestamp >= base_timestamp and tail:
-                        prev_columns[i] = self.__readAndMarkSlot(page_range_index, NUM_HIDDEN_COLUMNS + i, tail_page_index, tail_slot)
+                # if a tail record updated the column its newest one holds the latest value
+                tail_location = None
+                if (base_schema >> i) & 1:
+                    tail_location = page_range.find_tail_column_location(indir_rid, NUM_HIDDEN_COLUMNS + i)
 
-                    else: 
-                        prev_columns[i] = self.__readAndMarkSlot(page_range_index, NUM_HIDDEN_COLUMNS + i, page_index, page_slot)
+                if tail_location is not None and tail_location[2] >= base_timestamp:
+                    prev_columns[i] = self.__readAndMarkSlot(page_range_index, NUM_HIDDEN_COLUMNS + i, tail_location[0], tail_location[1])
 
+                else: 
+                    prev_columns[i] = self.__readAndMarkSlot(page_range_index, NUM_HIDDEN_COLUMNS + i, base_page.page_indexes[i], page_slot)
 
         # return prev latest column with queue of frame used to mark frames at the end
         return prev_columns
\ No newline at end of file
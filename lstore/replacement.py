@@ -0,0 +1,181 @@
+'''
+Replacement policies decide which frame of the bufferpool gets evicted next
+Every policy only tracks frames that currently hold a page and picks victims in O(1) amortized time,
+pinned frames are never returned as victims (the bufferpool passes an is_evictable check)
+coldest walks the next victims lazily so the background flusher can clean them before they are evicted,
+the walk reads the policy's live state and has to finish under the lock that guards the policy
+
+LRU_POLICY: exact least recently used
+CLOCK_POLICY: second chance clock over the frames
+TWO_QUEUE_POLICY: 2Q, pages seen once are evicted FIFO before pages that were referenced again
+'''
+
+from lstore.config import *
+from collections import OrderedDict
+from itertools import chain, islice
+
+
+class LRUPolicy:
+    '''Exact LRU, frames are kept in access order inside an OrderedDict'''
+    def __init__(self, num_frames):
+        self.frames = OrderedDict()
+
+    def insert(self, frame_num, page_id):
+        self.frames[frame_num] = page_id
+
+    def access(self, frame_num):
+        self.frames.move_to_end(frame_num)
+
+    def remove(self, frame_num):
+        del self.frames[frame_num]
+
+    def victim(self, is_evictable):
+        '''Returns the least recently used unpinned frame, returns None if every frame is pinned'''
+        for _ in range(len(self.frames)):
+            frame_num = next(iter(self.frames))
+            if is_evictable(frame_num):
+                return frame_num
+
+            # Pinned frames are in use so they count as recently used
+            self.frames.move_to_end(frame_num)
+
+        return None
+
+    def coldest(self, count):
+        '''Returns an iterator over up to count frames in the order they would be evicted'''
+        return islice(self.frames, count)
+
+    def __len__(self):
+        return len(self.frames)
+
+
+class ClockPolicy:
+    '''CLOCK (second chance), a hand sweeps the frames and clears reference bits until it finds an unreferenced frame'''
+    def __init__(self, num_frames):
+        self.ring = []
+        '''Frames swept by the hand, removed frames are swapped with the last frame of the ring'''
+        self.ring_position = {}
+        self.referenced = {}
+        self.hand = 0
+
+    def insert(self, frame_num, page_id):
+        self.ring_position[frame_num] = len(self.ring)
+        self.ring.append(frame_num)
+        self.referenced[frame_num] = True
+
+    def access(self, frame_num):
+        self.referenced[frame_num] = True
+
+    def remove(self, frame_num):
+        position = self.ring_position.pop(frame_num)
+        del self.referenced[frame_num]
+
+        last_frame_num = self.ring.pop()
+        if (last_frame_num != frame_num):
+            self.ring[position] = last_frame_num
+            self.ring_position[last_frame_num] = position
+
+    def victim(self, is_evictable):
+        '''Returns the first unreferenced unpinned frame under the hand, returns None if every frame is pinned'''
+        num_frames = len(self.ring)
+
+        # Two sweeps clear every reference bit so a third can't find anything new
+        for _ in range(num_frames * 2 + 1):
+            if (self.hand >= num_frames):
+                self.hand = 0
+            frame_num = self.ring[self.hand]
+            self.hand += 1
+
+            if self.referenced[frame_num]:
+                self.referenced[frame_num] = False
+                continue
+            if is_evictable(frame_num):
+                return frame_num
+
+        return None
+
+    def coldest(self, count):
+        '''Yields up to count frames the hand reaches next, the unreferenced frames of a sweep from the hand
+        then the referenced ones, callers that stop early only pay for the frames they took'''
+        num_frames = len(self.ring)
+        for referenced in (False, True):
+            for i in range(num_frames):
+                if (count <= 0):
+                    return
+
+                frame_num = self.ring[(self.hand + i) % num_frames]
+                if (self.referenced[frame_num] == referenced):
+                    count -= 1
+                    yield frame_num
+
+    def __len__(self):
+        return len(self.ring)
+
+
+class TwoQueuePolicy:
+    '''
+    2Q: new pages enter a FIFO queue (A1in), pages referenced again while resident or soon after
+    eviction (remembered by the ghost queue A1out) move to an LRU queue (Am).
+    Scans only churn A1in so they can't flush the frequently used pages in Am
+    '''
+    def __init__(self, num_frames):
+        self.a1_in = OrderedDict()
+        self.a1_out = OrderedDict()
+        '''Ghost queue of page ids recently evicted from A1in'''
+        self.am = OrderedDict()
+
+        self.max_a1_in = max(1, num_frames // 4)
+        self.max_a1_out = max(1, num_frames // 2)
+
+    def insert(self, frame_num, page_id):
+        if page_id in self.a1_out:
+            del self.a1_out[page_id]
+            self.am[frame_num] = page_id
+        else:
+            self.a1_in[frame_num] = page_id
+
+    def access(self, frame_num):
+        if frame_num in self.am:
+            self.am.move_to_end(frame_num)
+        # Hits on A1in pages are ignored, correlated references right after a load are not reuse
+
+    def remove(self, frame_num):
+        if frame_num in self.a1_in:
+            page_id = self.a1_in.pop(frame_num)
+            self.a1_out[page_id] = True
+            if len(self.a1_out) > self.max_a1_out:
+                self.a1_out.popitem(last=False)
+        else:
+            del self.am[frame_num]
+
+    def victim(self, is_evictable):
+        '''Evicts from A1in while it is over its share, otherwise from the LRU end of Am'''
+        queues = [self.a1_in, self.am] if len(self.a1_in) > self.max_a1_in else [self.am, self.a1_in]
+        for queue in queues:
+            for _ in range(len(queue)):
+                frame_num = next(iter(queue))
+                if is_evictable(frame_num):
+                    return frame_num
+                queue.move_to_end(frame_num)
+
+        return None
+
+    def coldest(self, count):
+        '''Returns an iterator over up to count frames in the order they would be evicted'''
+        queues = [self.a1_in, self.am] if len(self.a1_in) > self.max_a1_in else [self.am, self.a1_in]
+        return islice(chain(*queues), count)
+
+    def __len__(self):
+        return len(self.a1_in) + len(self.am)
+
+
+def create_replacement_policy(replacement_policy, num_frames):
+    '''Returns the replacement policy with the given name for a bufferpool with num_frames frames'''
+    if (replacement_policy == LRU_POLICY):
+        return LRUPolicy(num_frames)
+    elif (replacement_policy == CLOCK_POLICY):
+        return ClockPolicy(num_frames)
+    elif (replacement_policy == TWO_QUEUE_POLICY):
+        return TwoQueuePolicy(num_frames)
+    else:
+        raise ValueError(f"Unknown replacement policy: {replacement_policy}")
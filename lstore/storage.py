@@ -0,0 +1,202 @@
+'''
+Storage engines decide how the pages of a table are laid out on disk, the bufferpool
+hands every page load and write back to the storage engine of its table
+
+PageFileStorage: one binary page file per page (see bufferpool.py for the layout)
+SegmentStorage: one memory mapped segment file per column of a page range
+DB Directory: Folder
+    -> TableName: Folder
+        -> PageRange_{page_range_index}: Folder
+            -> Column_{record_column}.seg: File holding every page of the column back to back,
+               page_index i lives at offset i * PAGE_FILE_SIZE in the binary page format
+'''
+
+from lstore.config import *
+from lstore.page import PAGE_FILE_SIZE, PAGE_FILE_HEADER, PAGE_FILE_MAGIC
+import mmap
+import os
+import threading
+
+
+class PageFileStorage:
+    '''Stores every page in its own binary page file'''
+    def __init__(self, table_path):
+        self.table_path = table_path
+
+    def get_page_path(self, page_range_index, record_column, page_index) -> str:
+        '''Returns the path of the page'''
+        return os.path.join(self.table_path, os.path.join(f"PageRange_{page_range_index}", f"Page_{record_column}_{page_index}.bin"))
+
+    def load_page(self, frame, page_range_index, record_column, page_index):
+        '''Loads a page into the frame'''
+        frame.load_page(self.get_page_path(page_range_index, record_column, page_index))
+
+    def page_exists(self, page_range_index, record_column, page_index) -> bool:
+        '''Returns True if the page has been written to disk'''
+        return os.path.exists(self.get_page_path(page_range_index, record_column, page_index))
+
+    def unload_page(self, frame):
+        '''Writes the page of the frame back to disk if it is dirty and empties the frame'''
+        frame.unload_page()
+
+    def flush_page(self, frame) -> int:
+        '''Writes the page of the frame to disk if it is dirty and keeps it loaded, returns the bytes written'''
+        return frame.flush_page()
+
+    def flush(self):
+        '''Page files are written back by unload_page, nothing else to flush'''
+        pass
+
+    def close(self):
+        '''Page files are opened and closed by every load and write back, nothing is held open'''
+        pass
+
+
+class Segment:
+    '''A memory mapped file holding every page of one column of a page range'''
+    def __init__(self, segment_path):
+        os.makedirs(os.path.dirname(segment_path), exist_ok=True)
+        if not os.path.exists(segment_path):
+            with open(segment_path, "wb") as segment_file:
+                segment_file.truncate(INITIAL_SEGMENT_PAGES * PAGE_FILE_SIZE)
+
+        self.segment_path = segment_path
+        self.segment_file = open(segment_path, "r+b")
+        self.size = os.path.getsize(segment_path)
+        self.segment_map = mmap.mmap(self.segment_file.fileno(), self.size)
+        self.segment_view = memoryview(self.segment_map)
+        self.retired_maps = []
+        '''Mappings replaced by a grow that frames still held views into when they were replaced'''
+
+        self._segment_lock = threading.Lock()
+
+    def get_page_view(self, page_index) -> memoryview:
+        '''Returns a zero copy view over the header and data of a page, growing the segment if needed'''
+        page_offset = page_index * PAGE_FILE_SIZE
+        with self._segment_lock:
+            if (page_offset + PAGE_FILE_SIZE > self.size):
+                self.__grow(page_offset + PAGE_FILE_SIZE)
+
+            return self.segment_view[page_offset:page_offset + PAGE_FILE_SIZE]
+
+    def flush(self):
+        with self._segment_lock:
+            self.segment_map.flush()
+
+    def close(self):
+        '''Flushes the segment and releases its mappings and file, frames must have unmapped its pages first.
+        A mapping something still holds a view into is unmapped once the last view is gone'''
+        with self._segment_lock:
+            if (self.segment_file.closed):
+                return
+
+            self.segment_map.flush()
+            self.segment_view.release()
+            for segment_map in self.retired_maps + [self.segment_map]:
+                self.__close_map(segment_map)
+            self.retired_maps = []
+            self.segment_file.close()
+
+    def __grow(self, min_size):
+        '''Doubles the segment file until it fits min_size bytes and maps it again.
+        Views handed out from the old mapping stay valid since both map the same file,
+        the old mapping is closed once no frame holds a view into it'''
+        new_size = self.size
+        while (new_size < min_size):
+            new_size *= 2
+
+        self.segment_map.flush()
+        self.segment_file.truncate(new_size)
+        self.size = new_size
+        self.segment_view.release()
+        self.retired_maps.append(self.segment_map)
+        self.segment_map = mmap.mmap(self.segment_file.fileno(), self.size)
+        self.segment_view = memoryview(self.segment_map)
+        self.retired_maps = [segment_map for segment_map in self.retired_maps if not self.__close_map(segment_map)]
+
+    def __close_map(self, segment_map) -> bool:
+        '''Closes a mapping, returns False if views into it are still held'''
+        try:
+            segment_map.close()
+            return True
+        except BufferError:
+            return False
+
+
+class SegmentStorage:
+    '''Stores every column of a page range in one memory mapped segment file,
+    frames get zero copy views into the mapping instead of their own page buffers'''
+    def __init__(self, table_path):
+        self.table_path = table_path
+        self.segments = {}
+        '''Maps (page_range_index, record_column) to its Segment'''
+        self._segments_lock = threading.Lock()
+
+    def get_segment_path(self, page_range_index, record_column) -> str:
+        '''Returns the path of the segment file'''
+        return os.path.join(self.table_path, os.path.join(f"PageRange_{page_range_index}", f"Column_{record_column}.seg"))
+
+    def get_page_path(self, page_range_index, record_column, page_index) -> str:
+        '''Returns the path of the page, the segment file followed by the page index'''
+        return f"{self.get_segment_path(page_range_index, record_column)}:{page_index}"
+
+    def load_page(self, frame, page_range_index, record_column, page_index):
+        '''Maps a page of a segment into the frame'''
+        segment:Segment = self.__get_segment(page_range_index, record_column)
+        frame.map_page(segment.get_page_view(page_index), self.get_page_path(page_range_index, record_column, page_index))
+
+    def page_exists(self, page_range_index, record_column, page_index) -> bool:
+        '''Returns True if the segment holds a written page at page_index'''
+        segment_path = self.get_segment_path(page_range_index, record_column)
+        if ((page_range_index, record_column) not in self.segments and not os.path.exists(segment_path)):
+            return False
+
+        segment:Segment = self.__get_segment(page_range_index, record_column)
+        if ((page_index + 1) * PAGE_FILE_SIZE > segment.size):
+            return False
+        # Segments are zero filled when they grow, written pages start with the page file magic
+        return PAGE_FILE_HEADER.unpack_from(segment.get_page_view(page_index))[0] == PAGE_FILE_MAGIC
+
+    def unload_page(self, frame):
+        '''Writes the page header back into the segment if dirty and empties the frame'''
+        frame.unmap_page()
+
+    def flush_page(self, frame) -> int:
+        '''Writes the page header into the segment if dirty and keeps the page mapped, returns the bytes written'''
+        return frame.flush_mapped_page()
+
+    def flush(self):
+        '''Flushes every mapped segment to disk'''
+        with self._segments_lock:
+            segments = list(self.segments.values())
+
+        for segment in segments:
+            segment.flush()
+
+    def close(self):
+        '''Closes every segment, frames must have unmapped their pages first'''
+        with self._segments_lock:
+            segments = list(self.segments.values())
+            self.segments = {}
+
+        for segment in segments:
+            segment.close()
+
+    def __get_segment(self, page_range_index, record_column) -> Segment:
+        segment_key = (page_range_index, record_column)
+        with self._segments_lock:
+            segment = self.segments.get(segment_key, None)
+            if (segment is None):
+                segment = Segment(self.get_segment_path(page_range_index, record_column))
+                self.segments[segment_key] = segment
+            return segment
+
+
+def create_storage(storage_engine, table_path):
+    '''Returns the storage engine with the given name for a table'''
+    if (storage_engine == PAGE_FILE_STORAGE):
+        return PageFileStorage(table_path)
+    elif (storage_engine == SEGMENT_STORAGE):
+        return SegmentStorage(table_path)
+    else:
+        raise ValueError(f"Unknown storage engine: {storage_engine}")
@@ -1,13 +1,16 @@
 from lstore.index import Index
-from lstore.page_range import PageRange, MergeRequest
-from time import time
+from lstore.page_range import PageRange, MergeRequest, BasePageVersion
+from lstore.merge_scheduler import MergeScheduler, MergeQueue
 from lstore.config import *
-from lstore.bufferpool import BufferPool
+from lstore.bufferpool import BufferPool, SharedBufferPool, get_page_id
 from lstore.lock import LockManager
+from array import array
 import json
+import csv
 import os
 import threading
 import queue
+from contextlib import contextmanager
 from typing import List
 
 class Record:
@@ -28,8 +31,16 @@ class Table:
     :param num_columns: int     #Number of Columns: all columns are integer
     :param key: int             #Index of table(primary) key in column
     :db_path: string            #Path to the database directory where the table's data will be stored.
+    :storage_engine: string     #How pages are laid out on disk (PAGE_FILE_STORAGE or SEGMENT_STORAGE)
+    :replacement_policy: string #Bufferpool replacement policy (LRU_POLICY, CLOCK_POLICY or TWO_QUEUE_POLICY)
+    :shared_bufferpool: SharedBufferPool #Frames shared with other tables, None gives the table its own bufferpool
+    :merge_workers: int         #Threads merging page ranges concurrently
+    :cumulative_updates: bool   #Tail records carry every column updated since the last merge, see CUMULATIVE_UPDATES
+    :fixed_tail_layout: bool    #Tail records keep every column at the slot of their logical rid, see FIXED_TAIL_LAYOUT
     """
-    def __init__(self, name, num_columns, key, db_path, lock_manager:LockManager):
+    def __init__(self, name, num_columns, key, db_path, lock_manager:LockManager, storage_engine=DEFAULT_STORAGE_ENGINE, replacement_policy=DEFAULT_REPLACEMENT_POLICY, shared_bufferpool:SharedBufferPool=None, merge_workers=MERGE_WORKERS, cumulative_updates=CUMULATIVE_UPDATES, fixed_tail_layout=FIXED_TAIL_LAYOUT):
+        if (merge_workers < 1):
+            raise ValueError("Error Creating Table! A table needs at least one merge worker")
         if (key < 0 or key >= num_columns):
             raise ValueError("Error Creating Table! Primary Key must be within the columns of the table")
 
@@ -40,37 +51,43 @@ class Table:
         self.num_columns = num_columns
         self.total_num_columns = num_columns + NUM_HIDDEN_COLUMNS
         self.lock_manager:LockManager = lock_manager
+        self.storage_engine = storage_engine
+        self.replacement_policy = replacement_policy
+        self.cumulative_updates = cumulative_updates
+        self.fixed_tail_layout = fixed_tail_layout
 
         self.page_directory = {}
         '''
-        Page direcotry will map rids to consolidated rids
-        page_directory[rid] = consolidated_rid
-        consolidated_rid is treated the same as a base_rid
-        Table_merge should be the only function that modifies the page_directory
-        All others can access the page_dierctory
+        Page directory maps every base page to the version holding its data columns
+        page_directory[(page_range_index, page_index)] = BasePageVersion
+        Table_merge should be the only function that modifies the page_directory, it swaps in consolidated versions
+        All others can access the page_directory through read_base_page
         '''
         self.page_directory_lock = threading.Lock()
 
 
-        # initialize bufferpool in table, not DB
-        self.bufferpool = BufferPool(self.table_path, self.num_columns)
+        # tables get their own bufferpool unless the database shares one between its tables
+        self.bufferpool = BufferPool(self.table_path, self.num_columns, self.storage_engine, self.replacement_policy, shared_bufferpool=shared_bufferpool)
         self.page_ranges:List[PageRange] = []
 
         # setup queues for base rid allocation/deallocation
         self.deallocation_base_rid_queue = queue.Queue()
         self.allocation_base_rid_queue = queue.Queue()
 
-        self.merge_queue = queue.Queue()
-        '''stores the base rid of a record to be merged'''
+        self.merge_queue = MergeQueue()
+        '''stores the page ranges to be merged, at most one request per page range waits'''
+        self.merge_scheduler = MergeScheduler(self.merge_queue, max_merges=merge_workers)
+        '''Picks the page ranges to merge from the updates and tail hops queries report'''
 
         # The table should handle assigning RIDs
         self.rid_index = 0
         
         self.index = Index(self)
-        # Start the merge thread
-        # Note: This thread will stop running when the main program terminates
-        self.merge_thread = threading.Thread(target=self.__merge, daemon=True)
-        self.merge_thread.start()
+        # Start the merge threads
+        # Note: These threads will stop running when the main program terminates
+        self.merge_threads = [threading.Thread(target=self.__merge, daemon=True) for _ in range(merge_workers)]
+        for merge_thread in self.merge_threads:
+            merge_thread.start()
 
         # start the deallocation thread
         self.deallocation_thread = threading.Thread(target=self.__delete_worker, daemon=True)
@@ -87,6 +104,13 @@ class Table:
                 record.rid = self.rid_index
                 self.rid_index += 1
 
+    def assign_rid_block(self, num_records) -> int:
+        '''Assigns contiguous unused RIDs to num_records records and returns the first one, recycled RIDs are left to single inserts'''
+        with self.page_directory_lock:
+            first_rid = self.rid_index
+            self.rid_index += num_records
+            return first_rid
+
     def get_base_record_location(self, rid) -> tuple[int, int, int]:
         '''Returns the location of a record within base pages given a rid'''
         page_range_index = rid // (MAX_RECORD_PER_PAGE_RANGE)
@@ -94,20 +118,113 @@ class Table:
         page_slot = rid % MAX_RECORD_PER_PAGE
         return (page_range_index, page_index, page_slot)
 
+    @contextmanager
+    def read_base_page(self, page_range_index, page_index):
+        '''Holds the current version of a base page while a record is read from it, yields the BasePageVersion.
+        Merges swap in new versions without waiting, the held version is only reclaimed once its readers are done'''
+        page_range:PageRange = self.page_ranges[page_range_index]
+        version = page_range.acquire_base_page(page_index)
+        try:
+            yield version
+        finally:
+            page_range.release_base_page(version)
+
+    def prefetch_base_pages(self, rids, columns):
+        '''Hints the bufferpool to read the base pages of the given columns, in the order the rids will be visited'''
+        page_ids = []
+        seen_pages = set()
+        for rid in rids:
+            base_page = rid // MAX_RECORD_PER_PAGE
+            if (base_page in seen_pages):
+                continue
+
+            seen_pages.add(base_page)
+            page_range_index, page_index, _ = self.get_base_record_location(rid)
+            data_page_indexes = self.page_directory[(page_range_index, page_index)].page_indexes
+            page_ids.extend(get_page_id(page_range_index, column, page_index if column < NUM_HIDDEN_COLUMNS else data_page_indexes[column - NUM_HIDDEN_COLUMNS]) for column in columns)
+
+        self.bufferpool.prefetch(page_ids)
+
     def insert_record(self, record: Record):
         page_range_index, page_index, page_slot = self.get_base_record_location(record.rid)
-
-        if (page_range_index >= len(self.page_ranges)):
-            self.page_ranges.append(PageRange(page_range_index, self.num_columns, self.bufferpool))
-        
-        current_page_range:PageRange = self.page_ranges[page_range_index]
+        current_page_range:PageRange = self.__get_page_range(page_range_index)
 
         with current_page_range.page_range_lock:
             record.columns[TIMESTAMP_COLUMN] = current_page_range.tps
         current_page_range.write_base_record(page_index, page_slot, record.columns)   
 
-    def update_record(self, rid, columns) -> bool:
-        '''Updates a record given its RID'''
+    def __get_page_range(self, page_range_index) -> PageRange:
+        '''Returns a page range, the page ranges up to it are created if they don't exist yet'''
+        while (page_range_index >= len(self.page_ranges)):
+            self.page_ranges.append(PageRange(len(self.page_ranges), self.num_columns, self.bufferpool, self.page_directory, self.fixed_tail_layout))
+        return self.page_ranges[page_range_index]
+
+    def bulk_load(self, rows, batch_size=BULK_LOAD_BATCH_SIZE) -> int:
+        '''
+        Inserts rows of num_columns values a batch at a time instead of one Query.insert per row: every batch gets contiguous
+        rids and is written to the base pages a page at a time, the indexes get every loaded record in one sorted build at the end.
+        Rows with the wrong number of columns or a primary key the table or an earlier row already has are skipped.
+        Loaded records can only be located once the load returns and inserts must not run meanwhile.
+        Returns the number of rows inserted
+        '''
+        loaded_keys = set()
+        loaded_rids = array("i")
+        loaded_values = [None if index is None else array("i") for index in self.index.indices]
+        '''Values of the loaded records for every indexed column, for the index build'''
+        batch = []
+        try:
+            for row in rows:
+                if (len(row) == self.num_columns):
+                    batch.append(row)
+                if (len(batch) == batch_size):
+                    self.__load_batch(batch, loaded_keys, loaded_rids, loaded_values)
+                    batch = []
+            if (batch):
+                self.__load_batch(batch, loaded_keys, loaded_rids, loaded_values)
+
+        # Records written before a failure still get their index entries
+        finally:
+            for column, values in enumerate(loaded_values):
+                if (values is not None):
+                    self.index.bulk_insert(column, values, loaded_rids)
+        return len(loaded_rids)
+
+    def __load_batch(self, rows, loaded_keys, loaded_rids, loaded_values):
+        '''Writes the rows of a bulk load batch with a new primary key to the base pages'''
+        existing_keys = self.index.get_existing_values(self.key, [row[self.key] for row in rows])
+        new_rows = []
+        for row in rows:
+            if (row[self.key] not in existing_keys and row[self.key] not in loaded_keys):
+                loaded_keys.add(row[self.key])
+                new_rows.append(row)
+        if (not new_rows):
+            return
+
+        data_columns = [array("i", values) for values in zip(*new_rows)]
+        first_rid = self.assign_rid_block(len(new_rows))
+        offset = 0
+        while (offset < len(new_rows)):
+            page_range_index, page_index, page_slot = self.get_base_record_location(first_rid + offset)
+            num_records = min(MAX_RECORD_PER_PAGE - page_slot, len(new_rows) - offset)
+            self.__get_page_range(page_range_index).write_base_records(page_index, page_slot, first_rid + offset, [values[offset:offset + num_records] for values in data_columns])
+            offset += num_records
+
+        loaded_rids.extend(range(first_rid, first_rid + len(new_rows)))
+        for column, values in enumerate(loaded_values):
+            if (values is not None):
+                values.extend(data_columns[column])
+
+    def load_csv(self, path, has_header=False, batch_size=BULK_LOAD_BATCH_SIZE) -> int:
+        '''Bulk loads a CSV file of integer columns, streaming it through bulk_load. Returns the number of rows inserted'''
+        with open(path, newline="") as csv_file:
+            reader = csv.reader(csv_file)
+            if (has_header):
+                next(reader, None)
+            return self.bulk_load((tuple(int(value) for value in row) for row in reader if row), batch_size)
+
+    def update_record(self, rid, columns, previous_columns=None) -> bool:
+        '''Updates a record given its RID, with the previous values of the updated columns the update becomes
+        a version of the record in the version directory of its page range'''
         page_range_index = rid // MAX_RECORD_PER_PAGE_RANGE
         current_page_range:PageRange = self.page_ranges[page_range_index]
 
@@ -115,91 +232,82 @@ class Table:
             columns[TIMESTAMP_COLUMN] = current_page_range.tps
             
         update_success = current_page_range.write_tail_record(columns[RID_COLUMN], *columns)
+        if (update_success and previous_columns is not None):
+            current_page_range.version_directory.add_version(rid % MAX_RECORD_PER_PAGE_RANGE, columns[RID_COLUMN], columns[SCHEMA_ENCODING_COLUMN], previous_columns, current_page_range.read_tail_record_column)
 
-        if (current_page_range.tps % (MAX_TAIL_PAGES_BEFORE_MERGING * MAX_RECORD_PER_PAGE) == 0):
-            self.merge_queue.put(MergeRequest(current_page_range.page_range_index)) 
-            # if (self.merge_thread.is_alive() == False):
-            #     self.merge_thread = threading.Thread(target=self.__merge)
-            #     self.merge_thread.start()
+        self.merge_scheduler.record_update(page_range_index)
 
         return update_success
 
-    
-    def __merge(self):
-        # print("Merge is happening")
-
-        while True:
-            # Block ensures that we wait for a record to be added to the queue first
-            # before we continue merging a record
-            merge_request:MergeRequest = self.merge_queue.get()
-
+    def update_records(self, page_range_index, rids, records, previous_columns) -> bool:
+        '''Updates many records of one page range, records holds the columns of the tail record of each RID
+        and previous_columns its previous values like update_record takes them. The tail records are written together'''
+        current_page_range:PageRange = self.page_ranges[page_range_index]
 
-            # make a copy of the base page for the recieved rid
-            start_rid = merge_request.page_range_index * MAX_RECORD_PER_PAGE_RANGE
-            end_rid = min(start_rid + MAX_RECORD_PER_PAGE_RANGE, self.rid_index)
+        update_success = current_page_range.write_tail_records(records)
+        if (update_success):
+            for (rid, columns, prev_columns) in zip(rids, records, previous_columns):
+                current_page_range.version_directory.add_version(rid % MAX_RECORD_PER_PAGE_RANGE, columns[RID_COLUMN], columns[SCHEMA_ENCODING_COLUMN], prev_columns, current_page_range.read_tail_record_column)
 
-            current_page_range:PageRange = self.page_ranges[merge_request.page_range_index]
+        for _ in records:
+            self.merge_scheduler.record_update(page_range_index)
 
-            for rid in range(start_rid, end_rid):
-                _, page_index, page_slot = self.get_base_record_location(rid)
+        return update_success
 
-                base_record_columns = current_page_range.copy_base_record(page_index, page_slot)
-                base_merge_time = base_record_columns[UPDATE_TIMESTAMP_COLUMN]
+    def memory_stats(self) -> dict:
+        '''Returns the memory used by the in memory structures of the page ranges, per page range and in total.
+        Page ranges with the fixed tail layout have no logical directory'''
+        page_ranges = {
+            page_range.page_range_index: {
+                "logical_directory": None if page_range.logical_directory is None else page_range.logical_directory.get_stats(),
+                "version_directory": page_range.version_directory.get_stats()
+            }
+            for page_range in self.page_ranges
+        }
+        return {
+            "logical_directory_bytes": sum(stats["logical_directory"]["bytes"] for stats in page_ranges.values() if stats["logical_directory"] is not None),
+            "version_directory_bytes": sum(stats["version_directory"]["bytes"] for stats in page_ranges.values()),
+            "page_ranges": page_ranges
+        }
 
-                if (base_merge_time is None):
-                    base_merge_time = 0
-                    if (self.__insert_base_copy_to_tail_pages(current_page_range, base_record_columns) is False):
-                        continue
+    def merge_stats(self) -> dict:
+        '''Returns the merge queue, scheduling counters and tail chain stats of every page range, see MergeScheduler.get_stats()'''
+        return self.merge_scheduler.get_stats()
 
-                # Get the latest record
-                current_rid = base_record_columns[INDIRECTION_COLUMN]
-                latest_schema_encoding = base_record_columns[SCHEMA_ENCODING_COLUMN]
-                latest_timestamp = current_page_range.read_tail_record_column(current_rid, TIMESTAMP_COLUMN)
-                current_time_stamp = latest_timestamp
+    def __merge(self):
+        # print("Merge is happening")
 
-                # if current rid < MAX_RECORD_PER_PAGE_RANGE, then we are at the base record
-                while current_rid >= MAX_RECORD_PER_PAGE_RANGE and latest_schema_encoding != 0 and current_time_stamp > base_merge_time:
-                    indirection_column = current_page_range.read_tail_record_column(current_rid, INDIRECTION_COLUMN)
-                    schema_encoding = current_page_range.read_tail_record_column(current_rid, SCHEMA_ENCODING_COLUMN)
-                    current_time_stamp = current_page_range.read_tail_record_column(current_rid, TIMESTAMP_COLUMN)
-                    
-                    for col_index in range(self.num_columns):
-                        if (latest_schema_encoding & (1 << col_index)) and (schema_encoding & (1 << col_index)):
-                            latest_schema_encoding ^= (1 << col_index)
-                            base_record_columns[col_index + NUM_HIDDEN_COLUMNS] = current_page_range.read_tail_record_column(current_rid, col_index + NUM_HIDDEN_COLUMNS)
+        while True:
+            # Block ensures that we wait for a record to be added to the queue first
+            # before we continue merging a record
+            merge_request:MergeRequest = self.merge_queue.get()
 
-                    current_rid = indirection_column
-                
-                base_record_columns[UPDATE_TIMESTAMP_COLUMN] = latest_timestamp
+            # Other workers merge other page ranges meanwhile, a page range requested again while it is merged waits here
+            with self.page_ranges[merge_request.page_range_index].merge_lock:
+                self.merge_scheduler.merge_started(merge_request.page_range_index)
 
-                base_record_columns[UPDATE_TIMESTAMP_COLUMN] = int(time())
-                self.bufferpool.write_page_slot(merge_request.page_range_index, UPDATE_TIMESTAMP_COLUMN, page_index, page_slot, base_record_columns[UPDATE_TIMESTAMP_COLUMN])
+                # Merge reads every page of the range, its misses go to the scan partition of the bufferpool
+                # so merging doesn't flush the pages foreground queries are using
+                with self.bufferpool.scan_access():
+                    self.__merge_page_range(merge_request)
+                self.merge_scheduler.merge_finished(merge_request.page_range_index)
 
-                # consolidate base page columns
-                for i in range(self.num_columns):
-                    self.bufferpool.write_page_slot(merge_request.page_range_index, NUM_HIDDEN_COLUMNS + i, page_index, page_slot, base_record_columns[i + NUM_HIDDEN_COLUMNS])
-            
             self.merge_queue.task_done()
 
 
-    def __insert_base_copy_to_tail_pages(self, page_range:PageRange, base_record_columns):
-        '''Inserts a copy of the base record to the last tail page of the record'''
-        logical_rid = page_range.assign_logical_rid()
-        indirection_rid = base_record_columns[INDIRECTION_COLUMN]
-        last_indirection_rid = page_range.find_records_last_logical_rid(indirection_rid)
+    def __merge_page_range(self, merge_request:MergeRequest):
+        '''Consolidates the tail records written since the last merge of a page range into its base pages'''
+        start_rid = merge_request.page_range_index * MAX_RECORD_PER_PAGE_RANGE
+        end_rid = min(start_rid + MAX_RECORD_PER_PAGE_RANGE, self.rid_index)
 
-        # if no tail record exist return false
-        if (last_indirection_rid == indirection_rid):
-            return False
-        
-        page_index, page_slot = page_range.get_column_location(last_indirection_rid, INDIRECTION_COLUMN)
-        page_range.write_tail_record(logical_rid, *base_record_columns)
+        current_page_range:PageRange = self.page_ranges[merge_request.page_range_index]
+
+        # Read the pages the merge walks through in the background
+        self.prefetch_base_pages(range(start_rid, end_rid, MAX_RECORD_PER_PAGE), [INDIRECTION_COLUMN, SCHEMA_ENCODING_COLUMN, UPDATE_TIMESTAMP_COLUMN, *range(NUM_HIDDEN_COLUMNS, self.total_num_columns)])
+        current_page_range.prefetch_tail_pages([INDIRECTION_COLUMN, TIMESTAMP_COLUMN, SCHEMA_ENCODING_COLUMN])
 
-        # edit the last page's indirection column to point to the new copied base record
-        self.bufferpool.write_page_slot(page_range.page_range_index, INDIRECTION_COLUMN, page_index, page_slot, logical_rid)
+        current_page_range.merge_base_pages(end_rid - start_rid)
 
-        return True
-    
     def grab_all_base_rids(self):
         '''Returns a list of all base rids'''
         return list(range(self.rid_index))
@@ -210,6 +318,11 @@ class Table:
             "table_name": self.name,
             "num_columns": self.num_columns,
             "key_index": self.key,
+            "storage_engine": self.storage_engine,
+            "replacement_policy": self.replacement_policy,
+            "merge_workers": len(self.merge_threads),
+            "cumulative_updates": self.cumulative_updates,
+            "fixed_tail_layout": self.fixed_tail_layout,
             "page_directory": self.serialize_page_directory(),
             "rid_index": self.rid_index,
             "index": self.index.serialize(),
@@ -220,12 +333,13 @@ class Table:
     def serialize_page_directory(self):
         """Serializes the Page Directory for JSON compatibility"""
         serialized_directory = {}
-        for rid, location in self.page_directory.items():
-            # Location is (Page Range ID, Page Index, Slot Index)
-            serialized_directory[rid] = {
-                "page_range_id": location[0],
-                "page_index": location[1],
-                "slot_index": location[2]
+        for (page_range_index, page_index), version in self.page_directory.items():
+            # Keyed by the base page number, (Page Range ID, Page Index) of the base page
+            serialized_directory[page_range_index * MAX_PAGE_RANGE + page_index] = {
+                "page_range_id": page_range_index,
+                "page_index": page_index,
+                "data_page_indexes": version.page_indexes,
+                "tps": version.tps
             }
         return serialized_directory
 
@@ -237,15 +351,16 @@ class Table:
         self.key = data['key_index']
         self.rid_index = data['rid_index']
         
-        # Recreate Page Directory
-        self.page_directory = self.deserialize_page_directory(data['page_directory'])
+        # Recreate Page Directory, page ranges only add the versions of base pages it doesn't hold
+        self.page_directory.clear()
+        self.page_directory.update(self.deserialize_page_directory(data['page_directory']))
 
         # Recreate Index
         self.index.deserialize(data['index'])
 
         for idx, pr_data in enumerate(data['page_ranges']):
         # Fix: Pass required arguments for PageRange
-            page_range = PageRange(idx, self.num_columns, self.bufferpool)
+            page_range = PageRange(idx, self.num_columns, self.bufferpool, self.page_directory, self.fixed_tail_layout)
             page_range.deserialize(pr_data)
             self.page_ranges.append(page_range)
             
@@ -254,16 +369,14 @@ class Table:
         """Deserializes the Page Directory from JSON-compatible format"""
         deserialized_directory = {}
 
-        for rid_str, location in serialized_directory.items():
-            # Convert RID key from string to integer
-            rid = int(rid_str)
+        for location in serialized_directory.values():
+            # Directories saved before merges swapped base page versions hold no versions
+            if ("data_page_indexes" not in location):
+                continue
 
-            # Reconstruct the location tuple: (Page Range ID, Page Index, Slot Index)
-            deserialized_directory[rid] = (
-                int(location['page_range_id']),  # Convert to int
-                int(location['page_index']),     # Convert to int
-                int(location['slot_index'])      # Convert to int
-            )
+            # Reconstruct the key tuple: (Page Range ID, Page Index)
+            directory_key = (int(location['page_range_id']), int(location['page_index']))
+            deserialized_directory[directory_key] = BasePageVersion(location['data_page_indexes'], location['tps'])
 
         return deserialized_directory
 
@@ -283,12 +396,14 @@ class Table:
 
                 self.allocation_base_rid_queue.put(rid)
 
-                logical_rid = page_range.bufferpool.read_page_slot(page_range_idx, INDIRECTION_COLUMN, page_idx, page_slot)   
+                with page_range.bufferpool.pin(page_range_idx, INDIRECTION_COLUMN, page_idx) as page:
+                    logical_rid = page.read(page_slot)
 
                 # traverse 
                 while logical_rid >= MAX_RECORD_PER_PAGE_RANGE:
                     page_range.allocation_logical_rid_queue.put(logical_rid)
                     logical_page_index, logical_page_slot = page_range.get_column_location(logical_rid, INDIRECTION_COLUMN)
-                    logical_rid = page_range.bufferpool.read_page_slot(page_range_idx, INDIRECTION_COLUMN, logical_page_index, logical_page_slot)
+                    with page_range.bufferpool.pin(page_range_idx, INDIRECTION_COLUMN, logical_page_index) as page:
+                        logical_rid = page.read(logical_page_slot)
             
                 self.deallocation_base_rid_queue.task_done()
@@ -176,6 +176,7 @@ class Transaction:
         transaction_id = id(self)
         if self.queries and self.queries[0][1].lock_manager.transaction_states.get(transaction_id):
             self.queries[0][1].lock_manager.release_all_locks(transaction_id)
+        self.__check_pins_released()
         return False
 
     
@@ -189,8 +190,15 @@ class Transaction:
         self.undo_log.clear()
         # TBD, persist the log to disk here.
 
+        self.__check_pins_released()
         return True
 
+    def __check_pins_released(self):
+        '''With pin debugging on, every page the queries pinned must be unpinned once the transaction ends'''
+        for table in {table for _, table, _ in self.queries}:
+            if table.bufferpool is not None:
+                table.bufferpool.assert_pins_released()
+
     def __query_unique_identifier(self, query, table, args):
         if (query.__name__ in ["delete", "update"]):
             return (args[0], table.key)
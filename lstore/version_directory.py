@@ -0,0 +1,207 @@
+'''
+The version directory of a page range lists the tail records of every base record in update order, so reading
+an older version jumps straight to the tail record holding it instead of walking the tail chain
+Each record keeps its newest VERSION_DIRECTORY_MAX_VERSIONS versions: the tail rid of each version and, per column,
+the versions that updated the column. Versions are numbered from the first update of the record,
+the value of a column at a version is in the newest tail record updating it at or before the version (found by bisection),
+or is the value the column had before the oldest version kept.
+Versions older than the history kept read as the state before the oldest version kept, like versions older than
+the first update read as the insert.
+The directory is saved as a binary file: a header followed by one array("i") holding every record, see save.
+'''
+
+from lstore.config import *
+from array import array
+from bisect import bisect_right
+from typing import Union
+import struct
+import sys
+import os
+
+VERSION_DIRECTORY_MAGIC = b"LSVD"
+VERSION_DIRECTORY_FORMAT = 1
+VERSION_DIRECTORY_HEADER = struct.Struct("=4sHHI")
+'''Binary version directory header: magic, format version, num_columns, num_records'''
+NO_COLUMN_VERSIONS = -1
+'''Number of versions saved for a column the record never updated'''
+
+
+class RecordVersions:
+    '''The versions kept for one base record'''
+    __slots__ = ("tail_rids", "first_version", "column_versions", "previous_values")
+
+    def __init__(self, num_columns):
+        self.tail_rids = array("i")
+        '''Tail rid of every version kept, oldest first'''
+        self.first_version = 0
+        '''Number of the oldest version kept, versions are numbered from the first update of the record'''
+        self.column_versions = [None] * num_columns
+        '''For each column the numbers of the kept versions that updated it, None for columns never updated'''
+        self.previous_values = [None] * num_columns
+        '''For each updated column its value before the oldest version kept that updates it'''
+
+    def get_bytes(self) -> int:
+        return sys.getsizeof(self.tail_rids) + sys.getsizeof(self.column_versions) + sys.getsizeof(self.previous_values) + \
+            sum(sys.getsizeof(versions) for versions in self.column_versions if versions is not None)
+
+
+class VersionDirectory:
+    '''
+    :param num_columns: int     #Data columns of the table
+    :param max_versions: int    #Versions kept per record, bounds the memory of the directory
+    '''
+    def __init__(self, num_columns, max_versions=VERSION_DIRECTORY_MAX_VERSIONS):
+        self.num_columns = num_columns
+        self.max_versions = max_versions
+        self.records = {}
+        '''Maps the slot of a base record within its page range to its RecordVersions'''
+
+    def add_version(self, base_slot, tail_rid, schema_encoding, previous_columns, read_tail_column) -> int:
+        '''
+        Adds the tail record of an update to the versions of a base record
+        :param previous_columns: list   #Values of the updated columns before the update
+        :param read_tail_column: func   #read_tail_column(tail_rid, column) reads a data column of a tail record,
+                                        #used to keep the value of the versions dropped once a record has max_versions
+        Returns the number of the new version
+        '''
+        record_versions:RecordVersions = self.records.get(base_slot, None)
+        if (record_versions is None):
+            record_versions = self.records[base_slot] = RecordVersions(self.num_columns)
+
+        version = record_versions.first_version + len(record_versions.tail_rids)
+        record_versions.tail_rids.append(tail_rid)
+        for column in range(self.num_columns):
+            if (schema_encoding >> column) & 1 == 0:
+                continue
+
+            if (record_versions.column_versions[column] is None):
+                record_versions.column_versions[column] = array("i")
+            if (not record_versions.column_versions[column]):
+                record_versions.previous_values[column] = previous_columns[column]
+            record_versions.column_versions[column].append(version)
+
+        if (len(record_versions.tail_rids) > self.max_versions):
+            self.__drop_oldest_version(record_versions, read_tail_column)
+        return version
+
+    def remove_record(self, base_slot):
+        '''Forgets the versions of a base record, its slot is reused by an insert'''
+        self.records.pop(base_slot, None)
+
+    def get_version_location(self, base_slot, relative_version, column) -> Union[int, None]:
+        '''
+        Returns where a column of a record has the given relative version (0 latest, -1 the version before)
+        The tail rid of the tail record holding the value, RECORD_NONE_VALUE if the value is the one the column had before
+        the oldest version kept, or None if the record has no versions or never updated the column (the base page holds it)
+        '''
+        record_versions:RecordVersions = self.records.get(base_slot, None)
+        if (record_versions is None or record_versions.column_versions[column] is None):
+            return None
+
+        # Versions older than the oldest one kept read as the state before it
+        version = max(record_versions.first_version + len(record_versions.tail_rids) - 1 + relative_version, record_versions.first_version - 1)
+        column_versions = record_versions.column_versions[column]
+        position = bisect_right(column_versions, version) - 1
+        if (position < 0):
+            return RECORD_NONE_VALUE
+        return record_versions.tail_rids[column_versions[position] - record_versions.first_version]
+
+    def get_previous_value(self, base_slot, column) -> int:
+        '''Returns the value a column had before the oldest version of a record kept that updates it'''
+        return self.records[base_slot].previous_values[column]
+
+    def has_versions(self, base_slot) -> bool:
+        return base_slot in self.records
+
+    def get_stats(self) -> dict:
+        '''Returns the number of records and versions kept and an estimate of the memory they use'''
+        return {
+            "records": len(self.records),
+            "versions": sum(len(record_versions.tail_rids) for record_versions in self.records.values()),
+            "max_versions_per_record": self.max_versions,
+            "bytes": sys.getsizeof(self.records) + sum(record_versions.get_bytes() for record_versions in self.records.values())
+        }
+
+    def save(self, path):
+        '''
+        Writes the versions of every record to a binary file, each record is the integers
+        base_slot, first_version, number of versions, the tail rids, then per column the number of versions
+        that updated it (NO_COLUMN_VERSIONS if none) followed by them, then per column a flag and the previous value
+        '''
+        values = array("i")
+        for base_slot, record_versions in self.records.items():
+            values.extend((base_slot, record_versions.first_version, len(record_versions.tail_rids)))
+            values.extend(record_versions.tail_rids)
+            for column_versions in record_versions.column_versions:
+                if (column_versions is None):
+                    values.append(NO_COLUMN_VERSIONS)
+                else:
+                    values.append(len(column_versions))
+                    values.extend(column_versions)
+            for previous_value in record_versions.previous_values:
+                values.extend((0, 0) if previous_value is None else (1, previous_value))
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as directory_file:
+            directory_file.write(VERSION_DIRECTORY_HEADER.pack(VERSION_DIRECTORY_MAGIC, VERSION_DIRECTORY_FORMAT, self.num_columns, len(self.records)))
+            directory_file.write(values.tobytes())
+
+    def load(self, path):
+        '''Reads a file written by save'''
+        with open(path, "rb") as directory_file:
+            magic, version, num_columns, num_records = VERSION_DIRECTORY_HEADER.unpack(directory_file.read(VERSION_DIRECTORY_HEADER.size))
+            if (magic != VERSION_DIRECTORY_MAGIC):
+                raise ValueError(f"{path} is not a version directory file")
+            if (version != VERSION_DIRECTORY_FORMAT):
+                raise ValueError(f"Unsupported version directory version {version}")
+            if (num_columns != self.num_columns):
+                raise ValueError(f"Version directory has {num_columns} columns, expected {self.num_columns}")
+
+            values = array("i")
+            values.frombytes(directory_file.read())
+
+        self.records.clear()
+        position = 0
+        try:
+            for _ in range(num_records):
+                record_versions = RecordVersions(self.num_columns)
+                base_slot, record_versions.first_version, num_versions = values[position:position + 3]
+                position += 3
+                record_versions.tail_rids = values[position:position + num_versions]
+                position += num_versions
+                for column in range(self.num_columns):
+                    num_column_versions = values[position]
+                    position += 1
+                    if (num_column_versions != NO_COLUMN_VERSIONS):
+                        record_versions.column_versions[column] = values[position:position + num_column_versions]
+                        position += num_column_versions
+                for column in range(self.num_columns):
+                    if (values[position]):
+                        record_versions.previous_values[column] = values[position + 1]
+                    position += 2
+                self.records[base_slot] = record_versions
+        except (ValueError, IndexError):
+            raise ValueError("Version directory file is truncated")
+        if (position != len(values)):
+            raise ValueError("Version directory file is truncated")
+
+    def load_dict(self, json_directory):
+        '''Reads the version directory of metadata saved before the binary format'''
+        self.records.clear()
+        for base_slot, record_data in json_directory.items():
+            record_versions = RecordVersions(self.num_columns)
+            record_versions.tail_rids = array("i", record_data["tail_rids"])
+            record_versions.first_version = record_data["first_version"]
+            record_versions.column_versions = [None if versions is None else array("i", versions) for versions in record_data["column_versions"]]
+            record_versions.previous_values = record_data["previous_values"]
+            self.records[int(base_slot)] = record_versions
+
+    def __drop_oldest_version(self, record_versions:RecordVersions, read_tail_column):
+        '''The columns updated by the dropped version keep its values as the values before the oldest version kept'''
+        oldest_version = record_versions.first_version
+        tail_rid = record_versions.tail_rids.pop(0)
+        for column, column_versions in enumerate(record_versions.column_versions):
+            if (column_versions and column_versions[0] == oldest_version):
+                record_versions.previous_values[column] = read_tail_column(tail_rid, NUM_HIDDEN_COLUMNS + column)
+                column_versions.pop(0)
+        record_versions.first_version += 1